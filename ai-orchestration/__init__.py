@@ -9,7 +9,13 @@ Frameworks:
 - LlamaIndex: Knowledge base and RAG system
 """
 
-from .unified_api import UnifiedAISystem, app, start_server
-
 __version__ = "1.0.0"
 __all__ = ["UnifiedAISystem", "app", "start_server"]
+
+
+def __getattr__(name):
+    # Load the API (FastAPI and the shared services) on first use, not on package import
+    if name in __all__:
+        from . import unified_api
+        return getattr(unified_api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
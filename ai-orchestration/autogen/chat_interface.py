@@ -4,16 +4,26 @@ Your command center for controlling the entire AI affiliate marketing system
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional
+import json
+from typing import Dict, Any, AsyncIterator, List, Optional
 from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import (
+    ModelClientStreamingChunkEvent,
+    TextMessage,
+    ThoughtEvent,
+    ToolCallExecutionEvent,
+    ToolCallRequestEvent,
+    ToolCallSummaryMessage,
+)
 from autogen_agentchat.tools import AgentTool
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from shared.config import Config, CoreType, CORE_FRAMEWORK_MAPPING
+from shared.llm_gateway import get_gateway
 
 
 # =============================================================================
@@ -31,10 +41,7 @@ class AffiliateCommandCenter:
     """
     
     def __init__(self):
-        self.model_client = OpenAIChatCompletionClient(
-            model=Config.DEFAULT_LLM_MODEL,
-            api_key=Config.OPENAI_API_KEY
-        )
+        self.model_client = get_gateway().autogen_client(model=Config.DEFAULT_LLM_MODEL)
         self.agents = self._create_agents()
         self.main_agent = self._create_main_agent()
     
@@ -148,9 +155,63 @@ class AffiliateCommandCenter:
         return str(response.messages[-1].content) if response.messages else "No response"
     
     async def chat_stream(self, message: str):
-        """Stream a chat response"""
+        """Stream a chat response to the console"""
         await Console(self.main_agent.run_stream(task=message))
     
+    async def stream_events(self, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chat response as structured events for API clients:
+        - token: a chunk of model output as it is generated
+        - thought: model reasoning emitted before tool calls
+        - delegation: the command center calling a specialist agent (tool)
+        - delegation_result: a specialist agent's answer coming back
+        - message: a complete message from an agent
+        - done: the final response and why the run stopped
+        """
+        tool_agents = {agent.name for agent in self.agents.values()}
+        async for item in self.main_agent.run_stream(task=message):
+            if isinstance(item, ModelClientStreamingChunkEvent):
+                yield {"event": "token", "agent": item.source, "content": item.content}
+            elif isinstance(item, ThoughtEvent):
+                yield {"event": "thought", "agent": item.source, "content": item.content}
+            elif isinstance(item, ToolCallRequestEvent):
+                for call in item.content:
+                    yield {
+                        "event": "delegation",
+                        "agent": item.source,
+                        "tool": call.name,
+                        "specialist": call.name in tool_agents,
+                        "call_id": call.id,
+                        "arguments": self._tool_arguments(call.arguments)
+                    }
+            elif isinstance(item, ToolCallExecutionEvent):
+                for result in item.content:
+                    yield {
+                        "event": "delegation_result",
+                        "agent": item.source,
+                        "tool": result.name,
+                        "call_id": result.call_id,
+                        "content": result.content,
+                        "is_error": bool(result.is_error)
+                    }
+            elif isinstance(item, (TextMessage, ToolCallSummaryMessage)):
+                yield {"event": "message", "agent": item.source, "content": item.content}
+            elif isinstance(item, TaskResult):
+                final = item.messages[-1] if item.messages else None
+                yield {
+                    "event": "done",
+                    "response": str(final.content) if final is not None else "No response",
+                    "stop_reason": item.stop_reason
+                }
+    
+    @staticmethod
+    def _tool_arguments(arguments: str) -> Any:
+        """Tool call arguments are a JSON string; decode them when possible"""
+        try:
+            return json.loads(arguments)
+        except (TypeError, ValueError):
+            return arguments
+    
     async def execute_core(self, core: CoreType, task: str) -> Dict[str, Any]:
         """Execute a specific core with a task"""
         core_agent_map = {
@@ -187,8 +248,13 @@ class AffiliateCommandCenter:
         ]
     
     async def close(self):
-        """Clean up resources"""
-        await self.model_client.close()
+        """
+        Clean up resources.
+        The model client's connections belong to the shared LLM gateway, so
+        closing it here would break other components; the gateway is closed
+        by its owner at shutdown.
+        """
+        pass
 
 
 # =============================================================================
@@ -247,6 +313,7 @@ class InteractiveCLI:
                 print(f"\nError: {e}\n")
         
         await self.command_center.close()
+        await get_gateway().aclose()
     
     def _show_help(self):
         """Show help information"""
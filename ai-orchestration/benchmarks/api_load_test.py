@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Unified API Load Test
+Drives unified_api.app in-process (httpx.ASGITransport) with a configurable
+mix of /chat, /execute, /knowledge/query and /knowledge/add requests. LLM
+traffic goes to the OpenAI stub on loopback or to recorded replay fixtures,
+so the run is fully offline. Reports throughput, latency percentiles, error
+rates and memory growth over time, and saves results for comparison
+
+Usage:
+    python api_load_test.py --duration 60 --concurrency 20
+    python api_load_test.py --mix chat=50,execute=20,knowledge_query=25,knowledge_add=5
+    python api_load_test.py --backend replay --fixtures ./fixtures/replay --state-dir ./.loadtest
+    python api_load_test.py --save ./results --label main
+    python api_load_test.py --save ./results --compare ./results/loadtest-main-20260101T120000.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+
+OPERATIONS = ("chat", "execute", "knowledge_query", "knowledge_add")
+DEFAULT_MIX = "chat=60,execute=10,knowledge_query=25,knowledge_add=5"
+
+CHAT_MESSAGES = [
+    "Find the top 10 affiliate products in the finance niche",
+    "Write ad copy for a $297 personal finance course",
+    "How is my campaign performing this week?",
+    "Calculate my ROI for December",
+    "Set up an automated workflow for new Hotmart sales",
+]
+
+EXECUTE_TASKS = [
+    ("offer_intelligence", "Score the top offers in the health niche"),
+    ("content_generation", "Draft three email subject lines for a webinar launch"),
+    ("financial_intelligence", "Summarize last month's revenue by network"),
+    ("campaign_management", "Suggest budget changes for underperforming campaigns"),
+]
+
+KNOWLEDGE_QUESTIONS = [
+    ("What is the process for scoring a new offer?", "offer_intelligence"),
+    ("How should ad copy be structured?", "content_generation"),
+    ("When should a campaign be scaled?", "campaign_management"),
+    ("How is ROI calculated?", None),
+]
+
+FINISHED_JOB_STATUSES = ("completed", "failed", "cancelled")
+
+
+# =============================================================================
+# ENVIRONMENT
+# =============================================================================
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def configure_environment(args: argparse.Namespace, state_dir: Path, stub_port: Optional[int]):
+    """
+    Point every setting at the run's own state directory and LLM backend.
+    Must run before anything from shared/ is imported, since Config reads the
+    environment at import time.
+    """
+    env = {
+        "LLM_STUB_ENABLED": "true" if args.backend == "stub" else "false",
+        "REPLAY_MODE": "replay" if args.backend == "replay" else "off",
+        "REPLAY_FIXTURE_DIR": os.path.abspath(args.fixtures),
+        # Quotas, caching and budgets would measure the limits rather than the API
+        "RATE_LIMIT_ENABLED": "true" if args.rate_limit else "false",
+        "LLM_CACHE_ENABLED": "true" if args.llm_cache else "false",
+        "BUDGET_ENABLED": "true" if args.budgets else "false",
+        "ADMISSION_ENABLED": "false" if args.no_admission else "true",
+        "TRACING_ENABLED": "false" if args.no_tracing else "true",
+        "JOB_WORKERS": str(args.job_workers),
+        "JOBS_DB_PATH": str(state_dir / "jobs.sqlite3"),
+        "HISTORY_DB_PATH": str(state_dir / "task_history.sqlite3"),
+        "STATE_DB_PATH": str(state_dir / "shared_state.sqlite3"),
+        "RATE_LIMIT_DB_PATH": str(state_dir / "rate_limits.sqlite3"),
+        "LLM_CACHE_PATH": str(state_dir / "llm_cache.sqlite3"),
+        "BUDGET_DB_PATH": str(state_dir / "budgets.sqlite3"),
+        "CHECKPOINT_DB_PATH": str(state_dir / "checkpoints.sqlite3"),
+        "API_WORKERS": "1",
+        "WARMUP_ENABLED": "false",  # warmed explicitly before the clock starts
+    }
+    if stub_port is not None:
+        env["LLM_STUB_URL"] = f"http://127.0.0.1:{stub_port}/v1"
+    if args.backend == "replay":
+        # The LLM clients are never called in replay mode but still need a key to construct
+        env["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY", "replay")
+    os.environ.update(env)
+
+
+class StubServer:
+    """The OpenAI stub served on loopback from a background thread"""
+
+    def __init__(self, port: int, latency_ms: float, error_rate: float, seed: Optional[int]):
+        import uvicorn
+        from openai_stub import StubConfig, create_app
+
+        stub_config = StubConfig(latency="lognormal", latency_ms=latency_ms, jitter_ms=latency_ms / 4,
+                                 error_rate=error_rate, seed=seed)
+        self.app = create_app(stub_config)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, name="openai-stub", daemon=True)
+
+    def start(self, timeout: float = 10.0):
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("OpenAI stub server failed to start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.app.state.stats)
+
+
+# =============================================================================
+# OPERATIONS
+# =============================================================================
+
+async def op_chat(client, rng: random.Random, index: int, args: argparse.Namespace) -> int:
+    response = await client.post("/chat", json={
+        "message": rng.choice(CHAT_MESSAGES),
+        "session_id": f"loadtest_{index % args.sessions}"
+    })
+    return response.status_code
+
+
+async def op_execute(client, rng: random.Random, index: int, args: argparse.Namespace) -> int:
+    """Submit a core job; unless --execute-submit-only, wait for it so latency is end to end"""
+    core, task = rng.choice(EXECUTE_TASKS)
+    response = await client.post("/execute", json={"core": core, "task": task})
+    if response.status_code != 202 or args.execute_submit_only:
+        return response.status_code
+
+    job_id = response.json()["task_id"]
+    deadline = time.monotonic() + args.job_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(args.job_poll_interval)
+        job = await client.get(f"/jobs/{job_id}")
+        if job.status_code != 200:
+            return job.status_code
+        status = job.json()["status"]
+        if status in FINISHED_JOB_STATUSES:
+            # Report failed jobs as server errors so they count against the error rate
+            return 200 if status == "completed" else 500
+    return 504
+
+
+async def op_knowledge_query(client, rng: random.Random, index: int, args: argparse.Namespace) -> int:
+    question, category = rng.choice(KNOWLEDGE_QUESTIONS)
+    response = await client.post("/knowledge/query", json={"question": question, "category": category})
+    return response.status_code
+
+
+async def op_knowledge_add(client, rng: random.Random, index: int, args: argparse.Namespace) -> int:
+    words = " ".join(rng.choice(("offer", "funnel", "audience", "budget", "creative", "scale")) for _ in range(80))
+    response = await client.post("/knowledge/add", json={
+        "title": f"Load test note {index}",
+        "content": f"Load test document {index}. {words}",
+        "category": "loadtest",
+        "doc_type": "loadtest"
+    })
+    return response.status_code
+
+
+OPERATION_HANDLERS: Dict[str, Callable[..., Awaitable[int]]] = {
+    "chat": op_chat,
+    "execute": op_execute,
+    "knowledge_query": op_knowledge_query,
+    "knowledge_add": op_knowledge_add,
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "chat=60,execute=10,..." into operation weights"""
+    weights = {}
+    for part in mix.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation in mix: {name} (expected one of {OPERATIONS})")
+        weights[name] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError(f"Empty request mix: {mix!r}")
+    return weights
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def _rss_mb() -> float:
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class LoadStats:
+    """Latencies and status codes per operation, plus a memory/throughput timeline"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in OPERATIONS}
+        self.status_codes: Dict[str, Dict[str, int]] = {name: {} for name in OPERATIONS}
+        self.completed = 0
+        self.timeline: List[Dict[str, Any]] = []
+
+    def record(self, operation: str, status: str, latency: float):
+        self.latencies[operation].append(latency)
+        codes = self.status_codes[operation]
+        codes[status] = codes.get(status, 0) + 1
+        self.completed += 1
+
+    async def sample_memory(self, start: float, interval: float, stop: asyncio.Event):
+        last_completed, last_time = 0, start
+        while True:
+            now = time.perf_counter()
+            traced, _ = tracemalloc.get_traced_memory()
+            self.timeline.append({
+                "t": round(now - start, 2),
+                "completed": self.completed,
+                "rps": round((self.completed - last_completed) / (now - last_time), 2) if now > last_time else 0.0,
+                "rss_mb": round(_rss_mb(), 1),
+                "traced_mb": round(traced / 1024 / 1024, 2)
+            })
+            last_completed, last_time = self.completed, now
+            if stop.is_set():
+                return
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _latency_summary(latencies: List[float]) -> Dict[str, float]:
+    from shared.metrics import percentile
+    return {
+        "p50": round(percentile(latencies, 50) * 1000, 2),
+        "p90": round(percentile(latencies, 90) * 1000, 2),
+        "p95": round(percentile(latencies, 95) * 1000, 2),
+        "p99": round(percentile(latencies, 99) * 1000, 2),
+        "max": round(max(latencies) * 1000, 2) if latencies else 0.0
+    }
+
+
+def _operation_summary(latencies: List[float], codes: Dict[str, int], wall: float) -> Dict[str, Any]:
+    total = sum(codes.values())
+    errors = sum(count for code, count in codes.items() if not code.isdigit() or int(code) >= 500)
+    rejected = codes.get("429", 0)
+    return {
+        "requests": total,
+        "throughput_rps": round(total / wall, 2) if wall > 0 else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "rejected_rate": round(rejected / total, 4) if total else 0.0,
+        "status_codes": codes,
+        "latency_ms": _latency_summary(latencies)
+    }
+
+
+def summarize(stats: LoadStats, wall: float) -> Dict[str, Any]:
+    operations = {
+        name: _operation_summary(stats.latencies[name], stats.status_codes[name], wall)
+        for name in OPERATIONS if stats.status_codes[name]
+    }
+    all_codes: Dict[str, int] = {}
+    for codes in stats.status_codes.values():
+        for code, count in codes.items():
+            all_codes[code] = all_codes.get(code, 0) + count
+    all_latencies = [latency for latencies in stats.latencies.values() for latency in latencies]
+
+    timeline = stats.timeline
+    memory = {}
+    if timeline:
+        memory = {
+            "rss_start_mb": timeline[0]["rss_mb"],
+            "rss_end_mb": timeline[-1]["rss_mb"],
+            "rss_growth_mb": round(timeline[-1]["rss_mb"] - timeline[0]["rss_mb"], 1),
+            "traced_growth_mb": round(timeline[-1]["traced_mb"] - timeline[0]["traced_mb"], 2),
+            "timeline": timeline
+        }
+    return {
+        "wall_seconds": round(wall, 2),
+        "total": _operation_summary(all_latencies, all_codes, wall),
+        "operations": operations,
+        "memory": memory
+    }
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+async def run_load(args: argparse.Namespace, weights: Dict[str, float]) -> Dict[str, Any]:
+    """Initialize the API in-process and run closed-loop workers against it"""
+    import httpx
+    from unified_api import app, ai_system
+
+    await ai_system.initialize()
+    # Measure steady state, not the first requests paying for framework imports
+    await ai_system.warm_up()
+
+    stats = LoadStats()
+    names = list(weights)
+    name_weights = [weights[name] for name in names]
+    issued = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+        tracemalloc.start()
+        start = time.perf_counter()
+        end = start + args.duration
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(stats.sample_memory(start, args.sample_interval, stop))
+
+        async def worker(worker_id: int):
+            nonlocal issued
+            rng = random.Random(None if args.seed is None else args.seed + worker_id)
+            while time.perf_counter() < end and (not args.requests or issued < args.requests):
+                index = issued
+                issued += 1
+                operation = rng.choices(names, weights=name_weights)[0]
+                request_start = time.perf_counter()
+                try:
+                    status = str(await OPERATION_HANDLERS[operation](client, rng, index, args))
+                except Exception as e:
+                    status = type(e).__name__
+                stats.record(operation, status, time.perf_counter() - request_start)
+
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        wall = time.perf_counter() - start
+        stop.set()
+        await sampler
+        tracemalloc.stop()
+
+    await ai_system.shutdown()
+    return summarize(stats, wall)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARK_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Headline metrics of two runs side by side"""
+    def headline(run: Dict[str, Any]) -> Dict[str, float]:
+        total = run["result"]["total"]
+        return {
+            "throughput_rps": total["throughput_rps"],
+            "p50_ms": total["latency_ms"]["p50"],
+            "p95_ms": total["latency_ms"]["p95"],
+            "p99_ms": total["latency_ms"]["p99"],
+            "error_rate": total["error_rate"],
+            "rejected_rate": total["rejected_rate"],
+            "rss_growth_mb": run["result"]["memory"].get("rss_growth_mb", 0.0)
+        }
+
+    before, after = headline(baseline), headline(current)
+    rows = []
+    for metric in before:
+        delta = after[metric] - before[metric]
+        rows.append({
+            "metric": metric,
+            "baseline": before[metric],
+            "current": after[metric],
+            "change_pct": round(delta / before[metric] * 100, 1) if before[metric] else None
+        })
+    return rows
+
+
+def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """Set up the offline environment, run the load and report/save the results"""
+    weights = parse_mix(args.mix)
+    temp_dir = None
+    if args.state_dir:
+        state_dir = Path(args.state_dir).resolve()
+        state_dir.mkdir(parents=True, exist_ok=True)
+    else:
+        temp_dir = tempfile.TemporaryDirectory(prefix="loadtest_")
+        state_dir = Path(temp_dir.name)
+
+    stub = None
+    stub_port = _free_port() if args.backend == "stub" else None
+    configure_environment(args, state_dir, stub_port)
+    if stub_port is not None:
+        stub = StubServer(stub_port, args.stub_latency_ms, args.stub_error_rate, args.seed)
+        stub.start()
+
+    # Keep knowledge base writes out of the real index
+    from shared.config import Config
+    Config.LLAMAINDEX_STORAGE_DIR = str(state_dir / "knowledge_base")
+
+    print(f"\n🔥 UNIFIED API LOAD TEST")
+    print(f"{'='*50}")
+    print(f"Backend: {args.backend} | State: {state_dir}")
+    print(f"Mix: {', '.join(f'{name}={weight:g}' for name, weight in weights.items())}")
+    print(f"Concurrency: {args.concurrency} | Duration: {args.duration}s"
+          + (f" | Max requests: {args.requests}" if args.requests else ""))
+    print(f"{'='*50}\n")
+
+    try:
+        result = asyncio.run(run_load(args, weights))
+    finally:
+        if stub is not None:
+            stub.stop()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    output = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "config": {
+            "backend": args.backend,
+            "mix": weights,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "stub_latency_ms": args.stub_latency_ms if args.backend == "stub" else None,
+            "stub_error_rate": args.stub_error_rate if args.backend == "stub" else None,
+            "execute_submit_only": args.execute_submit_only,
+            "job_workers": args.job_workers
+        },
+        "result": result,
+        "stub": stub.get_stats() if stub is not None else None
+    }
+
+    if args.output == "json":
+        print(json.dumps(output, indent=2))
+    else:
+        summary = {key: value for key, value in result.items() if key != "memory"}
+        memory = {key: value for key, value in result["memory"].items() if key != "timeline"}
+        print(json.dumps({**summary, "memory": memory}, indent=2))
+
+    if args.save:
+        save_dir = Path(args.save)
+        save_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        path = save_dir / f"loadtest-{args.label}-{stamp}.json"
+        path.write_text(json.dumps(output, indent=2))
+        print(f"\n💾 Saved to {path}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        output["comparison"] = compare(output, baseline)
+        print(f"\n📊 Compared with {args.compare} ({baseline.get('label')}, {baseline.get('git_revision')})")
+        for row in output["comparison"]:
+            change = f"{row['change_pct']:+.1f}%" if row["change_pct"] is not None else "n/a"
+            print(f"  {row['metric']:<16} {row['baseline']:>10} → {row['current']:>10}  ({change})")
+
+    print(f"\n{'='*50}")
+    print(f"✅ Load test complete")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline in-process load test of the unified API")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Request mix as name=weight pairs")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = duration only)")
+    parser.add_argument("--sessions", type=int, default=50, help="Distinct chat session ids to rotate through")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout")
+    parser.add_argument("--backend", choices=["stub", "replay"], default="stub",
+                        help="LLM backend: loopback OpenAI stub or recorded replay fixtures")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(BENCHMARK_DIR), "fixtures", "replay"),
+                        help="Replay fixture directory")
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0, help="Median stub latency")
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Share of stub calls that fail")
+    parser.add_argument("--execute-submit-only", action="store_true",
+                        help="Time only the /execute submit instead of waiting for the job")
+    parser.add_argument("--job-workers", type=int, default=4, help="Background job workers")
+    parser.add_argument("--job-timeout", type=float, default=300.0, help="Max seconds to wait for a job")
+    parser.add_argument("--job-poll-interval", type=float, default=0.1, help="Seconds between job polls")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the LLM rate limiter on")
+    parser.add_argument("--llm-cache", action="store_true", help="Keep the LLM response cache on")
+    parser.add_argument("--budgets", action="store_true", help="Keep token budgets on")
+    parser.add_argument("--no-admission", action="store_true", help="Turn admission control off")
+    parser.add_argument("--no-tracing", action="store_true", help="Turn request tracing off")
+    parser.add_argument("--state-dir", help="Reuse this state directory instead of a temporary one")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between memory samples")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible mixes")
+    parser.add_argument("--label", default="run", help="Name for the saved result")
+    parser.add_argument("--save", help="Directory to save the result JSON in")
+    parser.add_argument("--compare", help="Saved result to compare against")
+    parser.add_argument("--output", choices=["text", "json"], default="text", help="Output format")
+
+    run_load_test(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+OpenAI-Compatible Stub Server
+Local stand-in for the chat completions (plain and streaming), embeddings and
+models endpoints, so the API, runners, crews and scoring engine can be load
+tested on an isolated box. Latency follows a configurable distribution and
+errors can be injected at a fixed rate
+
+Usage:
+    python openai_stub.py --port 8999 --latency lognormal --latency-ms 800
+    python openai_stub.py --mode echo --error-rate 0.02 --error-codes 429,500
+    LLM_STUB_ENABLED=true python ../unified_api.py   # point the stack at the stub
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+# Keywords used to answer the orchestrator's routing prompt with a real core name
+ROUTING_KEYWORDS = [
+    ("content_generation", ("copy", "write", "content", "email", "script", "ad ")),
+    ("financial_intelligence", ("roi", "revenue", "profit", "expense", "financ")),
+    ("campaign_management", ("campaign", "budget", "schedule")),
+    ("analytics_engine", ("analytic", "metric", "report", "performing")),
+    ("automation_hub", ("automat", "workflow", "trigger")),
+    ("integration_layer", ("integrat", "api", "connect")),
+    ("personalization_engine", ("personaliz", "preference", "recommend")),
+]
+
+
+class StubConfig:
+    """Behaviour of the stub server"""
+
+    def __init__(self, latency: str = "fixed", latency_ms: float = 200.0, jitter_ms: float = 50.0,
+                 token_ms: float = 5.0, error_rate: float = 0.0, error_codes: List[int] = None,
+                 timeout_rate: float = 0.0, mode: str = "canned", canned: List[Dict[str, str]] = None,
+                 completion_words: int = 120, embedding_dim: int = 1536, seed: Optional[int] = None):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Invalid latency distribution: {latency}")
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self.error_rate = error_rate
+        self.error_codes = error_codes or [429, 500, 503]
+        self.timeout_rate = timeout_rate
+        self.mode = mode
+        self.canned = canned or []
+        self.completion_words = completion_words
+        self.embedding_dim = embedding_dim
+        self.random = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        """Seconds of simulated model latency for one request"""
+        mean, spread = self.latency_ms, self.jitter_ms
+        if self.latency == "uniform":
+            value = self.random.uniform(mean - spread, mean + spread)
+        elif self.latency == "normal":
+            value = self.random.gauss(mean, spread)
+        elif self.latency == "lognormal":
+            # `latency_ms` is the median; `jitter_ms / latency_ms` is the shape
+            sigma = spread / mean if mean > 0 else 0.0
+            value = mean * math.exp(self.random.gauss(0, sigma))
+        else:
+            value = mean
+        return max(0.0, value) / 1000
+
+
+# =============================================================================
+# RESPONSES
+# =============================================================================
+
+def _count_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _route(text: str) -> str:
+    lowered = text.lower()
+    for core, keywords in ROUTING_KEYWORDS:
+        if any(keyword in lowered for keyword in keywords):
+            return core
+    return "offer_intelligence"
+
+
+def completion_text(config: StubConfig, messages: List[Dict[str, Any]]) -> str:
+    """Answer for a chat request: canned rule, routing answer or echo"""
+    system = " ".join(_message_text(m) for m in messages if m.get("role") == "system")
+    user = _message_text(messages[-1]) if messages else ""
+
+    for rule in config.canned:
+        if re.search(rule["match"], f"{system}\n{user}", re.I):
+            return rule["response"]
+
+    if "respond with only the core name" in system.lower():
+        return _route(user)
+
+    if config.mode == "echo":
+        answer = f"Echo: {user}"
+    else:
+        words = (user.split() or ["stub"]) * (config.completion_words // max(len(user.split()), 1) + 1)
+        answer = (
+            "## Summary\n" + " ".join(words[:config.completion_words]) +
+            "\n\n## Recommendations\n1. Stub recommendation\n\n## Forecast\nFlat\n\n## Risk\nLow"
+        )
+    if "confidence:" in system.lower():
+        answer += "\n\nCONFIDENCE: 0.9"
+    return answer
+
+
+def embedding_vector(text: str, dim: int) -> List[float]:
+    """Deterministic unit vector derived from the text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+# =============================================================================
+# APPLICATION
+# =============================================================================
+
+def create_app(config: StubConfig = None) -> FastAPI:
+    """Build the stub ASGI app (usable in-process via httpx.ASGITransport)"""
+    config = config or StubConfig()
+    app = FastAPI(title="OpenAI Stub", version="1.0.0")
+    stats = {"chat": 0, "stream": 0, "embeddings": 0, "errors": 0, "timeouts": 0}
+    app.state.config = config
+    app.state.stats = stats
+
+    async def maybe_fail() -> Optional[JSONResponse]:
+        """Injected failures: hung requests and error status codes"""
+        if config.timeout_rate and config.random.random() < config.timeout_rate:
+            stats["timeouts"] += 1
+            await asyncio.sleep(3600)
+        if config.error_rate and config.random.random() < config.error_rate:
+            stats["errors"] += 1
+            code = config.random.choice(config.error_codes)
+            headers = {"retry-after-ms": "200"} if code == 429 else {}
+            return JSONResponse(
+                status_code=code,
+                content={"error": {"message": f"Injected error {code}", "type": "stub_error", "code": code}},
+                headers=headers
+            )
+        return None
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {
+            "object": "list",
+            "data": [{"id": "gpt-4o", "object": "model", "owned_by": "stub"},
+                     {"id": "gpt-4o-mini", "object": "model", "owned_by": "stub"}]
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        failure = await maybe_fail()
+        if failure is not None:
+            return failure
+
+        model = body.get("model", "gpt-4o")
+        messages = body.get("messages", [])
+        content = completion_text(config, messages)
+        usage = {
+            "prompt_tokens": sum(_count_tokens(_message_text(m)) for m in messages),
+            "completion_tokens": _count_tokens(content)
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            stats["stream"] += 1
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(
+                _stream(config, completion_id, created, model, content, usage if include_usage else None),
+                media_type="text/event-stream"
+            )
+
+        stats["chat"] += 1
+        await asyncio.sleep(config.sample_latency())
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        failure = await maybe_fail()
+        if failure is not None:
+            return failure
+
+        stats["embeddings"] += 1
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dim = body.get("dimensions") or config.embedding_dim
+        await asyncio.sleep(config.sample_latency() / 4)
+        tokens = sum(_count_tokens(str(text)) for text in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": embedding_vector(str(text), dim)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    @app.get("/stub/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+async def _stream(config: StubConfig, completion_id: str, created: int, model: str,
+                  content: str, usage: Optional[Dict[str, int]]) -> AsyncIterator[str]:
+    """Chat completion chunks: time-to-first-token from the latency distribution, then per-token delay"""
+    def chunk(delta: Dict[str, Any], finish_reason: str = None, chunk_usage: Dict[str, int] = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+            "usage": chunk_usage
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    await asyncio.sleep(config.sample_latency())
+    yield chunk({"role": "assistant", "content": ""})
+    for token in re.findall(r"\S+\s*", content):
+        yield chunk({"content": token})
+        if config.token_ms:
+            await asyncio.sleep(config.token_ms / 1000)
+    yield chunk({}, finish_reason="stop")
+    if usage is not None:
+        yield chunk(None, chunk_usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8999, help="Port")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal", help="Latency distribution")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Mean (median for lognormal) latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Spread of the latency distribution")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Delay between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument("--error-codes", default="429,500,503", help="Comma-separated error status codes")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Share of requests that never answer")
+    parser.add_argument("--mode", choices=["canned", "echo"], default="canned", help="Response mode")
+    parser.add_argument("--canned", help='JSON file of [{"match": regex, "response": text}] rules')
+    parser.add_argument("--completion-words", type=int, default=120, help="Words in canned completions")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible runs")
+
+    args = parser.parse_args()
+
+    canned = None
+    if args.canned:
+        with open(args.canned, "r", encoding="utf-8") as f:
+            canned = json.load(f)
+
+    config = StubConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        token_ms=args.token_ms,
+        error_rate=args.error_rate,
+        error_codes=[int(code) for code in args.error_codes.split(",") if code.strip()],
+        timeout_rate=args.timeout_rate,
+        mode=args.mode,
+        canned=canned,
+        completion_words=args.completion_words,
+        seed=args.seed
+    )
+
+    import uvicorn
+    print(f"\n🧪 OPENAI STUB SERVER on http://{args.host}:{args.port}/v1")
+    print(f"Latency: {args.latency} {args.latency_ms}ms ± {args.jitter_ms}ms | Errors: {args.error_rate:.1%}\n")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,12 @@ Provides AI-powered product analysis, risk assessment, and profitability predict
 """
 
 import os
+import sys
 from typing import Dict, List, Optional
-from openai import OpenAI
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared.llm_gateway import get_gateway
 
 class ProductScoringEngine:
     """
@@ -27,7 +29,7 @@ class ProductScoringEngine:
     }
     
     def __init__(self):
-        self.client = client
+        self.client = get_gateway()
     
     def score_product(self, product: Dict) -> Dict:
         """
@@ -361,13 +363,14 @@ Provide a 2-3 sentence analysis covering:
 Be direct and actionable."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self.client.chat(
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=200,
-                temperature=0.7
+                temperature=0.7,
+                source="offer_scoring"
             )
-            return response.choices[0].message.content.strip()
+            return response["content"].strip()
         except Exception as e:
             return f"AI analysis unavailable: {str(e)}"
     
@@ -13,6 +13,8 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from shared.config import Config, CoreType
+from shared.replay import replay
+from shared.crew_runner import kickoff_crew
 
 
 # =============================================================================
@@ -219,12 +221,11 @@ class OfferIntelligenceCrew:
     
     async def execute(self, request: str) -> Dict[str, Any]:
         """Execute the crew with the given request"""
-        result = self.crew().kickoff(inputs={"input": request})
-        return {
-            "core": CoreType.OFFER_INTELLIGENCE.value,
-            "status": "completed",
-            "result": result.model_dump() if hasattr(result, 'model_dump') else str(result)
-        }
+        return await replay.intercept(
+            "crew",
+            {"core": CoreType.OFFER_INTELLIGENCE.value, "input": request},
+            lambda: kickoff_crew(self.crew(), CoreType.OFFER_INTELLIGENCE.value, request)
+        )
     
     def execute_sync(self, request: str) -> Dict[str, Any]:
         """Synchronous execution wrapper"""
@@ -3,18 +3,35 @@ LangGraph Master Orchestrator
 Controls the flow between all 8 cores and manages global state
 """
 
-from typing import TypedDict, Annotated, Literal, Optional, Dict, Any, List
+from typing import TypedDict, Annotated, Literal, Optional, Dict, Any, List, AsyncIterator
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langchain_core.callbacks import adispatch_custom_event
 import operator
 import asyncio
+from contextvars import ContextVar
 
 from shared.config import (
     Config, CoreType, TaskStatus, OrchestratorState,
     CORE_FRAMEWORK_MAPPING, get_primary_framework
 )
+from shared.metrics import metrics
+from shared.tracing import tracer
+from shared.streaming import isolate_stream
+from shared.deadline import Deadline, enter_stage, use_deadline
+from shared.budget import budget_scope, get_ledger
+from shared.cascade import Validator, require_choice
+from shared.llm_gateway import get_gateway
+from shared.state import create_checkpointer, open_checkpointer
+
+
+# Knowledge base lookup started by the caller alongside this run (see run())
+_pending_kb_context: ContextVar[Optional[asyncio.Future]] = ContextVar("pending_kb_context", default=None)
+
+
+def _normalize_intent(text: str) -> str:
+    """Normalize an LLM routing answer to a core name"""
+    return text.strip().strip('"').lower().replace(" ", "_")
 
 
 # =============================================================================
@@ -43,34 +60,38 @@ class MasterOrchestrator:
     and manages the overall workflow of the affiliate marketing system.
     """
     
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=Config.DEFAULT_LLM_MODEL,
-            api_key=Config.OPENAI_API_KEY,
-            temperature=0.1
-        )
-        self.memory = MemorySaver()
+    def __init__(self, checkpointer: Optional[BaseCheckpointSaver] = None):
+        self.gateway = get_gateway()
+        self.memory = checkpointer or create_checkpointer()
         self.graph = self._build_graph()
     
+    async def setup(self):
+        """Open the checkpointer's storage (a no-op for in-memory checkpoints)"""
+        await open_checkpointer(self.memory)
+    
     def _build_graph(self) -> StateGraph:
         """Build the master orchestration graph"""
         
         # Create the graph
         graph = StateGraph(MasterState)
         
-        # Add nodes for each function
-        graph.add_node("analyze_request", self.analyze_request)
-        graph.add_node("route_to_core", self.route_to_core)
-        graph.add_node("execute_offer_intelligence", self.execute_offer_intelligence)
-        graph.add_node("execute_content_generation", self.execute_content_generation)
-        graph.add_node("execute_campaign_management", self.execute_campaign_management)
-        graph.add_node("execute_analytics", self.execute_analytics)
-        graph.add_node("execute_automation", self.execute_automation)
-        graph.add_node("execute_financial", self.execute_financial)
-        graph.add_node("execute_integration", self.execute_integration)
-        graph.add_node("execute_personalization", self.execute_personalization)
-        graph.add_node("aggregate_results", self.aggregate_results)
-        graph.add_node("handle_error", self.handle_error)
+        # Add nodes for each function (timed for the /metrics endpoint)
+        nodes = {
+            "analyze_request": self.analyze_request,
+            "route_to_core": self.route_to_core,
+            "execute_offer_intelligence": self.execute_offer_intelligence,
+            "execute_content_generation": self.execute_content_generation,
+            "execute_campaign_management": self.execute_campaign_management,
+            "execute_analytics": self.execute_analytics,
+            "execute_automation": self.execute_automation,
+            "execute_financial": self.execute_financial,
+            "execute_integration": self.execute_integration,
+            "execute_personalization": self.execute_personalization,
+            "aggregate_results": self.aggregate_results,
+            "handle_error": self.handle_error,
+        }
+        for name, node in nodes.items():
+            graph.add_node(name, self._instrument(name, node))
         
         # Add edges
         graph.add_edge(START, "analyze_request")
@@ -108,6 +129,32 @@ class MasterOrchestrator:
         
         return graph.compile(checkpointer=self.memory)
     
+    def _instrument(self, name: str, node):
+        """
+        Wrap a node so its wall time is recorded and traced, the request deadline
+        is checked and its LLM usage is charged to the routed core and session.
+        Budgets are checked once per run (see _ensure_budget) and by the gateway
+        on each LLM call, not per node.
+        """
+        async def timed_node(state: MasterState) -> Dict[str, Any]:
+            enter_stage(f"node:{name}")
+            core = state.get("current_core")
+            with budget_scope(core=core or "orchestrator", session=state.get("session_id")):
+                with metrics.timer("node", name), tracer.span(f"node:{name}", kind="node", core=core) as span:
+                    result = await node(state)
+                    if isinstance(result, dict):
+                        span.set(core=result.get("current_core"), error=result.get("error"))
+                    return result
+        return timed_node
+    
+    @staticmethod
+    async def _ensure_budget(session_id: str):
+        """Refuse a run up front once a hard budget for its session (or the day) is spent"""
+        if not Config.BUDGET_ENABLED:
+            return
+        with budget_scope(core="orchestrator", session=session_id):
+            await asyncio.to_thread(get_ledger().ensure_available)
+    
     def _route_decision(self, state: MasterState) -> str:
         """Determine which core to route to"""
         routing = state.get("routing_decision")
@@ -129,6 +176,31 @@ class MasterOrchestrator:
         last_message = messages[-1] if messages else {}
         content = last_message.get("content", "")
         
+        # Routing decisions may be supplied up front (e.g. shared across a batch)
+        if state.get("global_context", {}).get("analyzed_intent"):
+            return {
+                "global_context": {
+                    **state.get("global_context", {}),
+                    "original_request": content
+                }
+            }
+        
+        core_decision = await self._classify_intent(content, stream_tokens=True)
+        
+        return {
+            "global_context": {
+                **state.get("global_context", {}),
+                "analyzed_intent": core_decision,
+                "original_request": content
+            }
+        }
+    
+    async def _classify_intent(self, content: str, stream_tokens: bool = False) -> str:
+        """
+        Ask the LLM which core should handle a request.
+        With `stream_tokens` (only valid inside a graph node) tokens are
+        dispatched as custom events for run_stream.
+        """
         # Use LLM to analyze intent
         system_prompt = """You are an AI orchestrator for an affiliate marketing system.
         Analyze the user's request and determine which core should handle it:
@@ -144,20 +216,34 @@ class MasterOrchestrator:
         
         Respond with ONLY the core name (e.g., "offer_intelligence")."""
         
-        response = await self.llm.ainvoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=content)
-        ])
-        
-        core_decision = response.content.strip().lower().replace(" ", "_")
+        response = await self._invoke_llm(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": content}
+            ],
+            source="analyze_request",
+            validators=[require_choice([core.value for core in CoreType], normalize=_normalize_intent)],
+            stream_tokens=stream_tokens
+        )
         
-        return {
-            "global_context": {
-                **state.get("global_context", {}),
-                "analyzed_intent": core_decision,
-                "original_request": content
-            }
-        }
+        return _normalize_intent(response["content"])
+    
+    async def _invoke_llm(self, messages: List[Dict[str, str]], source: str,
+                          validators: List[Validator] = (), stream_tokens: bool = False) -> Dict[str, Any]:
+        """
+        Call the orchestrator LLM through the shared gateway's model cascade:
+        a cheaper tier answers unless its output fails the validators
+        """
+        async def on_token(token: str):
+            await adispatch_custom_event("llm_token", {"source": source, "content": token})
+        
+        return await self.gateway.achat_cascade(
+            messages,
+            validators=validators,
+            temperature=0.1,
+            source=source,
+            on_token=on_token if stream_tokens else None
+        )
     
     async def route_to_core(self, state: MasterState) -> Dict[str, Any]:
         """Route the request to the appropriate core"""
@@ -173,17 +259,41 @@ class MasterOrchestrator:
         if intent in valid_cores:
             return {
                 "routing_decision": intent,
-                "current_core": intent
+                "current_core": intent,
+                "global_context": {**context, **await self._collect_kb_context()}
             }
         
         return {"routing_decision": "error", "error": f"Unknown intent: {intent}"}
     
+    async def _collect_kb_context(self) -> Dict[str, Any]:
+        """
+        Wait for the knowledge base lookup running alongside routing, if any.
+        A failed lookup only costs the context, never the request.
+        """
+        pending = _pending_kb_context.get()
+        if pending is None:
+            return {}
+        try:
+            kb = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return {}
+        return {"kb_context": kb.get("context", ""), "kb_sources": kb.get("sources", [])}
+    
+    def _core_request(self, state: MasterState) -> str:
+        """The user's request, with knowledge base context appended when available"""
+        context = state.get("global_context", {})
+        request = context.get("original_request", "")
+        if context.get("kb_context"):
+            return f"{request}\n\nContext: {context['kb_context']}"
+        return request
+    
     async def execute_offer_intelligence(self, state: MasterState) -> Dict[str, Any]:
         """Execute Offer Intelligence core using CrewAI"""
         from crewai_agents.offer_intelligence import OfferIntelligenceCrew
         
-        context = state.get("global_context", {})
-        request = context.get("original_request", "")
+        request = self._core_request(state)
         
         crew = OfferIntelligenceCrew()
         result = await crew.execute(request)
@@ -201,8 +311,7 @@ class MasterOrchestrator:
         """Execute Content Generation core using CrewAI + AutoGen"""
         from crewai_agents.content_generation import ContentGenerationCrew
         
-        context = state.get("global_context", {})
-        request = context.get("original_request", "")
+        request = self._core_request(state)
         
         crew = ContentGenerationCrew()
         result = await crew.execute(request)
@@ -256,8 +365,7 @@ class MasterOrchestrator:
         """Execute Financial Intelligence core using CrewAI"""
         from crewai_agents.financial_intelligence import FinancialIntelligenceCrew
         
-        context = state.get("global_context", {})
-        request = context.get("original_request", "")
+        request = self._core_request(state)
         
         crew = FinancialIntelligenceCrew()
         result = await crew.execute(request)
@@ -286,8 +394,7 @@ class MasterOrchestrator:
         """Execute Personalization Engine core using LlamaIndex"""
         from llamaindex_rag.personalization import PersonalizationEngine
         
-        context = state.get("global_context", {})
-        request = context.get("original_request", "")
+        request = self._core_request(state)
         
         engine = PersonalizationEngine()
         result = await engine.personalize(request)
@@ -338,24 +445,154 @@ class MasterOrchestrator:
     # PUBLIC API
     # =========================================================================
     
-    async def run(self, message: str, session_id: str = "default") -> Dict[str, Any]:
-        """Run the orchestrator with a user message"""
-        initial_state = {
+    def _initial_state(self, message: str, session_id: str, intent: Optional[str] = None) -> Dict[str, Any]:
+        """Build the initial graph state for a user message"""
+        return {
             "session_id": session_id,
             "messages": [{"role": "user", "content": message}],
             "current_core": None,
             "task_queue": [],
             "completed_tasks": [],
-            "global_context": {},
+            "global_context": {"analyzed_intent": intent} if intent else {},
             "routing_decision": None,
             "error": None
         }
+    
+    async def run(self, message: str, session_id: str = "default", intent: Optional[str] = None,
+                  kb_context: Optional[asyncio.Future] = None) -> Dict[str, Any]:
+        """
+        Run the orchestrator with a user message.
+        If `intent` is given, the LLM routing step is skipped and that core is used.
+        `kb_context` is a knowledge base lookup ({"context", "sources"}) already
+        running; it overlaps with routing and is merged into the state before
+        the selected core executes.
+        """
+        await self._ensure_budget(session_id)
+        initial_state = self._initial_state(message, session_id, intent)
         
         config = {"configurable": {"thread_id": session_id}}
-        result = await self.graph.ainvoke(initial_state, config)
+        token = _pending_kb_context.set(kb_context)
+        try:
+            with tracer.span("orchestrator.run", kind="orchestrator", session=session_id, intent=intent) as span:
+                result = await self.graph.ainvoke(initial_state, config)
+                span.set(core=result.get("routing_decision"))
+        finally:
+            _pending_kb_context.reset(token)
         
         return result
     
+    def run_stream(self, message: str, session_id: str = "default",
+                   kb_context: Optional[asyncio.Future] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the orchestrator and yield events as they happen.
+        
+        Yields dicts with an "event" key:
+        - node_start / node_end: a graph node started or finished
+        - routing: the core selected by route_to_core
+        - token: an LLM token, tagged with the node that produced it
+        - done: the final graph state
+        
+        The run sets the pending KB lookup and its trace span around each
+        yield, so it executes in a task of its own (see isolate_stream).
+        """
+        return isolate_stream(self._run_stream(message, session_id, kb_context))
+    
+    async def _run_stream(self, message: str, session_id: str,
+                          kb_context: Optional[asyncio.Future]) -> AsyncIterator[Dict[str, Any]]:
+        await self._ensure_budget(session_id)
+        initial_state = self._initial_state(message, session_id)
+        config = {"configurable": {"thread_id": session_id}}
+        node_names = set(self.graph.nodes) - {START}
+        
+        token = _pending_kb_context.set(kb_context)
+        try:
+            with tracer.span("orchestrator.run_stream", kind="orchestrator", session=session_id) as span:
+                async for event in self._stream_events(initial_state, config, node_names):
+                    if event["event"] == "routing":
+                        span.set(core=event["core"])
+                    yield event
+        finally:
+            _pending_kb_context.reset(token)
+        
+        snapshot = await self.graph.aget_state(config)
+        yield {"event": "done", "result": snapshot.values}
+    
+    async def _stream_events(self, initial_state: Dict[str, Any], config: Dict[str, Any],
+                             node_names: set) -> AsyncIterator[Dict[str, Any]]:
+        """Translate LangGraph events into run_stream events"""
+        async for event in self.graph.astream_events(initial_state, config, version="v2"):
+            kind = event.get("event")
+            name = event.get("name")
+            node = event.get("metadata", {}).get("langgraph_node")
+            
+            if kind == "on_chain_start" and name in node_names and name == node:
+                yield {"event": "node_start", "node": name}
+            
+            elif kind == "on_chain_end" and name in node_names and name == node:
+                yield {"event": "node_end", "node": name}
+                output = event.get("data", {}).get("output") or {}
+                if name == "route_to_core" and isinstance(output, dict):
+                    yield {
+                        "event": "routing",
+                        "core": output.get("routing_decision"),
+                        "error": output.get("error")
+                    }
+            
+            elif kind == "on_custom_event" and name == "llm_token":
+                content = event.get("data", {}).get("content", "")
+                if content:
+                    yield {"event": "token", "node": node, "content": content}
+    
+    async def run_many(self, items: List[Dict[str, Any]], concurrency: int = None,
+                       timeout_seconds: float = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run a batch of messages with bounded concurrency.
+        
+        Each item is {"message": ..., "session_id": ...} and runs under its own
+        deadline of `timeout_seconds` (default REQUEST_TIMEOUT_SECONDS). Routing
+        is computed once per distinct (normalized) message and shared across
+        the batch; it runs under a batch deadline and is charged to the
+        orchestrator's budget under the batch's own session.
+        Results are yielded as each item completes, tagged with its index.
+        """
+        timeout_seconds = timeout_seconds or Config.REQUEST_TIMEOUT_SECONDS
+        semaphore = asyncio.Semaphore(concurrency or Config.BATCH_MAX_CONCURRENCY)
+        batch_deadline = Deadline(timeout_seconds)
+        routes: Dict[str, asyncio.Future] = {}
+        
+        def route_for(message: str) -> asyncio.Future:
+            key = " ".join(message.lower().split())
+            if key not in routes:
+                # Shared by many items, so not bound to the deadline of the one that asked first
+                batch_deadline.extend(Deadline(timeout_seconds))
+                with use_deadline(batch_deadline), budget_scope(core="orchestrator", session="batch_routing"):
+                    routes[key] = asyncio.ensure_future(
+                        batch_deadline.run(self._classify_intent(message), stage="analyze_request")
+                    )
+            return routes[key]
+        
+        async def run_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+            message = item.get("message", "")
+            session_id = item.get("session_id") or f"batch_{index}"
+            async with semaphore:
+                deadline = Deadline(timeout_seconds)
+                try:
+                    with use_deadline(deadline):
+                        intent = await deadline.run(asyncio.shield(route_for(message)), stage="analyze_request")
+                        result = await deadline.run(self.run(message, session_id, intent=intent), stage="execute")
+                    return {"index": index, "session_id": session_id, "result": result}
+                except Exception as e:
+                    return {"index": index, "session_id": session_id, "error": str(e)}
+        
+        tasks = [asyncio.ensure_future(run_item(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            batch_deadline.cancel("cancelled")
+            for task in tasks + list(routes.values()):
+                task.cancel()
+    
     def run_sync(self, message: str, session_id: str = "default") -> Dict[str, Any]:
         """Synchronous wrapper for run()"""
         return asyncio.run(self.run(message, session_id))
@@ -365,9 +602,9 @@ class MasterOrchestrator:
 # FACTORY FUNCTION
 # =============================================================================
 
-def create_orchestrator() -> MasterOrchestrator:
+def create_orchestrator(checkpointer: Optional[BaseCheckpointSaver] = None) -> MasterOrchestrator:
     """Factory function to create the master orchestrator"""
-    return MasterOrchestrator()
+    return MasterOrchestrator(checkpointer)
 
 
 # =============================================================================
@@ -12,25 +12,35 @@ from llama_index.core import (
     load_index_from_storage
 )
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
+from llama_index.core.schema import MetadataMode
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
 from pathlib import Path
+import asyncio
 import os
 import sys
 import json
+import threading
+import time
+import fcntl
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from shared.config import Config
+from shared.metrics import metrics
+from shared.tracing import tracer
+from shared.replay import replay
+from shared.llm_gateway import get_gateway
+from shared.state import get_state_store
+from shared.singleflight import SingleFlight
 
 
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
 
-# Configure LlamaIndex settings
-Settings.llm = OpenAI(model=Config.DEFAULT_LLM_MODEL, api_key=Config.OPENAI_API_KEY)
-Settings.embed_model = OpenAIEmbedding(model=Config.DEFAULT_EMBEDDING_MODEL, api_key=Config.OPENAI_API_KEY)
+# Configure LlamaIndex settings (on the shared LLM gateway connection pool)
+Settings.llm = get_gateway().llamaindex_llm(model=Config.DEFAULT_LLM_MODEL)
+Settings.embed_model = get_gateway().llamaindex_embed_model(model=Config.DEFAULT_EMBEDDING_MODEL)
 Settings.node_parser = SentenceSplitter(chunk_size=1024, chunk_overlap=200)
 
 
@@ -47,26 +57,41 @@ class AffiliateKnowledgeBase:
     def __init__(self, storage_dir: str = None):
         self.storage_dir = storage_dir or Config.LLAMAINDEX_STORAGE_DIR
         self.index = None
+        self._persist_lock = threading.Lock()
+        self._state = get_state_store()
+        self._version_key = str(Path(self.storage_dir).resolve())
+        self._version = 0
+        self._synced_at = 0.0
+        self._context_flight = SingleFlight()
         self._initialize_storage()
     
     def _initialize_storage(self):
         """Initialize or load the vector store"""
         storage_path = Path(self.storage_dir)
+        storage_path.mkdir(parents=True, exist_ok=True)
         
-        if storage_path.exists() and (storage_path / "docstore.json").exists():
-            # Load existing index
-            storage_context = StorageContext.from_defaults(persist_dir=str(storage_path))
-            self.index = load_index_from_storage(storage_context)
-        else:
-            # Create new index with default documents
-            storage_path.mkdir(parents=True, exist_ok=True)
-            self._create_default_knowledge_base()
+        with self._write_lock():
+            if (storage_path / "docstore.json").exists():
+                # Load existing index
+                self._load_index()
+            else:
+                # Create new index with default documents
+                self._create_default_knowledge_base()
+    
+    def _load_index(self):
+        self._version = self._state.get("knowledge_base", self._version_key, 0)
+        storage_context = StorageContext.from_defaults(persist_dir=self.storage_dir)
+        self.index = load_index_from_storage(storage_context)
+        self._synced_at = time.monotonic()
     
     def _create_default_knowledge_base(self):
         """Create the default knowledge base with core SOPs"""
         default_docs = self._get_default_documents()
         self.index = VectorStoreIndex.from_documents(default_docs)
         self.index.storage_context.persist(persist_dir=self.storage_dir)
+        # A rebuilt store invalidates core contexts cached from a previous one
+        for category in {doc.metadata["category"] for doc in default_docs}:
+            self._touch_category(category)
     
     def _get_default_documents(self) -> List[Document]:
         """Get default SOP documents for the knowledge base"""
@@ -227,6 +252,42 @@ class AffiliateKnowledgeBase:
         
         return documents
     
+    # =========================================================================
+    # MULTI-WORKER CONSISTENCY
+    # =========================================================================
+    
+    @contextmanager
+    def _write_lock(self):
+        """
+        Serialize writes to the storage directory across threads and worker
+        processes, so concurrent adds cannot overwrite each other's documents
+        """
+        with self._persist_lock:
+            with open(Path(self.storage_dir) / ".write.lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _sync_due(self) -> bool:
+        return time.monotonic() - self._synced_at >= Config.KB_SYNC_INTERVAL_SECONDS
+    
+    def _sync_index(self):
+        """Reload the index if another worker has changed it since it was loaded"""
+        self._synced_at = time.monotonic()
+        if self._state.get("knowledge_base", self._version_key, 0) != self._version:
+            with self._write_lock():
+                self._load_index()
+    
+    def _maybe_sync(self):
+        if self.index and self._sync_due():
+            self._sync_index()
+    
+    async def _amaybe_sync(self):
+        if self.index and self._sync_due():
+            await asyncio.to_thread(self._sync_index)
+    
     # =========================================================================
     # PUBLIC API
     # =========================================================================
@@ -236,52 +297,171 @@ class AffiliateKnowledgeBase:
         if not self.index:
             return {"error": "Knowledge base not initialized"}
         
-        query_engine = self.index.as_query_engine(
+        self._maybe_sync()
+        
+        return replay.intercept_sync(
+            "kb_query",
+            {"question": question, "category": category},
+            lambda: self._run_query(question, category)
+        )
+    
+    async def aquery(self, question: str, category: Optional[str] = None) -> Dict[str, Any]:
+        """Query the knowledge base without blocking the event loop"""
+        if not self.index:
+            return {"error": "Knowledge base not initialized"}
+        
+        await self._amaybe_sync()
+        
+        return await replay.intercept(
+            "kb_query",
+            {"question": question, "category": category},
+            lambda: self._arun_query(question, category)
+        )
+    
+    def _query_engine(self):
+        return self.index.as_query_engine(
             similarity_top_k=5,
             response_mode="tree_summarize"
         )
-        
+    
+    @staticmethod
+    def _scoped_question(question: str, category: Optional[str]) -> str:
         # Add category filter if specified
-        if category:
-            question = f"[Category: {category}] {question}"
+        return f"[Category: {category}] {question}" if category else question
+    
+    @staticmethod
+    def _sources(nodes) -> List[Dict[str, Any]]:
+        return [
+            {
+                "title": node.metadata.get("title", "Unknown"),
+                "category": node.metadata.get("category", "Unknown"),
+                "score": node.score if hasattr(node, 'score') else None
+            }
+            for node in nodes
+        ]
+    
+    def _run_query(self, question: str, category: Optional[str] = None) -> Dict[str, Any]:
+        """Run retrieval and synthesis against the index"""
+        query_engine = self._query_engine()
         
-        response = query_engine.query(question)
+        with metrics.timer("kb_query", "query", category=category):
+            with tracer.span("kb:query", kind="kb", category=category):
+                response = query_engine.query(self._scoped_question(question, category))
         
-        return {
-            "answer": str(response),
-            "sources": [
-                {
-                    "title": node.metadata.get("title", "Unknown"),
-                    "category": node.metadata.get("category", "Unknown"),
-                    "score": node.score if hasattr(node, 'score') else None
-                }
-                for node in response.source_nodes
-            ]
-        }
+        return {"answer": str(response), "sources": self._sources(response.source_nodes)}
+    
+    async def _arun_query(self, question: str, category: Optional[str] = None) -> Dict[str, Any]:
+        """Run async retrieval and synthesis against the index"""
+        query_engine = self._query_engine()
+        
+        with metrics.timer("kb_query", "query", category=category):
+            with tracer.span("kb:query", kind="kb", category=category):
+                response = await query_engine.aquery(self._scoped_question(question, category))
+        
+        return {"answer": str(response), "sources": self._sources(response.source_nodes)}
+    
+    def retrieve(self, question: str, category: Optional[str] = None, top_k: int = 5) -> Dict[str, Any]:
+        """
+        Retrieval-only lookup: the top matching chunks as context, without the
+        LLM synthesis step of query()
+        """
+        if not self.index:
+            return {"context": "", "sources": []}
+        
+        self._maybe_sync()
+        
+        return replay.intercept_sync(
+            "kb_retrieve",
+            {"question": question, "category": category, "top_k": top_k},
+            lambda: self._run_retrieve(question, category, top_k)
+        )
+    
+    async def aretrieve(self, question: str, category: Optional[str] = None, top_k: int = 5) -> Dict[str, Any]:
+        """Retrieval-only lookup without blocking the event loop"""
+        if not self.index:
+            return {"context": "", "sources": []}
+        
+        await self._amaybe_sync()
+        
+        return await replay.intercept(
+            "kb_retrieve",
+            {"question": question, "category": category, "top_k": top_k},
+            lambda: self._arun_retrieve(question, category, top_k)
+        )
+    
+    def _run_retrieve(self, question: str, category: Optional[str], top_k: int) -> Dict[str, Any]:
+        """Run retrieval against the index"""
+        retriever = self.index.as_retriever(similarity_top_k=top_k)
+        
+        with metrics.timer("kb_query", "retrieve", category=category):
+            with tracer.span("kb:retrieve", kind="kb", category=category):
+                nodes = retriever.retrieve(self._scoped_question(question, category))
+        
+        return {"context": "\n\n".join(node.get_content() for node in nodes), "sources": self._sources(nodes)}
+    
+    async def _arun_retrieve(self, question: str, category: Optional[str], top_k: int) -> Dict[str, Any]:
+        """Run async retrieval against the index"""
+        retriever = self.index.as_retriever(similarity_top_k=top_k)
+        
+        with metrics.timer("kb_query", "retrieve", category=category):
+            with tracer.span("kb:retrieve", kind="kb", category=category):
+                nodes = await retriever.aretrieve(self._scoped_question(question, category))
+        
+        return {"context": "\n\n".join(node.get_content() for node in nodes), "sources": self._sources(nodes)}
+    
+    @staticmethod
+    def _document(title: str, content: str, category: str, doc_type: str) -> Document:
+        return Document(
+            text=content,
+            metadata={
+                "title": title,
+                "category": category,
+                "type": doc_type
+            }
+        )
+    
+    def _insert_nodes(self, nodes: List[Any], category: str):
+        """Insert embedded nodes on top of the latest stored index and publish the new version"""
+        with self._write_lock():
+            if self._state.get("knowledge_base", self._version_key, 0) != self._version:
+                self._load_index()
+            self.index.insert_nodes(nodes)
+            self.index.storage_context.persist(persist_dir=self.storage_dir)
+            self._version = self._state.incr("knowledge_base", self._version_key)
+        self._touch_category(category)
     
     def add_document(self, title: str, content: str, category: str, doc_type: str = "custom") -> bool:
         """Add a new document to the knowledge base"""
         try:
-            doc = Document(
-                text=content,
-                metadata={
-                    "title": title,
-                    "category": category,
-                    "type": doc_type
-                }
+            doc = self._document(title, content, category, doc_type)
+            nodes = Settings.node_parser.get_nodes_from_documents([doc])
+            embeddings = Settings.embed_model.get_text_embedding_batch(
+                [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
             )
-            
-            self.index.insert(doc)
-            self.index.storage_context.persist(persist_dir=self.storage_dir)
+            for node, embedding in zip(nodes, embeddings):
+                node.embedding = embedding
+            self._insert_nodes(nodes, category)
             return True
         except Exception as e:
             print(f"Error adding document: {e}")
             return False
     
-    def get_context_for_core(self, core: str) -> str:
-        """Get relevant context for a specific core"""
-        result = self.query(f"What are the best practices and SOPs for {core}?", category=core)
-        return result.get("answer", "")
+    async def aadd_document(self, title: str, content: str, category: str, doc_type: str = "custom") -> bool:
+        """Add a new document, embedding its chunks asynchronously"""
+        try:
+            doc = self._document(title, content, category, doc_type)
+            nodes = Settings.node_parser.get_nodes_from_documents([doc])
+            # Embed outside the write lock; insert_nodes keeps precomputed embeddings
+            embeddings = await Settings.embed_model.aget_text_embedding_batch(
+                [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+            )
+            for node, embedding in zip(nodes, embeddings):
+                node.embedding = embedding
+            await asyncio.to_thread(self._insert_nodes, nodes, category)
+            return True
+        except Exception as e:
+            print(f"Error adding document: {e}")
+            return False
     
     def list_documents(self) -> List[Dict[str, str]]:
         """List all documents in the knowledge base"""
@@ -297,6 +477,73 @@ class AffiliateKnowledgeBase:
                 "type": doc.metadata.get("type", "Unknown")
             })
         return docs
+    
+    # =========================================================================
+    # CORE CONTEXT CACHE
+    # =========================================================================
+    
+    def _category_key(self, category: str) -> str:
+        return f"{self._version_key}:{category}"
+    
+    def _touch_category(self, category: str):
+        """Invalidate the cached context of the core matching `category`"""
+        self._state.incr("knowledge_base_categories", self._category_key(category))
+    
+    def _cached_context(self, core: str) -> tuple:
+        """(cached context or None, current category version)"""
+        key = self._category_key(core)
+        version = self._state.get("knowledge_base_categories", key, 0)
+        cached = self._state.get("knowledge_base_core_context", key)
+        if cached is not None and cached.get("version") == version:
+            metrics.inc("kb_core_context_total", result="hit", core=core)
+            return cached["context"], version
+        metrics.inc("kb_core_context_total", result="miss", core=core)
+        return None, version
+    
+    def _store_context(self, core: str, version: int, result: Dict[str, Any]) -> str:
+        context = result.get("answer", "")
+        if context and "error" not in result:
+            self._state.set(
+                "knowledge_base_core_context",
+                self._category_key(core),
+                {"version": version, "context": context}
+            )
+        return context
+    
+    def get_context_for_core(self, core: str) -> str:
+        """
+        Get relevant context for a specific core.
+        Cached in the shared state store until a document in the core's
+        category is added.
+        """
+        cached, version = self._cached_context(core)
+        if cached is not None:
+            return cached
+        return self._store_context(core, version, self.query(self._core_question(core), category=core))
+    
+    async def aget_context_for_core(self, core: str) -> str:
+        """Get relevant context for a specific core without blocking the event loop"""
+        cached, version = await asyncio.to_thread(self._cached_context, core)
+        if cached is not None:
+            return cached
+        # Concurrent misses for one core share a single synthesis call
+        return await self._context_flight.do(core, lambda: self._refresh_context(core, version))
+    
+    async def _refresh_context(self, core: str, version: int) -> str:
+        result = await self.aquery(self._core_question(core), category=core)
+        return await asyncio.to_thread(self._store_context, core, version, result)
+    
+    async def warm_core_contexts(self, cores: List[str]) -> Dict[str, bool]:
+        """Precompute the context of each core; returns which ones succeeded"""
+        results = await asyncio.gather(
+            *(self.aget_context_for_core(core) for core in cores),
+            return_exceptions=True
+        )
+        return {core: isinstance(result, str) and bool(result) for core, result in zip(cores, results)}
+    
+    @staticmethod
+    def _core_question(core: str) -> str:
+        return f"What are the best practices and SOPs for {core}?"
 
 
 # =============================================================================
@@ -309,22 +556,26 @@ class PersonalizationEngine:
     Part of Core #8 - Personalization Engine.
     """
     
-    def __init__(self):
-        self.knowledge_base = AffiliateKnowledgeBase()
-        self.user_profiles = {}
+    def __init__(self, knowledge_base: AffiliateKnowledgeBase = None):
+        self.knowledge_base = knowledge_base or AffiliateKnowledgeBase()
+        # Profiles live in the shared state store so every API worker sees the same user
+        self.state = get_state_store()
+    
+    def _get_profile(self, user_id: str) -> Dict[str, Any]:
+        return self.state.get("user_profiles", user_id) or {
+            "preferences": {},
+            "history": [],
+            "interests": []
+        }
     
     async def personalize(self, request: str, user_id: str = "default") -> Dict[str, Any]:
         """Generate personalized recommendations based on user profile and request"""
         
         # Get user profile
-        profile = self.user_profiles.get(user_id, {
-            "preferences": {},
-            "history": [],
-            "interests": []
-        })
+        profile = await asyncio.to_thread(self._get_profile, user_id)
         
         # Query knowledge base for relevant context
-        context = self.knowledge_base.query(request)
+        context = await self.knowledge_base.aquery(request)
         
         # Generate personalized response
         response = {
@@ -337,7 +588,7 @@ class PersonalizationEngine:
         
         # Update user history
         profile["history"].append(request)
-        self.user_profiles[user_id] = profile
+        await asyncio.to_thread(self.state.set, "user_profiles", user_id, profile)
         
         return response
     
@@ -352,14 +603,9 @@ class PersonalizationEngine:
     
     def update_profile(self, user_id: str, preferences: Dict[str, Any]) -> bool:
         """Update user preferences"""
-        if user_id not in self.user_profiles:
-            self.user_profiles[user_id] = {
-                "preferences": {},
-                "history": [],
-                "interests": []
-            }
-        
-        self.user_profiles[user_id]["preferences"].update(preferences)
+        profile = self._get_profile(user_id)
+        profile["preferences"].update(preferences)
+        self.state.set("user_profiles", user_id, profile)
         return True
 
 
@@ -372,9 +618,9 @@ def create_knowledge_base(storage_dir: str = None) -> AffiliateKnowledgeBase:
     return AffiliateKnowledgeBase(storage_dir)
 
 
-def create_personalization_engine() -> PersonalizationEngine:
+def create_personalization_engine(knowledge_base: AffiliateKnowledgeBase = None) -> PersonalizationEngine:
     """Factory function to create the personalization engine"""
-    return PersonalizationEngine()
+    return PersonalizationEngine(knowledge_base)
 
 
 # =============================================================================
@@ -16,7 +16,17 @@ from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from openai import OpenAI
+from shared.llm_gateway import get_gateway
+from shared.cascade import cascade_models, min_confidence, min_length, require_sections
+
+
+# Heading each requested content type must produce (cascade validator)
+CONTENT_SECTIONS = {
+    "ad": "## Ad Copy",
+    "email": "## Email Sequence",
+    "social": "## Social Media Posts",
+    "video": "## Video Script"
+}
 
 
 def run_content_generation(product: str, price: float = None, niche: str = None, 
@@ -25,7 +35,7 @@ def run_content_generation(product: str, price: float = None, niche: str = None,
     Run the Content Generation analysis using OpenAI GPT-4o
     """
     
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    client = get_gateway()
     
     # Default content types
     if not content_types:
@@ -51,6 +61,7 @@ You understand the psychology of persuasion and create content that converts col
         content_requests.append("Create social posts for Twitter (3), LinkedIn (2), Instagram (2)")
     if "video" in content_types:
         content_requests.append("Create a 2-minute video script with hook, problem, solution, benefits, CTA")
+    sections = [CONTENT_SECTIONS[t] for t in content_types if t in CONTENT_SECTIONS]
 
     user_prompt = f"""Create marketing content for:
 Product: {product}
@@ -60,6 +71,8 @@ Product: {product}
 Content Requested:
 {chr(10).join(f'- {req}' for req in content_requests)}
 
+Start each content type with its own heading, exactly as written: {', '.join(sections)}
+
 For each piece of content, include:
 - The actual copy/script
 - Platform specifications
@@ -72,22 +85,27 @@ For each piece of content, include:
     print(f"Price: ${price or 'Not specified'}")
     print(f"Niche: {niche or 'General'}")
     print(f"Content Types: {', '.join(content_types)}")
-    print(f"LLM: OpenAI GPT-4o")
+    print(f"LLM: {' → '.join(cascade_models())}")
     print(f"Agents: Copywriter → Email Specialist → Social Media Expert → Video Scripter")
     print(f"{'='*50}\n")
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = client.chat_cascade(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.8,
-            max_tokens=3000
+            max_tokens=3000,
+            validators=[
+                require_sections(*sections),
+                min_length(500),
+                min_confidence()
+            ],
+            source="content_generation_runner"
         )
         
-        result = response.choices[0].message.content
+        result = response["content"]
         
         output = {
             "status": "success",
@@ -96,11 +114,12 @@ For each piece of content, include:
             "price": price,
             "niche": niche,
             "content_types": content_types,
-            "llm_used": "gpt-4o",
+            "llm_used": response["tier_model"],
+            "cascade_tier": response["tier"],
             "agents_executed": ["Copywriter", "Email Specialist", "Social Media Expert", "Video Scripter"],
             "timestamp": datetime.now().isoformat(),
             "result": result,
-            "tokens_used": response.usage.total_tokens
+            "tokens_used": response["total_tokens"]
         }
         
         if output_format == "json":
@@ -109,7 +128,7 @@ For each piece of content, include:
             print(f"📝 GENERATED CONTENT\n")
             print(result)
             print(f"\n{'='*50}")
-            print(f"✅ Content generation complete | Tokens used: {response.usage.total_tokens}")
+            print(f"✅ Content generation complete | Tokens used: {response['total_tokens']}")
         
         return output
         
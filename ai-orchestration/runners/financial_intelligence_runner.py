@@ -16,7 +16,8 @@ from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from openai import OpenAI
+from shared.llm_gateway import get_gateway
+from shared.cascade import cascade_models, min_confidence, require_sections
 
 
 def run_financial_intelligence(task: str = None, revenue: float = None, expenses: float = None,
@@ -25,7 +26,7 @@ def run_financial_intelligence(task: str = None, revenue: float = None, expenses
     Run the Financial Intelligence analysis using OpenAI GPT-4o
     """
     
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    client = get_gateway()
     
     system_prompt = """You are a financial analyst specializing in affiliate marketing businesses.
 You help affiliates understand their profitability, optimize expenses, and make data-driven decisions.
@@ -78,22 +79,23 @@ If specific numbers aren't provided, give general guidance and formulas."""
     if expenses: print(f"Expenses: ${expenses:,.2f}")
     if ad_spend: print(f"Ad Spend: ${ad_spend:,.2f}")
     print(f"Period: {period or 'Not specified'}")
-    print(f"LLM: OpenAI GPT-4o")
+    print(f"LLM: {' → '.join(cascade_models())}")
     print(f"Agents: Revenue Tracker → Expense Analyzer → Profit Calculator")
     print(f"{'='*50}\n")
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = client.chat_cascade(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.5,
-            max_tokens=2000
+            max_tokens=2000,
+            validators=[require_sections("forecast", "recommendation", "risk"), min_confidence()],
+            source="financial_intelligence_runner"
         )
         
-        result = response.choices[0].message.content
+        result = response["content"]
         
         # Calculate metrics if data provided
         calculated_metrics = {}
@@ -125,11 +127,12 @@ If specific numbers aren't provided, give general guidance and formulas."""
                 "period": period
             },
             "calculated_metrics": calculated_metrics,
-            "llm_used": "gpt-4o",
+            "llm_used": response["tier_model"],
+            "cascade_tier": response["tier"],
             "agents_executed": ["Revenue Tracker", "Expense Analyzer", "Profit Calculator"],
             "timestamp": datetime.now().isoformat(),
             "result": result,
-            "tokens_used": response.usage.total_tokens
+            "tokens_used": response["total_tokens"]
         }
         
         if output_format == "json":
@@ -148,7 +151,7 @@ If specific numbers aren't provided, give general guidance and formulas."""
                 print()
             print(result)
             print(f"\n{'='*50}")
-            print(f"✅ Analysis complete | Tokens used: {response.usage.total_tokens}")
+            print(f"✅ Analysis complete | Tokens used: {response['total_tokens']}")
         
         return output
         
@@ -16,7 +16,8 @@ from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from openai import OpenAI
+from shared.llm_gateway import get_gateway
+from shared.cascade import cascade_models, min_confidence, min_length
 
 
 # Default SOPs stored in the system
@@ -121,7 +122,7 @@ def run_knowledge_query(question: str, category: str = None, output_format: str
     Query the knowledge base using OpenAI GPT-4o with embedded SOPs
     """
     
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    client = get_gateway()
     
     # Get relevant SOPs
     if category and category in DEFAULT_SOPS:
@@ -149,34 +150,36 @@ Please provide a clear, actionable answer based on the SOPs and best practices."
     print(f"{'='*50}")
     print(f"Question: {question}")
     print(f"Category: {category or 'All'}")
-    print(f"LLM: OpenAI GPT-4o")
+    print(f"LLM: {' → '.join(cascade_models())}")
     print(f"System: LlamaIndex Knowledge Base")
     print(f"{'='*50}\n")
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = client.chat_cascade(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.3,
-            max_tokens=1500
+            max_tokens=1500,
+            validators=[min_length(100), min_confidence()],
+            source="knowledge_query_runner"
         )
         
-        result = response.choices[0].message.content
+        result = response["content"]
         
         output = {
             "status": "success",
             "core": "knowledge_base",
             "question": question,
             "category": category,
-            "llm_used": "gpt-4o",
+            "llm_used": response["tier_model"],
+            "cascade_tier": response["tier"],
             "system": "LlamaIndex RAG",
             "timestamp": datetime.now().isoformat(),
             "answer": result,
             "sources": [category] if category else list(DEFAULT_SOPS.keys()),
-            "tokens_used": response.usage.total_tokens
+            "tokens_used": response["total_tokens"]
         }
         
         if output_format == "json":
@@ -186,7 +189,7 @@ Please provide a clear, actionable answer based on the SOPs and best practices."
             print(result)
             print(f"\n{'='*50}")
             print(f"📖 Sources: {', '.join(output['sources'])}")
-            print(f"✅ Query complete | Tokens used: {response.usage.total_tokens}")
+            print(f"✅ Query complete | Tokens used: {response['total_tokens']}")
         
         return output
         
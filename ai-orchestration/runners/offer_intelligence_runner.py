@@ -17,7 +17,8 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from openai import OpenAI
+from shared.llm_gateway import get_gateway
+from shared.cascade import cascade_models, min_confidence, min_length, require_sections
 
 
 def run_offer_intelligence(task: str, niche: str = None, min_commission: int = None, output_format: str = "text"):
@@ -28,8 +29,8 @@ def run_offer_intelligence(task: str, niche: str = None, min_commission: int = N
     It uses OpenAI's API to simulate the CrewAI agent behavior.
     """
     
-    # Initialize OpenAI client
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    # Shared LLM gateway (pooled OpenAI connections)
+    client = get_gateway()
     
     # Build the prompt for the AI
     system_prompt = """You are an expert affiliate marketing analyst with 10+ years of experience.
@@ -66,22 +67,23 @@ Format your response clearly with sections."""
     print(f"Task: {task}")
     print(f"Niche: {niche or 'All'}")
     print(f"Min Commission: {min_commission or 'Any'}%")
-    print(f"LLM: OpenAI GPT-4o")
+    print(f"LLM: {' → '.join(cascade_models())}")
     print(f"Agents: Market Researcher → Competitor Analyst → Scoring Agent")
     print(f"{'='*50}\n")
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = client.chat_cascade(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.7,
-            max_tokens=2000
+            max_tokens=2000,
+            validators=[require_sections("recommendation"), min_length(300), min_confidence()],
+            source="offer_intelligence_runner"
         )
         
-        result = response.choices[0].message.content
+        result = response["content"]
         
         # Build output
         output = {
@@ -90,11 +92,12 @@ Format your response clearly with sections."""
             "task": task,
             "niche": niche,
             "min_commission": min_commission,
-            "llm_used": "gpt-4o",
+            "llm_used": response["tier_model"],
+            "cascade_tier": response["tier"],
             "agents_executed": ["Market Researcher", "Competitor Analyst", "Scoring Agent"],
             "timestamp": datetime.now().isoformat(),
             "result": result,
-            "tokens_used": response.usage.total_tokens
+            "tokens_used": response["total_tokens"]
         }
         
         if output_format == "json":
@@ -103,7 +106,7 @@ Format your response clearly with sections."""
             print(f"📊 ANALYSIS RESULTS\n")
             print(result)
             print(f"\n{'='*50}")
-            print(f"✅ Analysis complete | Tokens used: {response.usage.total_tokens}")
+            print(f"✅ Analysis complete | Tokens used: {response['total_tokens']}")
         
         return output
         
@@ -0,0 +1,171 @@
+"""
+Admission Control
+Bounded concurrency per endpoint and per core with a bounded wait queue in
+front of each limit. When the queue is full (or a caller has waited too
+long) the request is rejected at once with a Retry-After hint instead of
+piling onto the LLM quota and dragging every other request's latency up
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from shared.config import Config
+from shared.metrics import metrics
+from shared.tracing import tracer
+
+
+class AdmissionRejected(Exception):
+    """A request turned away because its gate is saturated"""
+
+    def __init__(self, gate: str, retry_after: float, reason: str = "queue_full"):
+        self.gate = gate
+        self.retry_after = retry_after
+        self.reason = reason
+        super().__init__(f"Overloaded: {gate} is at capacity ({reason}); retry in {retry_after:.0f}s")
+
+
+# =============================================================================
+# GATE
+# =============================================================================
+
+class AdmissionGate:
+    """
+    At most `limit` holders at once, at most `max_queue` callers waiting.
+
+    A caller arriving when the queue is full is rejected immediately; a
+    queued caller is rejected once it has waited `max_wait` seconds.
+    `max_queue=None` / `max_wait=None` queue without bound (for callers that
+    are already bounded elsewhere, such as job workers). Retry-After is
+    estimated from the average time a slot is held and the current backlog.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: Optional[int] = None,
+                 max_wait: Optional[float] = None, enabled: bool = True):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.enabled = enabled
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._hold_seconds = 1.0  # EWMA of slot hold time
+        self._admitted = 0
+        self._rejected = 0
+
+    def retry_after(self) -> float:
+        """Seconds until a slot is likely to be free for a new caller"""
+        estimate = self._hold_seconds * (self._waiting + 1) / self.limit
+        return float(min(max(1, math.ceil(estimate)), Config.ADMISSION_RETRY_AFTER_MAX_SECONDS))
+
+    async def acquire(self) -> float:
+        """
+        Wait for a slot and return the time it was granted (pass it to `release`).
+        Raises AdmissionRejected when the queue is full or the wait times out.
+        """
+        if not self.enabled:
+            return time.perf_counter()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        start = time.perf_counter()
+        if self._semaphore.locked() or self._waiting:
+            if self.max_queue is not None and self._waiting >= self.max_queue:
+                self._reject("queue_full")
+            self._waiting += 1
+            self._publish()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self._reject("wait_timeout")
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        granted = time.perf_counter()
+        self._in_flight += 1
+        self._admitted += 1
+        self._publish()
+        metrics.observe("admission_wait", self.name, granted - start)
+        tracer.annotate(admission_gate=self.name, admission_wait_ms=round((granted - start) * 1000, 1))
+        return granted
+
+    def release(self, granted: float):
+        if not self.enabled:
+            return
+        self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (time.perf_counter() - granted)
+        self._in_flight -= 1
+        self._semaphore.release()
+        self._publish()
+
+    @asynccontextmanager
+    async def slot(self):
+        granted = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(granted)
+
+    def _reject(self, reason: str):
+        self._rejected += 1
+        metrics.inc("admission_rejected_total", gate=self.name, reason=reason)
+        raise AdmissionRejected(self.name, self.retry_after(), reason)
+
+    def _publish(self):
+        metrics.set_gauge("admission_in_flight", self._in_flight, gate=self.name)
+        metrics.set_gauge("admission_queue_depth", self._waiting, gate=self.name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "avg_hold_seconds": round(self._hold_seconds, 3)
+        }
+
+
+# =============================================================================
+# CONTROLLER
+# =============================================================================
+
+class AdmissionController:
+    """
+    Gates for API endpoints (Config.ADMISSION_LIMITS) and for cores
+    (Config.ADMISSION_CORE_CONCURRENCY / ADMISSION_CORE_LIMITS), created on first use
+    """
+
+    def __init__(self, enabled: bool = None):
+        self.enabled = Config.ADMISSION_ENABLED if enabled is None else enabled
+        self._endpoints: Dict[str, AdmissionGate] = {}
+        self._cores: Dict[str, AdmissionGate] = {}
+
+    def endpoint(self, name: str) -> AdmissionGate:
+        gate = self._endpoints.get(name)
+        if gate is None:
+            limit, max_queue = Config.ADMISSION_LIMITS.get(name, Config.ADMISSION_DEFAULT_LIMIT)
+            gate = self._endpoints[name] = AdmissionGate(
+                name, limit, max_queue, Config.ADMISSION_MAX_WAIT_SECONDS, self.enabled
+            )
+        return gate
+
+    def core(self, core: str) -> AdmissionGate:
+        """Concurrency limit for one core; callers (job workers) are bounded already, so waits are unbounded"""
+        gate = self._cores.get(core)
+        if gate is None:
+            limit = Config.ADMISSION_CORE_LIMITS.get(core, Config.ADMISSION_CORE_CONCURRENCY)
+            gate = self._cores[core] = AdmissionGate(f"core:{core}", limit, enabled=self.enabled)
+        return gate
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "endpoints": {name: gate.get_stats() for name, gate in self._endpoints.items()},
+            "cores": {name: gate.get_stats() for name, gate in self._cores.items()}
+        }
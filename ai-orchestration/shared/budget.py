@@ -0,0 +1,330 @@
+"""
+Token Budgets and Cost Accounting
+Aggregates token usage and cost per core, per session and per day in a
+local SQLite ledger shared by every process. Soft budgets downgrade calls to
+a cheaper model; hard budgets reject them before they are sent
+"""
+
+import fnmatch
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.config import Config
+from shared.metrics import metrics
+
+
+# =============================================================================
+# EXCEPTIONS
+# =============================================================================
+
+class BudgetExceeded(Exception):
+    """Raised when a call would push a hard budget over its limit"""
+
+    def __init__(self, scope: str, key: str, unit: str, used: float, limit: float):
+        self.scope = scope
+        self.key = key
+        self.unit = unit
+        self.used = used
+        self.limit = limit
+        super().__init__(f"{scope} budget '{key}' exhausted: {used:g} of {limit:g} {unit}")
+
+
+# =============================================================================
+# ATTRIBUTION
+# =============================================================================
+
+_budget_scope: ContextVar[Dict[str, Optional[str]]] = ContextVar("budget_scope", default={})
+
+
+@contextmanager
+def budget_scope(core: str = None, session: str = None):
+    """Attribute LLM usage in this context to a core and/or session"""
+    scope = dict(_budget_scope.get())
+    if core:
+        scope["core"] = core
+    if session:
+        scope["session"] = session
+    token = _budget_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _budget_scope.reset(token)
+
+
+def current_scope() -> Dict[str, Optional[str]]:
+    """Core and session the current context is billed to"""
+    return _budget_scope.get()
+
+
+def token_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD using Config.MODEL_PRICING (USD per 1M input/output tokens)"""
+    pricing = Config.MODEL_PRICING.get(model)
+    if pricing is None:
+        # Dated snapshots ("gpt-4o-2024-08-06") are priced like their base model
+        pricing = next(
+            (
+                price for name, price in sorted(Config.MODEL_PRICING.items(), key=lambda item: -len(item[0]))
+                if model and model.startswith(name)
+            ),
+            (0.0, 0.0)
+        )
+    return (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1_000_000
+
+
+# =============================================================================
+# LEDGER
+# =============================================================================
+
+class BudgetLedger:
+    """
+    Usage ledger plus budget enforcement.
+
+    Every call is charged to the "daily" total and, when known, to its core
+    and session; every budget resets each day. Shared and synthetic session
+    ids (Config.BUDGET_UNTRACKED_SESSIONS, such as "default") get no session
+    budget, since unrelated callers add up under them. Limits come from
+    Config.TOKEN_BUDGETS, with per-core overrides in Config.CORE_TOKEN_BUDGETS;
+    each may set `soft_tokens`, `hard_tokens`, `soft_usd` and `hard_usd`.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = str(db_path or Config.BUDGET_DB_PATH)
+        self._local = threading.local()
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection, opened once and reused for every call"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS token_usage (
+                day TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                cost_usd REAL NOT NULL DEFAULT 0,
+                calls INTEGER NOT NULL DEFAULT 0,
+                updated REAL NOT NULL,
+                PRIMARY KEY (day, scope, key, model)
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS token_usage_scope ON token_usage (scope, key)")
+
+    # =========================================================================
+    # LIMITS
+    # =========================================================================
+
+    @staticmethod
+    def _targets(scope: Dict[str, Optional[str]]) -> List[Tuple[str, str]]:
+        targets = [("daily", "all")]
+        if scope.get("core"):
+            targets.append(("core", scope["core"]))
+        session = scope.get("session")
+        if session and not any(fnmatch.fnmatchcase(session, p) for p in Config.BUDGET_UNTRACKED_SESSIONS):
+            targets.append(("session", session))
+        return targets
+
+    @staticmethod
+    def limits_for(scope: str, key: str) -> Dict[str, float]:
+        limits = dict(Config.TOKEN_BUDGETS.get(scope, {}))
+        if scope == "core":
+            limits.update(Config.CORE_TOKEN_BUDGETS.get(key, {}))
+        return limits
+
+    def _used(self, conn: sqlite3.Connection, scope: str, key: str, day: str) -> Tuple[int, float]:
+        """(tokens, cost) charged on `day`"""
+        row = conn.execute(
+            """SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0), COALESCE(SUM(cost_usd), 0)
+               FROM token_usage WHERE day = ? AND scope = ? AND key = ?""",
+            (day, scope, key)
+        ).fetchone()
+        return int(row[0]), float(row[1])
+
+    def _over(self, conn: sqlite3.Connection, level: str, tokens: int, cost: float) -> Optional[BudgetExceeded]:
+        """First budget at `level` ("soft" or "hard") the projected usage would exceed"""
+        day = date.today().isoformat()
+        for scope, key in self._targets(current_scope()):
+            limits = self.limits_for(scope, key)
+            token_limit = limits.get(f"{level}_tokens")
+            usd_limit = limits.get(f"{level}_usd")
+            if token_limit is None and usd_limit is None:
+                continue
+            used_tokens, used_cost = self._used(conn, scope, key, day)
+            if token_limit is not None and used_tokens + tokens > token_limit:
+                return BudgetExceeded(scope, key, "tokens", used_tokens, token_limit)
+            if usd_limit is not None and used_cost + cost > usd_limit:
+                return BudgetExceeded(scope, key, "usd", round(used_cost, 4), usd_limit)
+        return None
+
+    # =========================================================================
+    # ENFORCEMENT
+    # =========================================================================
+
+    def check(self, model: str, prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+        """
+        Decide whether a pre-counted call may run.
+        Returns {"model", "downgraded", "reason"}; raises BudgetExceeded when a
+        hard budget would be exceeded even after downgrading.
+        """
+        decision = {"model": model, "downgraded": False, "reason": None}
+        tokens = prompt_tokens + completion_tokens
+        conn = self._connect()
+        soft = self._over(conn, "soft", tokens, token_cost(model, prompt_tokens, completion_tokens))
+        if soft is not None and model != Config.BUDGET_DOWNGRADE_MODEL:
+            decision = {"model": Config.BUDGET_DOWNGRADE_MODEL, "downgraded": True, "reason": str(soft)}
+            metrics.inc("budget_downgrades_total", scope=soft.scope, model=model)
+
+        chosen = decision["model"]
+        hard = self._over(conn, "hard", tokens, token_cost(chosen, prompt_tokens, completion_tokens))
+
+        if hard is not None:
+            metrics.inc("budget_rejections_total", scope=hard.scope)
+            raise hard
+        return decision
+
+    def ensure_available(self, expected_tokens: int = 0, model: str = None):
+        """
+        Raise BudgetExceeded if any hard budget for the current scope is already
+        spent, or would be by work expected to use `expected_tokens` of `model`
+        """
+        cost = token_cost(model or Config.DEFAULT_LLM_MODEL, expected_tokens, 0) if expected_tokens else 0.0
+        conn = self._connect()
+        hard = self._over(conn, "hard", expected_tokens, cost)
+        if hard is not None:
+            metrics.inc("budget_rejections_total", scope=hard.scope)
+            raise hard
+
+    # =========================================================================
+    # ACCOUNTING
+    # =========================================================================
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Charge a completed call to the current scope; returns its cost"""
+        if not prompt_tokens and not completion_tokens:
+            return 0.0
+
+        cost = token_cost(model, prompt_tokens, completion_tokens)
+        scope = current_scope()
+        day = date.today().isoformat()
+        now = time.time()
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for target, key in self._targets(scope):
+                conn.execute(
+                    """INSERT INTO token_usage
+                       (day, scope, key, model, prompt_tokens, completion_tokens, cost_usd, calls, updated)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+                       ON CONFLICT (day, scope, key, model) DO UPDATE SET
+                           prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                           completion_tokens = completion_tokens + excluded.completion_tokens,
+                           cost_usd = cost_usd + excluded.cost_usd,
+                           calls = calls + 1,
+                           updated = excluded.updated""",
+                    (day, target, key, model, prompt_tokens, completion_tokens, cost, now)
+                )
+            used = {
+                (target, key): self._used(conn, target, key, day)
+                for target, key in self._targets(scope) if target != "session"
+            }
+            conn.execute("COMMIT")
+        except Exception:
+            # The connection is reused, so never leave it inside a transaction
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        core = scope.get("core") or "unattributed"
+        metrics.inc("llm_cost_usd_total", cost, model=model, core=core)
+        for (target, key), (tokens, spent) in used.items():
+            metrics.set_gauge("budget_tokens_used", tokens, scope=target, key=key)
+            metrics.set_gauge("budget_cost_usd", round(spent, 6), scope=target, key=key)
+        return cost
+
+    def record_crew(self, crew_output: Any, model: str = None) -> float:
+        """Charge the token usage reported by a CrewAI kickoff"""
+        usage = getattr(crew_output, "token_usage", None)
+        return self.record(
+            model or Config.DEFAULT_LLM_MODEL,
+            getattr(usage, "prompt_tokens", 0) or 0,
+            getattr(usage, "completion_tokens", 0) or 0
+        )
+
+    # =========================================================================
+    # REPORTING
+    # =========================================================================
+
+    def get_usage(self, day: str = None, top_sessions: int = 20) -> Dict[str, Any]:
+        """Usage and remaining budget for a day (today by default)"""
+        day = day or date.today().isoformat()
+        conn = self._connect()
+        rows = conn.execute(
+            """SELECT scope, key, SUM(prompt_tokens), SUM(completion_tokens), SUM(cost_usd), SUM(calls)
+               FROM token_usage WHERE day = ? GROUP BY scope, key
+               ORDER BY SUM(prompt_tokens + completion_tokens) DESC""",
+            (day,)
+        ).fetchall()
+        by_model = conn.execute(
+            """SELECT model, SUM(prompt_tokens), SUM(completion_tokens), SUM(cost_usd)
+               FROM token_usage WHERE day = ? AND scope = 'daily' GROUP BY model""",
+            (day,)
+        ).fetchall()
+
+        report: Dict[str, Any] = {"day": day, "daily": {}, "cores": {}, "sessions": {}, "models": {}}
+        for scope, key, prompt, completion, cost, calls in rows:
+            entry = {
+                "prompt_tokens": prompt,
+                "completion_tokens": completion,
+                "total_tokens": prompt + completion,
+                "cost_usd": round(cost, 4),
+                "calls": calls,
+                "limits": self.limits_for(scope, key)
+            }
+            if scope == "daily":
+                report["daily"] = entry
+            elif scope == "core":
+                report["cores"][key] = entry
+            elif len(report["sessions"]) < top_sessions:
+                report["sessions"][key] = entry
+        for model, prompt, completion, cost in by_model:
+            report["models"][model] = {
+                "prompt_tokens": prompt,
+                "completion_tokens": completion,
+                "cost_usd": round(cost, 4)
+            }
+        return report
+
+
+# =============================================================================
+# SHARED INSTANCE
+# =============================================================================
+
+_ledger: Optional[BudgetLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> BudgetLedger:
+    """Get the process-wide ledger, creating it on first use"""
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = BudgetLedger()
+    return _ledger
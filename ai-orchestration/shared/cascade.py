@@ -0,0 +1,234 @@
+"""
+Model Cascade
+Answer with a cheap, fast model first and escalate to larger models only when
+a validator rejects the answer: malformed structure, missing sections or low
+self-reported confidence. The gateway runs the tiers; this module holds the
+validators and the bookkeeping shared by the sync and async paths
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from shared.config import Config
+from shared.metrics import metrics
+
+
+# A validator returns None when the answer is acceptable, else a short reason
+Validator = Callable[[str], Optional[str]]
+
+CONFIDENCE_INSTRUCTION = (
+    "After your answer, add a final line of the form 'CONFIDENCE: <number between 0 and 1>' "
+    "rating how confident you are that the answer is complete and correct."
+)
+CONFIDENCE_PATTERN = re.compile(r"^[\s*_#>-]*confidence[\s*_]*:[\s*_]*([0-9]*\.?[0-9]+)\s*(%?)[\s*_]*$", re.I | re.M)
+
+
+# =============================================================================
+# CONFIDENCE
+# =============================================================================
+
+def parse_confidence(text: str) -> Optional[float]:
+    """Read the self-reported confidence line (last one wins)"""
+    matches = CONFIDENCE_PATTERN.findall(text or "")
+    if not matches:
+        return None
+    value, percent = matches[-1]
+    confidence = float(value) / (100 if percent or float(value) > 1 else 1)
+    return max(0.0, min(1.0, confidence))
+
+
+def strip_confidence(text: str) -> str:
+    """Remove confidence lines so callers only see the answer"""
+    return CONFIDENCE_PATTERN.sub("", text or "").rstrip()
+
+
+class ConfidenceFilter:
+    """
+    Strip the confidence line from a streamed answer.
+    Text passes through as it arrives, except a line that may still turn
+    out to be the confidence line, which is held until it is complete.
+    """
+
+    def __init__(self):
+        self._line = ""
+        self._holding = True
+
+    def feed(self, token: str) -> str:
+        """Text from `token` that is safe to emit now"""
+        out = []
+        *complete, rest = token.split("\n")
+        for part in complete:
+            if self._holding:
+                line, self._line = self._line + part, ""
+                if not CONFIDENCE_PATTERN.match(line):
+                    out.append(line + "\n")
+            else:
+                out.append(part + "\n")
+            self._holding = True
+        if self._holding:
+            self._line += rest
+            if not _may_be_confidence(self._line):
+                out.append(self._line)
+                self._line, self._holding = "", False
+        else:
+            out.append(rest)
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Held text once the stream ends"""
+        line, self._line = self._line, ""
+        return "" if CONFIDENCE_PATTERN.match(line) else line
+
+
+def _may_be_confidence(line: str) -> bool:
+    """Whether a partial line could still become a confidence line"""
+    word = line.lstrip(" \t*_#>-").lower()
+    return word.startswith("confidence") or "confidence".startswith(word)
+
+
+def with_confidence_instruction(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Ask the model to self-report confidence, appending to the system prompt"""
+    messages = [dict(message) for message in messages]
+    for message in messages:
+        if message.get("role") == "system":
+            message["content"] = f"{message.get('content', '')}\n\n{CONFIDENCE_INSTRUCTION}"
+            return messages
+    return [{"role": "system", "content": CONFIDENCE_INSTRUCTION}] + messages
+
+
+# =============================================================================
+# VALIDATORS
+# =============================================================================
+
+def min_confidence(threshold: float = None) -> Validator:
+    """Reject answers whose self-reported confidence is missing or below `threshold`"""
+    threshold = threshold if threshold is not None else Config.CASCADE_MIN_CONFIDENCE
+
+    def validate(text: str) -> Optional[str]:
+        confidence = parse_confidence(text)
+        if confidence is None:
+            return "no confidence reported"
+        if confidence < threshold:
+            return f"confidence {confidence:.2f} < {threshold:.2f}"
+        return None
+
+    validate.needs_confidence = True
+    return validate
+
+
+def require_sections(*sections: str) -> Validator:
+    """Reject answers that do not mention every expected section heading"""
+    def validate(text: str) -> Optional[str]:
+        lowered = (text or "").lower()
+        missing = [section for section in sections if section.lower() not in lowered]
+        return f"missing sections: {', '.join(missing)}" if missing else None
+    return validate
+
+
+def require_json(keys: Iterable[str] = ()) -> Validator:
+    """Reject answers that are not a JSON object with the given keys"""
+    keys = list(keys)
+
+    def validate(text: str) -> Optional[str]:
+        body = strip_confidence(text).strip()
+        if body.startswith("```"):
+            body = body.strip("`").split("\n", 1)[-1]
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return "malformed JSON"
+        if not isinstance(data, dict):
+            return "JSON is not an object"
+        missing = [key for key in keys if key not in data]
+        return f"missing keys: {', '.join(missing)}" if missing else None
+    return validate
+
+
+def require_choice(choices: Iterable[str], normalize: Callable[[str], str] = None) -> Validator:
+    """Reject answers that are not exactly one of `choices`"""
+    choices = set(choices)
+    normalize = normalize or (lambda text: text.strip().lower())
+
+    def validate(text: str) -> Optional[str]:
+        value = normalize(text or "")
+        return None if value in choices else f"unexpected answer: {value[:40]}"
+    return validate
+
+
+def min_length(chars: int) -> Validator:
+    """Reject truncated or empty answers"""
+    def validate(text: str) -> Optional[str]:
+        length = len(strip_confidence(text).strip())
+        return f"answer too short ({length} chars)" if length < chars else None
+    return validate
+
+
+# =============================================================================
+# CASCADE BOOKKEEPING
+# =============================================================================
+
+def cascade_models(models: List[str] = None) -> List[str]:
+    """Tiers to try, cheapest first; only the largest when cascading is disabled"""
+    models = models or Config.CASCADE_MODELS
+    return list(models) if Config.CASCADE_ENABLED else list(models[-1:])
+
+
+def needs_confidence(validators: Iterable[Validator]) -> bool:
+    return any(getattr(validator, "needs_confidence", False) for validator in validators)
+
+
+def for_tiers(validators: Iterable[Validator], tiers: List[str]) -> List[Validator]:
+    """
+    Validators worth running for these tiers. With a single tier there is
+    nothing to escalate to, so confidence checks (and the instruction that
+    makes the model report it) are dropped
+    """
+    if len(tiers) > 1:
+        return list(validators)
+    return [validator for validator in validators if not getattr(validator, "needs_confidence", False)]
+
+
+def validate(text: str, validators: Iterable[Validator]) -> Optional[str]:
+    """First failure reason from the validators, or None"""
+    for validator in validators:
+        reason = validator(text)
+        if reason:
+            return reason
+    return None
+
+
+def finalize(attempts: List[Dict[str, Any]], result: Dict[str, Any], tier: int,
+             validated: bool, source: str) -> Dict[str, Any]:
+    """Merge attempt usage into the accepted result and record which tier answered"""
+    content = result.get("content", "")
+    final = {
+        **result,
+        "content": strip_confidence(content),
+        "confidence": parse_confidence(content),
+        "tier": tier,
+        "tier_model": attempts[-1]["model"],
+        "validated": validated,
+        "cascade": attempts,
+        # Escalated calls are billed for every tier that ran
+        "prompt_tokens": sum(a["prompt_tokens"] for a in attempts),
+        "completion_tokens": sum(a["completion_tokens"] for a in attempts),
+        "total_tokens": sum(a["total_tokens"] for a in attempts),
+        "latency_ms": round(sum(a["latency_ms"] for a in attempts), 1)
+    }
+    metrics.inc("llm_cascade_total", source=source or "cascade", tier=str(tier), model=final["tier_model"])
+    if tier > 0:
+        metrics.inc("llm_cascade_escalations_total", source=source or "cascade", tiers=str(tier))
+    return final
+
+
+def attempt_record(model: str, result: Dict[str, Any], reason: Optional[str]) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "passed": reason is None,
+        "reason": reason,
+        "prompt_tokens": result.get("prompt_tokens", 0),
+        "completion_tokens": result.get("completion_tokens", 0),
+        "total_tokens": result.get("total_tokens", 0),
+        "latency_ms": result.get("latency_ms", 0.0)
+    }
@@ -4,6 +4,8 @@ All frameworks share this configuration for consistency
 """
 
 import os
+import json
+from pathlib import Path
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
@@ -18,8 +20,16 @@ load_dotenv()
 class Config:
     """Central configuration for all AI frameworks"""
     
+    # Local state files (queues, quotas, caches) default to the package directory, not the
+    # working directory, so every process started from anywhere shares the same files
+    STATE_DIR = os.getenv("STATE_DIR", str(Path(__file__).resolve().parent.parent / ".state"))
+    
+    # Local OpenAI-compatible stub (benchmarks/openai_stub.py) for offline load testing
+    LLM_STUB_ENABLED = os.getenv("LLM_STUB_ENABLED", "false").lower() == "true"
+    LLM_STUB_URL = os.getenv("LLM_STUB_URL", "http://127.0.0.1:8999/v1")
+    
     # API Keys
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or ("stub" if LLM_STUB_ENABLED else None)
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
     
     # Database
@@ -31,11 +41,164 @@ class Config:
     DEFAULT_LLM_MODEL = "gpt-4o"
     DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
     
+    # LLM Gateway (pooled connections shared by every framework)
+    OPENAI_BASE_URL = LLM_STUB_URL if LLM_STUB_ENABLED else os.getenv("OPENAI_BASE_URL")
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+    LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    LLM_WARM_CONNECTIONS = int(os.getenv("LLM_WARM_CONNECTIONS", "2"))
+    
+    # LLM Rate Limiting (shared across processes through a local SQLite file)
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", os.path.join(STATE_DIR, "rate_limits.sqlite3"))
+    RATE_LIMIT_RPM = int(os.getenv("RATE_LIMIT_RPM", "500"))
+    RATE_LIMIT_TPM = int(os.getenv("RATE_LIMIT_TPM", "30000"))
+    RATE_LIMITS = json.loads(os.getenv("RATE_LIMITS_JSON", "{}"))  # {"model": [rpm, tpm]}
+    RATE_LIMIT_DEFAULT_COMPLETION_TOKENS = int(os.getenv("RATE_LIMIT_DEFAULT_COMPLETION_TOKENS", "512"))
+    RATE_LIMIT_DEFAULT_BACKOFF_SECONDS = float(os.getenv("RATE_LIMIT_DEFAULT_BACKOFF_SECONDS", "5"))
+    
+    # LLM Response Cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(STATE_DIR, "llm_cache.sqlite3"))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.5"))
+    LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "false").lower() == "true"
+    LLM_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+    LLM_CACHE_SEMANTIC_SCAN_LIMIT = int(os.getenv("LLM_CACHE_SEMANTIC_SCAN_LIMIT", "500"))
+    
+    # Model Cascade (opt-in; cheapest first, escalate when a validator rejects the answer)
+    CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+    CASCADE_MODELS = [m.strip() for m in os.getenv("CASCADE_MODELS", "gpt-4o-mini,gpt-4o").split(",") if m.strip()]
+    CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+    
+    # Hedged Requests (async LLM calls outliving a latency percentile get a duplicate)
+    HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    HEDGE_FALLBACK_MODEL = os.getenv("HEDGE_FALLBACK_MODEL", "")  # empty = same model
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.5"))
+    HEDGE_HISTORY = int(os.getenv("HEDGE_HISTORY", "200"))
+    HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", "0.1"))  # share of calls per window
+    HEDGE_MAX_EXTRA_TOKENS = int(os.getenv("HEDGE_MAX_EXTRA_TOKENS", "50000"))  # per window
+    HEDGE_WINDOW_SECONDS = float(os.getenv("HEDGE_WINDOW_SECONDS", "3600"))
+    
+    # Token Budgets and Cost Accounting
+    BUDGET_ENABLED = os.getenv("BUDGET_ENABLED", "true").lower() == "true"
+    BUDGET_DB_PATH = os.getenv("BUDGET_DB_PATH", os.path.join(STATE_DIR, "budgets.sqlite3"))
+    BUDGET_DOWNGRADE_MODEL = os.getenv("BUDGET_DOWNGRADE_MODEL", "gpt-4o-mini")
+    # Session ids shared by unrelated callers (defaults, per-core and batch placeholders) get no session budget
+    BUDGET_UNTRACKED_SESSIONS = [
+        s.strip() for s in os.getenv("BUDGET_UNTRACKED_SESSIONS", "default,core_*,batch_*,bench_*").split(",") if s.strip()
+    ]
+    # {"daily"|"core"|"session": {"soft_tokens", "hard_tokens", "soft_usd", "hard_usd"}}
+    TOKEN_BUDGETS = json.loads(os.getenv("TOKEN_BUDGETS_JSON", json.dumps({
+        "daily": {"soft_tokens": 4_000_000, "hard_tokens": 5_000_000, "soft_usd": 40, "hard_usd": 50},
+        "core": {"soft_tokens": 1_000_000, "hard_tokens": 1_500_000},
+        "session": {"soft_tokens": 200_000, "hard_tokens": 300_000}
+    })))
+    CORE_TOKEN_BUDGETS = json.loads(os.getenv("CORE_TOKEN_BUDGETS_JSON", "{}"))  # per-core overrides
+    # Crews call the API outside the gateway's per-call checks, so a kickoff is refused
+    # up front when its expected usage would overrun a hard budget
+    CREW_EXPECTED_TOKENS = int(os.getenv("CREW_EXPECTED_TOKENS", "20000"))
+    # USD per 1M tokens: [input, output]
+    MODEL_PRICING = json.loads(os.getenv("MODEL_PRICING_JSON", json.dumps({
+        "gpt-4o-mini": [0.15, 0.60],
+        "gpt-4o": [2.50, 10.00],
+        "text-embedding-3-small": [0.02, 0.0],
+        "text-embedding-3-large": [0.13, 0.0]
+    })))
+    
     # Framework Settings
     LANGGRAPH_CHECKPOINT_DIR = "./checkpoints"
     LLAMAINDEX_STORAGE_DIR = "./knowledge_base"
     CREWAI_VERBOSE = True
     AUTOGEN_CODE_EXECUTION = True
+    
+    # Request Coalescing
+    SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+    SINGLEFLIGHT_WINDOW_SECONDS = float(os.getenv("SINGLEFLIGHT_WINDOW_SECONDS", "5"))
+    
+    # Instrumentation
+    METRICS_WINDOW_SECONDS = float(os.getenv("METRICS_WINDOW_SECONDS", "300"))
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_EXPORTERS = [e.strip() for e in os.getenv("TRACE_EXPORTERS", "memory").split(",") if e.strip()]  # memory,file
+    TRACE_DIR = os.getenv("TRACE_DIR", os.path.join(STATE_DIR, "traces"))
+    TRACE_MAX_TRACES = int(os.getenv("TRACE_MAX_TRACES", "500"))
+    TRACE_MAX_SPANS_PER_TRACE = int(os.getenv("TRACE_MAX_SPANS_PER_TRACE", "2000"))
+    
+    # Request Deadlines
+    REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "600"))
+    DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+    
+    # Record / Replay (off | record | replay)
+    REPLAY_MODE = os.getenv("REPLAY_MODE", "off")
+    REPLAY_FIXTURE_DIR = os.getenv(
+        "REPLAY_FIXTURE_DIR", str(Path(__file__).resolve().parent.parent / "fixtures" / "replay")
+    )
+    REPLAY_LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+    REPLAY_LATENCY_SCALE = float(os.getenv("REPLAY_LATENCY_SCALE", "0"))
+    
+    # Batch Execution
+    BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+    
+    # Background Jobs (/execute runs on a persistent local queue)
+    JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(STATE_DIR, "jobs.sqlite3"))
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+    JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "1800"))
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+    JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+    JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "1000"))
+    
+    # Admission Control (bounded concurrency and wait queues; overload returns 429 + Retry-After)
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_LIMITS = json.loads(os.getenv("ADMISSION_LIMITS_JSON", json.dumps({
+        "chat": [16, 64],
+        "command": [4, 16],
+        "batch": [2, 4],
+        "knowledge": [16, 64]
+    })))  # {"endpoint": [concurrency, queue]}
+    ADMISSION_DEFAULT_LIMIT = [8, 32]
+    ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "10"))
+    ADMISSION_CORE_CONCURRENCY = int(os.getenv("ADMISSION_CORE_CONCURRENCY", "2"))
+    ADMISSION_CORE_LIMITS = json.loads(os.getenv("ADMISSION_CORE_LIMITS_JSON", "{}"))  # per-core overrides
+    ADMISSION_EXECUTE_MAX_PENDING = int(os.getenv("ADMISSION_EXECUTE_MAX_PENDING", "200"))  # queued /execute jobs
+    ADMISSION_RETRY_AFTER_MAX_SECONDS = float(os.getenv("ADMISSION_RETRY_AFTER_MAX_SECONDS", "60"))
+    
+    # Task History (in-memory ring buffer backed by an append-only SQLite log)
+    HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(STATE_DIR, "task_history.sqlite3"))
+    HISTORY_BUFFER_SIZE = int(os.getenv("HISTORY_BUFFER_SIZE", "1000"))
+    HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "500"))
+    
+    # Shared State (required once the API runs more than one worker or replica)
+    API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+    STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")  # sqlite | redis
+    STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join(STATE_DIR, "shared_state.sqlite3"))
+    STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0")
+    # memory | sqlite | postgres; memory checkpoints are only visible to one worker
+    CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite" if API_WORKERS > 1 else "memory")
+    CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", os.path.join(STATE_DIR, "checkpoints.sqlite3"))
+    CHECKPOINT_POSTGRES_URL = os.getenv("CHECKPOINT_POSTGRES_URL", DATABASE_URL)
+    KB_SYNC_INTERVAL_SECONDS = float(os.getenv("KB_SYNC_INTERVAL_SECONDS", "2"))
+    
+    # Startup (frameworks are built on first use; warm-up runs once the API is serving)
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_COMPONENTS = [
+        c.strip() for c in os.getenv("WARMUP_COMPONENTS", "gateway,langgraph,llamaindex,kb_context,autogen").split(",")
+        if c.strip()
+    ]
+
+
+# CrewAI reaches the API through LiteLLM, which takes its endpoint from the environment
+if Config.LLM_STUB_ENABLED:
+    os.environ["OPENAI_BASE_URL"] = Config.LLM_STUB_URL
+    os.environ["OPENAI_API_BASE"] = Config.LLM_STUB_URL
+    os.environ.setdefault("OPENAI_API_KEY", Config.OPENAI_API_KEY)
 
 
 # =============================================================================
@@ -0,0 +1,68 @@
+"""
+Crew Runner
+The one kickoff path shared by every CrewAI crew: per-task timing, deadline
+checks between agent steps, token budgets and the crew's trace span
+"""
+
+import asyncio
+import time
+from typing import Any, Dict
+
+from shared.config import Config
+from shared.metrics import CrewTaskTimer, record_crew_usage
+from shared.tracing import tracer
+from shared.deadline import current_deadline
+from shared.budget import get_ledger
+from shared.rate_limiter import get_rate_limiter
+
+
+async def kickoff_crew(crew: Any, core: str, request: str) -> Dict[str, Any]:
+    """Run a constructed crew on `request` and package its output"""
+    timer = CrewTaskTimer(core)
+    crew.task_callback = timer
+
+    # The crew runs in a worker thread; stop it between agent steps once
+    # the request deadline passes or the client goes away
+    stage = f"crew:{core}"
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.enter(stage)
+        crew.step_callback = lambda step: deadline.check(stage)
+
+    if Config.BUDGET_ENABLED:
+        await asyncio.to_thread(get_ledger().ensure_available, Config.CREW_EXPECTED_TOKENS)
+
+    with tracer.span(stage, kind="crew", core=core):
+        start = time.perf_counter()
+        timer.start()
+        try:
+            result = await crew.kickoff_async(inputs={"input": request})
+        except asyncio.CancelledError:
+            if deadline is not None:
+                deadline.cancel("cancelled")
+            raise
+        record_crew_usage(core, result, time.perf_counter() - start)
+    await asyncio.to_thread(_charge_usage, result)
+
+    return {
+        "core": core,
+        "status": "completed",
+        "result": result.model_dump() if hasattr(result, 'model_dump') else str(result)
+    }
+
+
+def _charge_usage(result: Any):
+    """
+    Charge a finished crew's token usage to the shared rate limiter and budgets.
+
+    CrewAI calls the API through LiteLLM, outside the gateway's HTTP hooks, so
+    crew calls are not throttled one by one; the core admission gate bounds
+    how many crews run at once instead. Charging the tokens afterwards still
+    draws down the shared quota, slowing every other caller accordingly.
+    """
+    usage = getattr(result, "token_usage", None)
+    total_tokens = getattr(usage, "total_tokens", 0) or 0
+    if Config.RATE_LIMIT_ENABLED and total_tokens:
+        get_rate_limiter(Config.DEFAULT_LLM_MODEL).reconcile(0, total_tokens)
+    if Config.BUDGET_ENABLED:
+        get_ledger().record_crew(result)
@@ -0,0 +1,134 @@
+"""
+Request Deadlines and Cooperative Cancellation
+A Deadline travels with each API request through a context variable so the
+orchestrator nodes, crews and knowledge base queries can stop work once the
+deadline passes or the HTTP client disconnects
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+
+# =============================================================================
+# EXCEPTIONS
+# =============================================================================
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of time or is cancelled by its client"""
+
+    def __init__(self, stage: str, reason: str = "deadline_exceeded"):
+        self.stage = stage
+        self.reason = reason
+        super().__init__(f"{reason} during stage '{stage}'")
+
+
+# =============================================================================
+# DEADLINE
+# =============================================================================
+
+class Deadline:
+    """
+    Absolute deadline for one request plus the stage currently executing.
+
+    Async work is cancelled by the API layer when the deadline passes; work
+    running in worker threads (crew kickoff, sync KB queries) calls `check()`
+    at safe points and stops cooperatively.
+    """
+
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        self.timeout_seconds = timeout_seconds
+        self.expires_at = time.monotonic() + timeout_seconds if timeout_seconds else None
+        self.stage = "queued"
+        self.cancel_reason: Optional[str] = None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None if unbounded"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def extend(self, other: Optional["Deadline"]):
+        """Push the expiry out far enough to cover `other` (None or unbounded removes the limit)"""
+        if other is None or other.expires_at is None:
+            self.expires_at = None
+        elif self.expires_at is not None:
+            self.expires_at = max(self.expires_at, other.expires_at)
+
+    def cancel(self, reason: str = "cancelled"):
+        """Mark the request as cancelled so cooperative checks stop work"""
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+
+    def check(self, stage: Optional[str] = None):
+        """Raise DeadlineExceeded if the request was cancelled or ran out of time"""
+        if self.cancel_reason:
+            raise DeadlineExceeded(stage or self.stage, self.cancel_reason)
+        if self.expired:
+            raise DeadlineExceeded(stage or self.stage)
+
+    def enter(self, stage: str):
+        """Record that a new stage is starting, failing fast if already out of time"""
+        self.stage = stage
+        self.check(stage)
+
+    async def run(self, awaitable: Awaitable[Any], stage: str) -> Any:
+        """Await `awaitable` as `stage`, bounded by the remaining time"""
+        try:
+            self.enter(stage)
+        except DeadlineExceeded:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise
+
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.remaining())
+        except asyncio.TimeoutError:
+            # Report the innermost stage that was running when time ran out
+            raise DeadlineExceeded(self.stage)
+        except asyncio.CancelledError:
+            self.cancel(self.cancel_reason or "cancelled")
+            raise
+
+
+# =============================================================================
+# CONTEXT PROPAGATION
+# =============================================================================
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Get the deadline of the request being served, if any"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def use_deadline(deadline: Deadline):
+    """Bind a deadline to the current context (inherited by tasks and to_thread)"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def enter_stage(stage: str):
+    """Mark a stage on the current deadline, raising if it has already passed"""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.enter(stage)
+
+
+async def with_deadline(awaitable: Awaitable[Any], stage: str) -> Any:
+    """Await under the current deadline, or unbounded if there is none"""
+    deadline = current_deadline()
+    if deadline is None:
+        return await awaitable
+    return await deadline.run(awaitable, stage)
@@ -0,0 +1,178 @@
+"""
+Hedged LLM Requests
+When an async LLM call runs longer than a percentile of recent latency for
+its model, a duplicate is sent to the same or a fallback model. The first
+good answer wins and the other call is cancelled. Hedges are capped by
+rate and by estimated extra tokens so tail-latency savings cannot run up
+the bill
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from shared.config import Config
+from shared.metrics import metrics, percentile
+from shared.rate_limiter import estimate_request_tokens
+
+
+class Hedger:
+    """
+    Per-model latency tracking plus the hedging policy.
+
+    A call is hedged after `percentile` of the last `history` latencies for
+    its model (never sooner than `min_delay` seconds, and only once
+    `min_samples` are known). Within each rolling `window_seconds`, hedges
+    may not exceed `max_rate` of calls nor `max_extra_tokens` estimated tokens.
+    """
+
+    def __init__(self, percentile_target: float = None, fallback_model: str = None,
+                 min_samples: int = None, min_delay: float = None, history: int = None,
+                 max_rate: float = None, max_extra_tokens: int = None, window_seconds: float = None):
+        self.percentile_target = percentile_target if percentile_target is not None else Config.HEDGE_PERCENTILE
+        self.fallback_model = fallback_model if fallback_model is not None else Config.HEDGE_FALLBACK_MODEL
+        self.min_samples = min_samples if min_samples is not None else Config.HEDGE_MIN_SAMPLES
+        self.min_delay = min_delay if min_delay is not None else Config.HEDGE_MIN_DELAY_SECONDS
+        self.history = history if history is not None else Config.HEDGE_HISTORY
+        self.max_rate = max_rate if max_rate is not None else Config.HEDGE_MAX_RATE
+        self.max_extra_tokens = (
+            max_extra_tokens if max_extra_tokens is not None else Config.HEDGE_MAX_EXTRA_TOKENS
+        )
+        self.window_seconds = window_seconds if window_seconds is not None else Config.HEDGE_WINDOW_SECONDS
+
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._calls: Deque[float] = deque()
+        self._hedges: Deque[Tuple[float, int]] = deque()
+        self._stats = {
+            "calls": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "primary_wins": 0,
+            "skipped_cap": 0,
+            "extra_tokens_estimated": 0
+        }
+
+    # =========================================================================
+    # POLICY
+    # =========================================================================
+
+    def observe(self, model: str, latency: float):
+        """Record a completed call's latency"""
+        with self._lock:
+            samples = self._latencies.get(model)
+            if samples is None:
+                samples = self._latencies[model] = deque(maxlen=self.history)
+            samples.append(latency)
+
+    def delay_for(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while latency history is too short"""
+        with self._lock:
+            samples = list(self._latencies.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, percentile(samples, self.percentile_target))
+
+    def _prune(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0] < cutoff:
+            self._calls.popleft()
+        while self._hedges and self._hedges[0][0] < cutoff:
+            self._hedges.popleft()
+
+    def _reserve(self, tokens: int) -> bool:
+        """Claim hedge capacity under the rate and extra-spend caps"""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            hedge_count = len(self._hedges) + 1
+            extra_tokens = sum(t for _, t in self._hedges) + tokens
+            if hedge_count > self.max_rate * max(len(self._calls), 1) or extra_tokens > self.max_extra_tokens:
+                self._stats["skipped_cap"] += 1
+                return False
+            self._hedges.append((now, tokens))
+            self._stats["hedged"] += 1
+            self._stats["extra_tokens_estimated"] += tokens
+            return True
+
+    # =========================================================================
+    # EXECUTION
+    # =========================================================================
+
+    async def run(self, request: Dict[str, Any],
+                  call: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run `call(request)`, hedging it if it outlives the latency percentile"""
+        model = request["model"]
+        with self._lock:
+            self._calls.append(time.monotonic())
+            self._stats["calls"] += 1
+
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(call(request))
+        delay = self.delay_for(model)
+        if delay is not None:
+            try:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+            except asyncio.CancelledError:
+                primary.cancel()
+                raise
+            if not done:
+                hedge_request = {**request, "model": self.fallback_model or model}
+                if self._reserve(estimate_request_tokens("chat/completions", hedge_request)):
+                    return await self._race(primary, model, hedge_request, call, start)
+
+        result = await primary
+        self.observe(model, time.perf_counter() - start)
+        return result
+
+    async def _race(self, primary: asyncio.Future, primary_model: str, hedge_request: Dict[str, Any],
+                    call: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], start: float) -> Dict[str, Any]:
+        """First good answer wins; the other call is cancelled"""
+        hedge = asyncio.ensure_future(call(hedge_request))
+        labels = {primary: "primary", hedge: "hedge"}
+        models = {primary: primary_model, hedge: hedge_request["model"]}
+        started = {primary: start, hedge: time.perf_counter()}
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    winner = labels[task]
+                    self._record_win(winner, models[task], time.perf_counter() - started[task])
+                    return {**task.result(), "hedged": True, "hedge_winner": winner}
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _record_win(self, winner: str, model: str, latency: float):
+        with self._lock:
+            self._stats[f"{winner}_wins"] += 1
+        metrics.inc("llm_hedge_total", winner=winner, model=model)
+        # The loser is cancelled, so only the winner's latency is known
+        self.observe(model, latency)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hedge rate, win split and current thresholds"""
+        with self._lock:
+            stats = dict(self._stats)
+            models = list(self._latencies)
+        thresholds = {}
+        for model in models:
+            delay = self.delay_for(model)
+            if delay is not None:
+                thresholds[model] = round(delay * 1000, 1)
+        calls = stats["calls"]
+        hedged = stats["hedged"]
+        return {
+            **stats,
+            "hedge_rate": round(hedged / calls, 4) if calls else 0.0,
+            "hedge_win_rate": round(stats["hedge_wins"] / hedged, 4) if hedged else 0.0,
+            "thresholds_ms": thresholds
+        }
@@ -0,0 +1,218 @@
+"""
+Task History Store
+Recent chat/task entries live in a fixed-size in-memory ring buffer; every
+entry is also appended to an on-disk log indexed by session, core and time,
+so memory stays constant while history remains queryable at any size
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from shared.config import Config
+from shared.metrics import metrics
+
+
+def encode_cursor(entry: Dict[str, Any]) -> str:
+    """Opaque pagination cursor pointing just past `entry`"""
+    return f"{entry['timestamp']!r}:{entry['id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    timestamp, entry_id = cursor.split(":", 1)
+    return float(timestamp), entry_id
+
+
+# =============================================================================
+# HISTORY STORE
+# =============================================================================
+
+class TaskHistory:
+    """
+    Ring buffer of the last `buffer_size` entries plus an append-only SQLite log.
+
+    Appends never block the caller: entries are handed to a writer thread that
+    inserts them in batches. Queries page newest-first with a keyset cursor,
+    so each page costs an index seek regardless of how large the log grows.
+    """
+
+    def __init__(self, db_path: str = None, buffer_size: int = None, batch_size: int = 500):
+        self.db_path = str(db_path or Config.HISTORY_DB_PATH)
+        self.buffer_size = buffer_size if buffer_size is not None else Config.HISTORY_BUFFER_SIZE
+        self.batch_size = batch_size
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=self.buffer_size)
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._ensure_schema()
+        self._writer = threading.Thread(target=self._write_loop, name="task-history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _ensure_schema(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS task_history (
+                    id TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    session_id TEXT,
+                    core TEXT,
+                    entry TEXT NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS task_history_time ON task_history (timestamp, id)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS task_history_session ON task_history (session_id, timestamp, id)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS task_history_core ON task_history (core, timestamp, id)")
+        finally:
+            conn.close()
+
+    # =========================================================================
+    # WRITE
+    # =========================================================================
+
+    def append(self, session_id: Optional[str], core: Optional[str], **fields) -> Dict[str, Any]:
+        """Record an entry; it is visible in memory at once and on disk shortly after"""
+        entry = {
+            "id": uuid.uuid4().hex,
+            "timestamp": time.time(),
+            "session_id": session_id,
+            "core": core,
+            **fields
+        }
+        with self._lock:
+            self._recent.append(entry)
+        self._pending.put(entry)
+        return entry
+
+    def _write_loop(self):
+        while True:
+            entry = self._pending.get()
+            batch = [entry]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            entries = [e for e in batch if e is not None]
+            try:
+                if entries:
+                    self._insert(entries)
+            except Exception as e:
+                metrics.inc("task_history_write_errors_total")
+                print(f"Error writing task history: {e}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+            if None in batch:
+                return
+
+    def _insert(self, entries: List[Dict[str, Any]]):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO task_history (id, timestamp, session_id, core, entry) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (e["id"], e["timestamp"], e["session_id"], e["core"], json.dumps(e, default=str))
+                    for e in entries
+                ]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Block until every appended entry is on disk"""
+        self._pending.join()
+
+    def close(self):
+        """Flush pending entries and stop the writer thread"""
+        if self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+
+    # =========================================================================
+    # READ
+    # =========================================================================
+
+    def recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Newest entries recorded by this process, from memory"""
+        with self._lock:
+            entries = list(self._recent)[-limit:] if limit > 0 else []
+        return entries[::-1]
+
+    def query(self, session_id: str = None, core: str = None, since: float = None, until: float = None,
+              limit: int = 50, cursor: str = None) -> Dict[str, Any]:
+        """
+        One page of entries, newest first.
+        Pass the returned `next_cursor` back to fetch the following page.
+        """
+        self.flush()
+
+        clauses, params = [], []
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if core is not None:
+            clauses.append("core = ?")
+            params.append(core)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if cursor:
+            timestamp, entry_id = decode_cursor(cursor)
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend([timestamp, timestamp, entry_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT entry FROM task_history {where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        entries = [json.loads(row[0]) for row in rows[:limit]]
+        return {
+            "entries": entries,
+            "next_cursor": encode_cursor(entries[-1]) if len(rows) > limit else None
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Buffer occupancy and (approximate) size of the on-disk log"""
+        conn = self._connect()
+        try:
+            # MAX(rowid) stays O(1) on an append-only table where COUNT(*) would scan it
+            total = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM task_history").fetchone()[0]
+        finally:
+            conn.close()
+        with self._lock:
+            buffered = len(self._recent)
+        return {
+            "buffered": buffered,
+            "buffer_size": self.buffer_size,
+            "pending_writes": self._pending.qsize(),
+            "stored": total
+        }
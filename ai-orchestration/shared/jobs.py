@@ -0,0 +1,484 @@
+"""
+Background Jobs
+Persistent local job queue for long-running work such as core executions.
+Jobs are stored in SQLite so every process on the host shares one queue and
+queued work survives restarts; a pool of asyncio workers claims them by
+priority, reports progress and keeps finished results for a retention period
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from shared.config import Config, TaskStatus
+from shared.deadline import Deadline, DeadlineExceeded, use_deadline
+from shared.metrics import metrics
+from shared.tracing import tracer
+
+
+# A handler receives the job payload and returns a JSON-serializable result
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+# =============================================================================
+# PROGRESS REPORTING
+# =============================================================================
+
+_current_job: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_job", default=None)
+
+
+@contextmanager
+def job_context(queue: "JobQueue", job_id: str, attempt: int):
+    """Bind a running job to the current context so its work can report progress"""
+    token = _current_job.set({"queue": queue, "id": job_id, "attempt": attempt})
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+async def report_progress(progress: float, stage: str = None):
+    """Record progress (0-1) for the job being executed; a no-op outside jobs"""
+    job = _current_job.get()
+    if job is not None:
+        await asyncio.to_thread(job["queue"].update_progress, job["id"], job["attempt"], progress, stage)
+
+
+# =============================================================================
+# QUEUE
+# =============================================================================
+
+class JobQueue:
+    """
+    SQLite-backed priority queue.
+
+    Higher `priority` runs first, then oldest first. Running jobs refresh a
+    heartbeat; jobs whose heartbeat is older than `stale_seconds` (their
+    worker died) are requeued. Every claim bumps the job's attempt number,
+    and heartbeats, progress and results only apply for the current attempt,
+    so a worker whose job was requeued and claimed again cannot overwrite
+    the new run. Finished jobs are kept for `retention_seconds` and at most
+    `max_retained` of them.
+    """
+
+    def __init__(self, db_path: str = None, stale_seconds: float = None,
+                 retention_seconds: float = None, max_retained: int = None):
+        self.db_path = str(db_path or Config.JOBS_DB_PATH)
+        self.stale_seconds = stale_seconds if stale_seconds is not None else Config.JOB_STALE_SECONDS
+        self.retention_seconds = (
+            retention_seconds if retention_seconds is not None else Config.JOB_RETENTION_SECONDS
+        )
+        self.max_retained = max_retained if max_retained is not None else Config.JOB_MAX_RETAINED
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _ensure_schema(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    stage TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    heartbeat REAL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished)")
+        finally:
+            conn.close()
+
+    # =========================================================================
+    # PRODUCER
+    # =========================================================================
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: int = 0) -> str:
+        """Queue a job and return its id"""
+        job_id = f"job_{uuid.uuid4().hex}"
+        conn = self._connect()
+        try:
+            conn.execute(
+                """INSERT INTO jobs (id, kind, payload, priority, status, created)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (job_id, kind, json.dumps(payload, default=str), priority, TaskStatus.PENDING.value, time.time())
+            )
+        finally:
+            conn.close()
+        metrics.inc("jobs_submitted_total", kind=kind)
+        return job_id
+
+    def pending_count(self) -> int:
+        """Number of jobs waiting to be claimed"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (TaskStatus.PENDING.value,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status, progress and (once finished) result of a job"""
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            position = None
+            if row["status"] == TaskStatus.PENDING.value:
+                position = conn.execute(
+                    """SELECT COUNT(*) FROM jobs WHERE status = ?
+                       AND (priority > ? OR (priority = ? AND created < ?))""",
+                    (TaskStatus.PENDING.value, row["priority"], row["priority"], row["created"])
+                ).fetchone()[0]
+        finally:
+            conn.close()
+        return self._to_dict(row, position)
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, position: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "priority": row["priority"],
+            "progress": row["progress"],
+            "stage": row["stage"],
+            "queue_position": position,
+            "payload": json.loads(row["payload"]),
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created": row["created"],
+            "started": row["started"],
+            "finished": row["finished"]
+        }
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet"""
+        conn = self._connect()
+        try:
+            cancelled = conn.execute(
+                "UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                (TaskStatus.CANCELLED.value, time.time(), job_id, TaskStatus.PENDING.value)
+            ).rowcount
+        finally:
+            conn.close()
+        return bool(cancelled)
+
+    # =========================================================================
+    # CONSUMER
+    # =========================================================================
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the highest-priority pending job, or None; `attempts` is this claim's attempt"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """SELECT * FROM jobs WHERE status = ?
+                   ORDER BY priority DESC, created LIMIT 1""",
+                (TaskStatus.PENDING.value,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    """UPDATE jobs SET status = ?, started = ?, heartbeat = ?, attempts = attempts + 1
+                       WHERE id = ?""",
+                    (TaskStatus.RUNNING.value, now, now, row["id"])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = self._to_dict(row)
+        job["attempts"] += 1
+        return job
+
+    def update_progress(self, job_id: str, attempt: int, progress: float, stage: str = None) -> bool:
+        """Record progress and refresh the heartbeat of a running job; False once `attempt` lost it"""
+        conn = self._connect()
+        try:
+            return bool(conn.execute(
+                """UPDATE jobs SET progress = MAX(progress, ?), stage = COALESCE(?, stage), heartbeat = ?
+                   WHERE id = ? AND attempts = ? AND status = ?""",
+                (max(0.0, min(1.0, progress)), stage, time.time(), job_id, attempt, TaskStatus.RUNNING.value)
+            ).rowcount)
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str, attempt: int) -> bool:
+        """Refresh the heartbeat of a running job; False once `attempt` lost it"""
+        conn = self._connect()
+        try:
+            return bool(conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND attempts = ? AND status = ?",
+                (time.time(), job_id, attempt, TaskStatus.RUNNING.value)
+            ).rowcount)
+        finally:
+            conn.close()
+
+    def finish(self, job_id: str, attempt: int, status: str, result: Dict[str, Any] = None,
+               error: str = None) -> bool:
+        """Store the outcome of a job; False (nothing stored) once `attempt` lost it"""
+        conn = self._connect()
+        try:
+            return bool(conn.execute(
+                """UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?,
+                       progress = CASE WHEN ? = ? THEN 1.0 ELSE progress END
+                   WHERE id = ? AND attempts = ? AND status = ?""",
+                (
+                    status,
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    time.time(),
+                    status, TaskStatus.COMPLETED.value,
+                    job_id, attempt, TaskStatus.RUNNING.value
+                )
+            ).rowcount)
+        finally:
+            conn.close()
+
+    def requeue_stale(self) -> int:
+        """Return jobs whose worker stopped sending heartbeats to the queue"""
+        conn = self._connect()
+        try:
+            requeued = conn.execute(
+                """UPDATE jobs SET status = ?, stage = 'requeued'
+                   WHERE status = ? AND heartbeat < ?""",
+                (TaskStatus.PENDING.value, TaskStatus.RUNNING.value, time.time() - self.stale_seconds)
+            ).rowcount
+        finally:
+            conn.close()
+        if requeued:
+            metrics.inc("jobs_requeued_total", requeued)
+        return requeued
+
+    def prune(self) -> int:
+        """Drop finished jobs past retention, keeping at most `max_retained`"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = conn.execute(
+                "DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?",
+                (time.time() - self.retention_seconds,)
+            ).rowcount
+            overflow = conn.execute(
+                """DELETE FROM jobs WHERE id IN (
+                       SELECT id FROM jobs WHERE finished IS NOT NULL
+                       ORDER BY finished DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_retained,)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return expired + overflow
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Job counts by status"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        counts = {status.value: 0 for status in TaskStatus}
+        counts.update(dict(rows))
+        return counts
+
+
+# =============================================================================
+# WORKER POOL
+# =============================================================================
+
+class JobWorkerPool:
+    """
+    Asyncio workers executing queued jobs with registered handlers.
+
+    Workers wake on `notify()` for jobs submitted in this process and poll the
+    queue every `poll_interval` seconds for jobs submitted elsewhere. Each job
+    runs under a Deadline of `timeout_seconds` (or its payload's
+    `timeout_seconds`) and refreshes its heartbeat while it runs.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler], workers: int = None,
+                 poll_interval: float = None, timeout_seconds: float = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers if workers is not None else Config.JOB_WORKERS
+        self.poll_interval = poll_interval if poll_interval is not None else Config.JOB_POLL_INTERVAL_SECONDS
+        self.timeout_seconds = timeout_seconds if timeout_seconds is not None else Config.JOB_TIMEOUT_SECONDS
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._waiters: Dict[str, asyncio.Event] = {}  # job id -> set when this process finishes it
+        self._active = 0
+        self._avg_duration = 30.0  # EWMA of job run time, for queue wait estimates
+        self._lock = threading.Lock()
+
+    async def start(self):
+        """Requeue orphaned jobs and start the workers and the janitor"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self.queue.requeue_stale)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+
+    async def stop(self):
+        """Stop the workers; interrupted jobs are requeued once their heartbeat goes stale"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake an idle worker after a local submit"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker(self):
+        while True:
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _janitor(self):
+        """Requeue jobs of dead workers and apply result retention"""
+        while True:
+            await asyncio.sleep(max(self.queue.stale_seconds / 2, self.poll_interval))
+            await asyncio.to_thread(self.queue.requeue_stale)
+            await asyncio.to_thread(self.queue.prune)
+
+    async def _run(self, job: Dict[str, Any]):
+        job_id, kind, payload, attempt = job["id"], job["kind"], job["payload"], job["attempts"]
+        handler = self.handlers.get(kind)
+        if handler is None:
+            error = f"No handler for job kind: {kind}"
+            await asyncio.to_thread(self.queue.finish, job_id, attempt, TaskStatus.FAILED.value, None, error)
+            self._finished(job_id)
+            return
+
+        deadline = Deadline(payload.get("timeout_seconds") or self.timeout_seconds)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, attempt, deadline))
+        status, result, error = TaskStatus.COMPLETED.value, None, None
+        start = time.perf_counter()
+        with self._lock:
+            self._active += 1
+        try:
+            # Continue the submitting request's trace, if it recorded one
+            span = tracer.span(
+                f"job:{kind}", kind="job", parent=payload.get("trace_context"), job_id=job_id,
+                attempt=attempt, queue_wait_ms=round((time.time() - job["created"]) * 1000, 1)
+            )
+            with use_deadline(deadline), job_context(self.queue, job_id, attempt), span:
+                result = await deadline.run(handler(payload), stage="job")
+            if isinstance(result, dict) and result.get("error"):
+                status, error = TaskStatus.FAILED.value, str(result["error"])
+        except DeadlineExceeded as e:
+            status, error = TaskStatus.FAILED.value, str(e)
+        except asyncio.CancelledError:
+            # Worker shutdown: leave the job running so it is requeued once stale
+            raise
+        except Exception as e:
+            status, error = TaskStatus.FAILED.value, str(e)
+        finally:
+            heartbeat.cancel()
+            with self._lock:
+                self._active -= 1
+
+        if not await asyncio.to_thread(self.queue.finish, job_id, attempt, status, result, error):
+            # Requeued while it ran (e.g. a stalled heartbeat); the new attempt owns the job now
+            status = "superseded"
+        self._finished(job_id)
+        duration = time.perf_counter() - start
+        with self._lock:
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+        metrics.observe("job", kind, duration, status=status)
+        metrics.inc("jobs_total", kind=kind, status=status)
+
+    def _finished(self, job_id: str):
+        waiter = self._waiters.get(job_id)
+        if waiter is not None:
+            waiter.set()
+
+    async def wait(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Wait until a job has finished and return it (None for unknown jobs).
+        Jobs finished by this process wake the waiter at once; jobs claimed by
+        another process are polled every `poll_interval` seconds.
+        """
+        waiter = self._waiters.setdefault(job_id, asyncio.Event())
+        try:
+            while True:
+                job = await asyncio.to_thread(self.queue.get, job_id)
+                if job is None or job["finished"] is not None:
+                    return job
+                try:
+                    await asyncio.wait_for(waiter.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters.pop(job_id, None)
+
+    async def _heartbeat(self, job_id: str, attempt: int, deadline: Deadline):
+        """Keep the claim alive; stop the run between steps once another attempt took the job over"""
+        interval = max(self.queue.stale_seconds / 4, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self.queue.heartbeat, job_id, attempt):
+                deadline.cancel("superseded")
+                return
+
+    def estimate_wait(self, pending: int) -> float:
+        """Seconds until a job queued behind `pending` others is likely to start"""
+        with self._lock:
+            avg_duration = self._avg_duration
+        return avg_duration * (pending + 1) / self.workers
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = self._active
+            avg_duration = self._avg_duration
+        return {
+            "workers": self.workers,
+            "active": active,
+            "avg_duration_seconds": round(avg_duration, 2),
+            **self.queue.get_stats()
+        }
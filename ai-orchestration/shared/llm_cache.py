@@ -0,0 +1,253 @@
+"""
+LLM Response Cache
+Disk-backed cache for chat completions shared by every process on the host.
+Exact matches key on (model, messages, temperature, max_tokens); an opt-in
+semantic mode also serves a cached answer when the prompt embedding is close
+enough to one already answered under the same model and parameters
+"""
+
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from shared.config import Config
+from shared.metrics import metrics
+
+
+# Request fields that change the completion and therefore belong in the key
+KEY_FIELDS = ("model", "messages", "temperature", "max_tokens", "top_p", "response_format", "seed")
+
+# Requests using these fields have side effects or non-text output; never cache them
+UNCACHEABLE_FIELDS = ("tools", "functions", "n", "logprobs")
+
+
+def _digest(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def cache_key(request: Dict[str, Any]) -> str:
+    """Exact-match key for a chat request"""
+    return _digest({field: request.get(field) for field in KEY_FIELDS})
+
+
+def scope_key(request: Dict[str, Any]) -> str:
+    """
+    Key for everything except the final user message. Semantic matches are
+    only considered between requests sharing a scope, so a similar question
+    asked under a different system prompt or model never matches.
+    """
+    messages = request.get("messages", [])
+    scoped = {field: request.get(field) for field in KEY_FIELDS if field != "messages"}
+    scoped["messages"] = messages[:-1]
+    return _digest(scoped)
+
+
+def prompt_text(request: Dict[str, Any]) -> str:
+    """Text of the final message, used for semantic matching"""
+    messages = request.get("messages", [])
+    if not messages:
+        return ""
+    content = messages[-1].get("content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class LLMResponseCache:
+    """
+    Bounded on-disk response cache.
+
+    Entries expire after `ttl_seconds`; once more than `max_entries` are stored
+    the least recently used ones are evicted. Requests above `max_temperature`
+    are skipped since their outputs are meant to vary. The cache never calls a
+    model itself: callers pass the prompt embedding when semantic mode is on,
+    so it can be exercised offline with any vectors.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl_seconds: float = None,
+                 max_temperature: float = None, semantic: bool = None,
+                 similarity_threshold: float = None, semantic_scan_limit: int = None):
+        self.path = str(path or Config.LLM_CACHE_PATH)
+        self.max_entries = max_entries if max_entries is not None else Config.LLM_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.LLM_CACHE_TTL_SECONDS
+        self.max_temperature = (
+            max_temperature if max_temperature is not None else Config.LLM_CACHE_MAX_TEMPERATURE
+        )
+        self.semantic = semantic if semantic is not None else Config.LLM_CACHE_SEMANTIC
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None
+            else Config.LLM_CACHE_SIMILARITY_THRESHOLD
+        )
+        self.semantic_scan_limit = (
+            semantic_scan_limit if semantic_scan_limit is not None else Config.LLM_CACHE_SEMANTIC_SCAN_LIMIT
+        )
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "skipped": 0, "stores": 0, "evictions": 0}
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection, opened once and reused for every call"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                embedding TEXT,
+                response TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_scope ON llm_cache (scope, last_access)")
+        conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_access ON llm_cache (last_access)")
+
+    # =========================================================================
+    # POLICY
+    # =========================================================================
+
+    def cacheable(self, request: Dict[str, Any]) -> bool:
+        """Whether a request may be served from or stored in the cache"""
+        if request.get("stream") or any(request.get(field) for field in UNCACHEABLE_FIELDS):
+            return False
+        temperature = request.get("temperature")
+        return temperature is None or temperature <= self.max_temperature
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+        metrics.inc("llm_response_cache_total", result=stat)
+
+    # =========================================================================
+    # LOOKUP / STORE
+    # =========================================================================
+
+    def get(self, request: Dict[str, Any], embedding: List[float] = None) -> Optional[Dict[str, Any]]:
+        """Return a cached response for the request, or None"""
+        if not self.cacheable(request):
+            self._count("skipped")
+            return None
+
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT key, response FROM llm_cache WHERE key = ? AND created > ?",
+            (cache_key(request), now - self.ttl_seconds)
+        ).fetchone()
+        stat = "hits"
+        if row is None and self.semantic and embedding is not None:
+            row = self._nearest(conn, scope_key(request), embedding, now)
+            stat = "semantic_hits"
+        if row is None:
+            self._count("misses")
+            return None
+        conn.execute(
+            "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?",
+            (now, row[0])
+        )
+
+        self._count(stat)
+        return json.loads(row[1])
+
+    def _nearest(self, conn: sqlite3.Connection, scope: str, embedding: List[float], now: float):
+        """Most similar live entry in the same scope above the threshold"""
+        rows = conn.execute(
+            """SELECT key, response, embedding FROM llm_cache
+               WHERE scope = ? AND embedding IS NOT NULL AND created > ?
+               ORDER BY last_access DESC LIMIT ?""",
+            (scope, now - self.ttl_seconds, self.semantic_scan_limit)
+        ).fetchall()
+        best, best_score = None, self.similarity_threshold
+        for key, response, stored in rows:
+            score = cosine_similarity(embedding, json.loads(stored))
+            if score >= best_score:
+                best, best_score = (key, response), score
+        return best
+
+    def put(self, request: Dict[str, Any], response: Dict[str, Any], embedding: List[float] = None):
+        """Store a response, evicting expired and least recently used entries"""
+        if not self.cacheable(request):
+            return
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """INSERT OR REPLACE INTO llm_cache (key, scope, embedding, response, created, last_access)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    cache_key(request),
+                    scope_key(request),
+                    json.dumps(embedding) if embedding is not None else None,
+                    json.dumps(response, default=str),
+                    now,
+                    now
+                )
+            )
+            evicted = self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            # The connection is reused, so never leave it inside a transaction
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._stats["stores"] += 1
+            self._stats["evictions"] += evicted
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        expired = conn.execute("DELETE FROM llm_cache WHERE created <= ?", (now - self.ttl_seconds,)).rowcount
+        overflow = conn.execute(
+            """DELETE FROM llm_cache WHERE key IN (
+                   SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+               )""",
+            (self.max_entries,)
+        ).rowcount
+        return expired + overflow
+
+    def clear(self):
+        """Drop every cached response"""
+        conn = self._connect()
+        conn.execute("DELETE FROM llm_cache")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        conn = self._connect()
+        entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["semantic_hits"] + stats["misses"]
+        return {
+            "semantic": self.semantic,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            **stats,
+            "hit_rate": round((stats["hits"] + stats["semantic_hits"]) / lookups, 3) if lookups else 0.0
+        }
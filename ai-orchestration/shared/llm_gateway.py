@@ -0,0 +1,721 @@
+"""
+Unified LLM Gateway
+Single owner of pooled keep-alive HTTP connections to the OpenAI API.
+Runners, the scoring engine and the orchestrator send chat and embedding
+calls through it; LangChain, AutoGen and LlamaIndex clients are built on
+its shared connection pool so every framework shares limits, retries,
+timeouts and per-call telemetry
+"""
+
+import asyncio
+import inspect
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from shared.config import Config
+from shared.metrics import metrics
+from shared.tracing import tracer
+from shared.replay import replay
+from shared.llm_cache import LLMResponseCache, prompt_text
+from shared.rate_limiter import (
+    estimate_request_tokens,
+    estimate_request_usage,
+    get_rate_limiter,
+    parse_retry_after,
+)
+from shared.budget import get_ledger
+from shared import cascade
+from shared.hedging import Hedger
+
+
+# Errors worth retrying: throttling, timeouts, dropped connections and 5xx
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+# =============================================================================
+# HTTP HOOKS (RATE LIMITING, ACCOUNTING, TELEMETRY)
+# =============================================================================
+
+# Every framework's OpenAI traffic flows through these hooks, so rate limiting,
+# token accounting and HTTP telemetry apply uniformly to gateway, LangChain,
+# AutoGen and LlamaIndex calls alike.
+
+LLM_ENDPOINTS = ("chat/completions", "embeddings")
+
+
+def _endpoint(request: httpx.Request) -> str:
+    return request.url.path.rsplit("/v1/", 1)[-1].lstrip("/")
+
+
+def _llm_call(request: httpx.Request) -> Optional[Dict[str, Any]]:
+    """Describe a chat/embedding request: endpoint, model and estimated tokens"""
+    if request.method != "POST":
+        return None
+    endpoint = _endpoint(request)
+    if endpoint not in LLM_ENDPOINTS:
+        return None
+    try:
+        body = json.loads(request.content or b"{}")
+    except ValueError:
+        return None
+    return {
+        "endpoint": endpoint,
+        "model": body.get("model") or Config.DEFAULT_LLM_MODEL,
+        "estimated": estimate_request_tokens(endpoint, body) if Config.RATE_LIMIT_ENABLED else 0
+    }
+
+
+def _bucket_for(call: Optional[Dict[str, Any]]):
+    if call is None or not Config.RATE_LIMIT_ENABLED:
+        return None
+    return get_rate_limiter(call["model"])
+
+
+def _start(request: httpx.Request, call: Optional[Dict[str, Any]]):
+    if call is not None:
+        request.extensions["llm_call"] = call
+    request.extensions["gateway_start"] = time.perf_counter()
+
+
+def _finish(response: httpx.Response, usage: Dict[str, int]):
+    """Record telemetry for a finished call"""
+    request = response.request
+    endpoint = _endpoint(request)
+    call = request.extensions.get("llm_call")
+
+    start = request.extensions.get("gateway_start")
+    if start is not None:
+        duration = time.perf_counter() - start
+        metrics.observe("llm_http", endpoint, duration, status=response.status_code)
+        # The hook runs in the caller's context, so this nests under the span that made the call
+        tracer.record(
+            f"llm_http:{endpoint}", duration,
+            kind="llm_http",
+            error=f"HTTP {response.status_code}" if response.status_code >= 400 else None,
+            model=call["model"] if call else None,
+            status_code=response.status_code,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens")
+        )
+    metrics.inc("llm_http_requests_total", endpoint=endpoint, status=response.status_code)
+
+
+def _account(response: httpx.Response) -> Dict[str, int]:
+    """
+    Reconcile the rate limiter and budgets with a response's actual usage (or
+    feed a 429 back into the limiter), and return that usage
+    """
+    call = response.request.extensions.get("llm_call")
+    if call is None:
+        return {}
+    bucket = _bucket_for(call)
+    if response.status_code == 429:
+        if bucket is not None:
+            bucket.penalize(parse_retry_after(response.headers))
+        return {}
+    if not _needs_body(response):
+        return {}
+
+    try:
+        body = response.json()
+    except ValueError:
+        return {}
+    usage = body.get("usage") or {}
+    if not usage:
+        return {}
+    prompt_tokens = usage.get("prompt_tokens", 0) or 0
+    completion_tokens = usage.get("completion_tokens", 0) or 0
+    _charge(call, body.get("model") or call["model"], prompt_tokens, completion_tokens)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+
+def _charge(call: Optional[Dict[str, Any]], model: str, prompt_tokens: int, completion_tokens: int):
+    """Settle a call's rate-limit estimate against its actual usage and charge the budgets"""
+    bucket = _bucket_for(call)
+    if bucket is not None:
+        bucket.reconcile(call["estimated"], prompt_tokens + completion_tokens)
+    if Config.BUDGET_ENABLED:
+        get_ledger().record(model, prompt_tokens, completion_tokens)
+
+
+def _on_request(request: httpx.Request):
+    call = _llm_call(request)
+    bucket = _bucket_for(call)
+    if bucket is not None:
+        bucket.acquire(call["estimated"])
+    _start(request, call)
+
+
+def _on_response(response: httpx.Response):
+    if _needs_body(response):
+        response.read()
+    _finish(response, _account(response))
+
+
+async def _on_request_async(request: httpx.Request):
+    call = _llm_call(request)
+    bucket = _bucket_for(call)
+    if bucket is not None:
+        await bucket.aacquire(call["estimated"])
+    _start(request, call)
+
+
+async def _on_response_async(response: httpx.Response):
+    if _needs_body(response):
+        await response.aread()
+    # Reconciling the bucket and writing the ledger are SQLite transactions; keep them off the loop
+    _finish(response, await asyncio.to_thread(_account, response))
+
+
+def _needs_body(response: httpx.Response) -> bool:
+    """Non-streamed JSON responses are read early to account actual token usage"""
+    return (
+        "llm_call" in response.request.extensions
+        and response.status_code < 400
+        and response.headers.get("content-type", "").startswith("application/json")
+    )
+
+
+# =============================================================================
+# GATEWAY
+# =============================================================================
+
+class LLMGateway:
+    """
+    Pooled OpenAI gateway.
+
+    `chat`/`achat` and `embed`/`aembed` return plain dicts so results can be
+    recorded, replayed and cached. Framework factories (`chat_model`,
+    `autogen_client`, `llamaindex_llm`, `llamaindex_embed_model`) hand the
+    same pooled httpx clients to LangChain, AutoGen and LlamaIndex.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = None):
+        self.api_key = api_key or Config.OPENAI_API_KEY
+        self.base_url = base_url or Config.OPENAI_BASE_URL
+        self.max_retries = Config.LLM_MAX_RETRIES
+
+        limits = httpx.Limits(
+            max_connections=Config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY_SECONDS
+        )
+        self.timeout = httpx.Timeout(Config.LLM_TIMEOUT_SECONDS, connect=Config.LLM_CONNECT_TIMEOUT_SECONDS)
+
+        self.http_client = httpx.Client(
+            limits=limits,
+            timeout=self.timeout,
+            event_hooks={"request": [_on_request], "response": [_on_response]}
+        )
+        self.async_http_client = httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout,
+            event_hooks={"request": [_on_request_async], "response": [_on_response_async]}
+        )
+
+        self.cache = LLMResponseCache() if Config.LLM_CACHE_ENABLED else None
+        self.hedger = Hedger() if Config.HEDGE_ENABLED else None
+
+        # Retries are handled here, so the SDK clients must not retry on their own
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=self.http_client,
+            max_retries=0
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=self.async_http_client,
+            max_retries=0
+        )
+
+    # =========================================================================
+    # RETRIES
+    # =========================================================================
+
+    def _retry_kwargs(self, source: str) -> Dict[str, Any]:
+        """Shared tenacity policy for sync and async calls"""
+        def before_sleep(retry_state):
+            error = retry_state.outcome.exception()
+            metrics.inc("llm_retries_total", source=source, error=type(error).__name__)
+
+        return {
+            "stop": stop_after_attempt(self.max_retries + 1),
+            "wait": wait_random_exponential(multiplier=0.5, max=20),
+            "retry": retry_if_exception_type(RETRYABLE_ERRORS),
+            "before_sleep": before_sleep,
+            "reraise": True
+        }
+
+    # =========================================================================
+    # CHAT COMPLETIONS
+    # =========================================================================
+
+    def chat(self, messages: List[Dict[str, Any]], model: str = None, temperature: float = 0.7,
+             max_tokens: int = None, source: str = None, **kwargs) -> Dict[str, Any]:
+        """Blocking chat completion"""
+        request = self._chat_request(messages, model, temperature, max_tokens, **kwargs)
+        source = source or request["model"]
+
+        with tracer.span("llm:chat", kind="llm", model=request["model"], source=source) as span:
+            use_cache = self._use_cache(request)
+            embedding = None
+            if use_cache:
+                if self.cache.semantic:
+                    embedding = self.embed([prompt_text(request)], source="llm_cache")[0]
+                cached = self.cache.get(request, embedding)
+                span.set(cache_hit=cached is not None)
+                if cached is not None:
+                    return _cache_hit(cached)
+
+            requested_model = request["model"]
+            self._apply_budget(request)
+            span.set(model=request["model"])  # after a possible budget downgrade
+            if use_cache and request["model"] != requested_model:
+                # Downgraded answers are cached under the model that produced them
+                cached = self.cache.get(request, embedding)
+                span.set(cache_hit=cached is not None)
+                if cached is not None:
+                    return _cache_hit(cached)
+            result = replay.intercept_sync("llm", request, lambda: self._chat(request, source))
+            if use_cache:
+                self.cache.put(request, result, embedding)
+            return result
+
+    async def achat(self, messages: List[Dict[str, Any]], model: str = None, temperature: float = 0.7,
+                    max_tokens: int = None, source: str = None,
+                    on_token: Callable[[str], Any] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Async chat completion.
+        With `on_token`, the completion is streamed and each content delta is
+        passed to the callback (which may be a coroutine function).
+        """
+        request = self._chat_request(messages, model, temperature, max_tokens, **kwargs)
+        source = source or request["model"]
+
+        with tracer.span("llm:chat", kind="llm", model=request["model"], source=source) as span:
+            use_cache = self._use_cache(request)
+            embedding = None
+            if use_cache:
+                if self.cache.semantic:
+                    embedding = (await self.aembed([prompt_text(request)], source="llm_cache"))[0]
+                cached = await asyncio.to_thread(self.cache.get, request, embedding)
+                span.set(cache_hit=cached is not None)
+                if cached is not None:
+                    return await _astream_cache_hit(cached, on_token)
+
+            requested_model = request["model"]
+            await asyncio.to_thread(self._apply_budget, request)
+            span.set(model=request["model"])  # after a possible budget downgrade
+            if use_cache and request["model"] != requested_model:
+                # Downgraded answers are cached under the model that produced them
+                cached = await asyncio.to_thread(self.cache.get, request, embedding)
+                span.set(cache_hit=cached is not None)
+                if cached is not None:
+                    return await _astream_cache_hit(cached, on_token)
+            result = await replay.intercept("llm", request, lambda: self._ahedged(request, source, on_token))
+            if on_token and replay.mode == "replay" and result.get("content"):
+                await _maybe_await(on_token(result["content"]))
+            if use_cache:
+                await asyncio.to_thread(self.cache.put, request, result, embedding)
+            return result
+
+    # =========================================================================
+    # MODEL CASCADE
+    # =========================================================================
+
+    def chat_cascade(self, messages: List[Dict[str, Any]], validators: List[cascade.Validator] = (),
+                     models: List[str] = None, source: str = None, **kwargs) -> Dict[str, Any]:
+        """
+        Blocking chat completion through the model cascade.
+        Each tier is tried in order until an answer passes every validator;
+        the last tier's answer is accepted as-is. The result records the tier
+        that answered (`tier`, `tier_model`) and every attempt (`cascade`).
+        """
+        tiers = cascade.cascade_models(models)
+        validators = cascade.for_tiers(validators, tiers)
+        if cascade.needs_confidence(validators):
+            messages = cascade.with_confidence_instruction(messages)
+
+        attempts = []
+        for tier, model in enumerate(tiers):
+            result = self.chat(messages, model=model, source=source, **kwargs)
+            last = tier == len(tiers) - 1
+            reason = cascade.validate(result.get("content", ""), validators)
+            attempts.append(cascade.attempt_record(model, result, reason))
+            if reason is None or last:
+                return cascade.finalize(attempts, result, tier, reason is None, source)
+
+    async def achat_cascade(self, messages: List[Dict[str, Any]], validators: List[cascade.Validator] = (),
+                            models: List[str] = None, source: str = None,
+                            on_token: Callable[[str], Any] = None, **kwargs) -> Dict[str, Any]:
+        """
+        Async variant of chat_cascade().
+        The last tier is accepted as-is, so it streams to `on_token` token by
+        token. Earlier tiers may be rejected and are never streamed: their
+        accepted answer is passed to `on_token` in one piece.
+        """
+        tiers = cascade.cascade_models(models)
+        validators = cascade.for_tiers(validators, tiers)
+        confidence = cascade.needs_confidence(validators)
+        if confidence:
+            messages = cascade.with_confidence_instruction(messages)
+
+        attempts = []
+        for tier, model in enumerate(tiers):
+            last = tier == len(tiers) - 1
+            if on_token and last:
+                hold_back = cascade.ConfidenceFilter() if confidence else None
+
+                async def stream(token: str):
+                    text = hold_back.feed(token) if hold_back else token
+                    if text:
+                        await _maybe_await(on_token(text))
+
+                result = await self.achat(messages, model=model, source=source, on_token=stream, **kwargs)
+                held = hold_back.flush() if hold_back else ""
+                if held:
+                    await _maybe_await(on_token(held))
+            else:
+                result = await self.achat(messages, model=model, source=source, **kwargs)
+            reason = cascade.validate(result.get("content", ""), validators)
+            attempts.append(cascade.attempt_record(model, result, reason))
+            if reason is None or last:
+                final = cascade.finalize(attempts, result, tier, reason is None, source)
+                if on_token and not last and final["content"]:
+                    await _maybe_await(on_token(final["content"]))
+                return final
+
+    def _apply_budget(self, request: Dict[str, Any]):
+        """
+        Pre-count the prompt and check it against the caller's budgets,
+        downgrading the model past a soft limit. Raises BudgetExceeded past a
+        hard limit, before anything is sent.
+        """
+        # Replayed fixtures are keyed on the exact request, so leave it untouched
+        if not Config.BUDGET_ENABLED or replay.mode == "replay":
+            return
+        prompt_tokens, completion_tokens = estimate_request_usage("chat/completions", request)
+        decision = get_ledger().check(request["model"], prompt_tokens, completion_tokens)
+        if decision["downgraded"]:
+            request["model"] = decision["model"]
+
+    def _use_cache(self, request: Dict[str, Any]) -> bool:
+        # Recorded fixtures must see every call, so the cache stays out of the way of replay
+        return self.cache is not None and not replay.enabled and self.cache.cacheable(request)
+
+    def _chat_request(self, messages, model, temperature, max_tokens, **kwargs) -> Dict[str, Any]:
+        request = {
+            "model": model or Config.DEFAULT_LLM_MODEL,
+            "messages": messages,
+            "temperature": temperature,
+            **kwargs
+        }
+        if max_tokens is not None:
+            request["max_tokens"] = max_tokens
+        return request
+
+    def _chat(self, request: Dict[str, Any], source: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            for attempt in Retrying(**self._retry_kwargs(source)):
+                with attempt:
+                    response = self.client.chat.completions.create(**request)
+        except Exception as e:
+            metrics.inc("llm_errors_total", source=source, error=type(e).__name__)
+            raise
+        return self._record(_completion_to_dict(response), request["model"], start, source)
+
+    async def _achat(self, request: Dict[str, Any], source: str,
+                     on_token: Callable[[str], Any] = None) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            async for attempt in AsyncRetrying(**self._retry_kwargs(source)):
+                with attempt:
+                    if on_token:
+                        result = await self._astream(request, on_token)
+                    else:
+                        response = await self.async_client.chat.completions.create(**request)
+                        result = _completion_to_dict(response)
+        except Exception as e:
+            metrics.inc("llm_errors_total", source=source, error=type(e).__name__)
+            raise
+        return self._record(result, request["model"], start, source)
+
+    async def _ahedged(self, request: Dict[str, Any], source: str,
+                       on_token: Callable[[str], Any] = None) -> Dict[str, Any]:
+        """Run _achat, hedged when enabled (streamed calls are never hedged)"""
+        if self.hedger is None or on_token:
+            return await self._achat(request, source, on_token)
+        return await self.hedger.run(request, lambda hedge_request: self._achat(hedge_request, source))
+
+    async def _astream(self, request: Dict[str, Any], on_token: Callable[[str], Any]) -> Dict[str, Any]:
+        """Stream a completion, forwarding deltas and collecting usage"""
+        stream = await self.async_client.chat.completions.create(
+            **request,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        parts: List[str] = []
+        result = {"model": request["model"], "finish_reason": None}
+        usage = None
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta.content if choice.delta else None
+            if delta:
+                parts.append(delta)
+                await _maybe_await(on_token(delta))
+            if choice.finish_reason:
+                result["finish_reason"] = choice.finish_reason
+        result["content"] = "".join(parts)
+        result.update(_usage_to_dict(usage))
+        # Streamed bodies are read after the response hook ran, so settle the
+        # limiter estimate and the budgets once the stream is done
+        call = stream.response.request.extensions.get("llm_call")
+        await asyncio.to_thread(
+            _charge, call, result.get("model") or request["model"],
+            result.get("prompt_tokens", 0), result.get("completion_tokens", 0)
+        )
+        return result
+
+    def _record(self, result: Dict[str, Any], model: str, start: float, source: str) -> Dict[str, Any]:
+        """Attach latency and emit per-call telemetry"""
+        duration = time.perf_counter() - start
+        result["latency_ms"] = round(duration * 1000, 1)
+        tracer.annotate(
+            model=result.get("model") or model,
+            prompt_tokens=result.get("prompt_tokens", 0),
+            completion_tokens=result.get("completion_tokens", 0),
+            cached_tokens=result.get("cached_tokens", 0)
+        )
+        metrics.record_llm_call(
+            model=result.get("model") or model,
+            duration=duration,
+            prompt_tokens=result.get("prompt_tokens", 0),
+            completion_tokens=result.get("completion_tokens", 0),
+            cache_hit=result.get("cached_tokens", 0) > 0,
+            source=source
+        )
+        return result
+
+    # =========================================================================
+    # EMBEDDINGS
+    # =========================================================================
+
+    def embed(self, texts: List[str], model: str = None, source: str = "embedding") -> List[List[float]]:
+        """Blocking embeddings"""
+        model = model or Config.DEFAULT_EMBEDDING_MODEL
+        request = {"model": model, "input": texts}
+
+        def call():
+            start = time.perf_counter()
+            for attempt in Retrying(**self._retry_kwargs(source)):
+                with attempt:
+                    response = self.client.embeddings.create(**request)
+            self._record_embedding(response, model, start, source)
+            return [item.embedding for item in response.data]
+
+        return replay.intercept_sync("embedding", request, call)
+
+    async def aembed(self, texts: List[str], model: str = None, source: str = "embedding") -> List[List[float]]:
+        """Async embeddings"""
+        model = model or Config.DEFAULT_EMBEDDING_MODEL
+        request = {"model": model, "input": texts}
+
+        async def call():
+            start = time.perf_counter()
+            async for attempt in AsyncRetrying(**self._retry_kwargs(source)):
+                with attempt:
+                    response = await self.async_client.embeddings.create(**request)
+            self._record_embedding(response, model, start, source)
+            return [item.embedding for item in response.data]
+
+        return await replay.intercept("embedding", request, call)
+
+    def _record_embedding(self, response: Any, model: str, start: float, source: str):
+        usage = getattr(response, "usage", None)
+        metrics.record_llm_call(
+            model=model,
+            duration=time.perf_counter() - start,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            source=source
+        )
+
+    # =========================================================================
+    # FRAMEWORK CLIENTS (sharing the pooled connections)
+    # =========================================================================
+
+    def chat_model(self, model: str = None, temperature: float = 0.1, **kwargs):
+        """LangChain ChatOpenAI on the shared pool"""
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model=model or Config.DEFAULT_LLM_MODEL,
+            api_key=self.api_key,
+            base_url=self.base_url,
+            temperature=temperature,
+            max_retries=self.max_retries,
+            http_client=self.http_client,
+            http_async_client=self.async_http_client,
+            **kwargs
+        )
+
+    def autogen_client(self, model: str = None, **kwargs):
+        """AutoGen OpenAIChatCompletionClient on the shared pool"""
+        from autogen_ext.models.openai import OpenAIChatCompletionClient
+        client_kwargs = {"base_url": self.base_url} if self.base_url else {}
+        return OpenAIChatCompletionClient(
+            model=model or Config.DEFAULT_LLM_MODEL,
+            api_key=self.api_key,
+            max_retries=self.max_retries,
+            http_client=self.async_http_client,
+            **client_kwargs,
+            **kwargs
+        )
+
+    def llamaindex_llm(self, model: str = None, **kwargs):
+        """LlamaIndex OpenAI LLM on the shared pool"""
+        from llama_index.llms.openai import OpenAI as LlamaOpenAI
+        return LlamaOpenAI(
+            model=model or Config.DEFAULT_LLM_MODEL,
+            api_key=self.api_key,
+            api_base=self.base_url,
+            max_retries=self.max_retries,
+            http_client=self.http_client,
+            async_http_client=self.async_http_client,
+            **kwargs
+        )
+
+    def llamaindex_embed_model(self, model: str = None, **kwargs):
+        """LlamaIndex OpenAIEmbedding on the shared pool"""
+        from llama_index.embeddings.openai import OpenAIEmbedding
+        return OpenAIEmbedding(
+            model=model or Config.DEFAULT_EMBEDDING_MODEL,
+            api_key=self.api_key,
+            api_base=self.base_url,
+            max_retries=self.max_retries,
+            http_client=self.http_client,
+            async_http_client=self.async_http_client,
+            **kwargs
+        )
+
+    # =========================================================================
+    # LIFECYCLE
+    # =========================================================================
+
+    async def awarm(self, connections: int = None) -> int:
+        """
+        Open pooled connections ahead of the first real request.
+        Returns the number of warm-up requests that succeeded.
+        """
+        connections = connections if connections is not None else Config.LLM_WARM_CONNECTIONS
+        if connections <= 0 or not self.api_key:
+            return 0
+
+        results = await asyncio.gather(
+            *(self.async_client.models.list() for _ in range(connections)),
+            return_exceptions=True
+        )
+        return sum(1 for r in results if not isinstance(r, Exception))
+
+    def close(self):
+        self.http_client.close()
+
+    async def aclose(self):
+        await self.async_http_client.aclose()
+        self.http_client.close()
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+async def _maybe_await(value: Any):
+    if inspect.isawaitable(value):
+        await value
+
+
+def _cache_hit(cached: Dict[str, Any]) -> Dict[str, Any]:
+    """A cached response costs no tokens or latency for this call"""
+    return {
+        **cached,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "cached_tokens": 0,
+        "latency_ms": 0.0,
+        "response_cache": "hit",
+        "cached_usage": {
+            "prompt_tokens": cached.get("prompt_tokens", 0),
+            "completion_tokens": cached.get("completion_tokens", 0)
+        }
+    }
+
+
+async def _astream_cache_hit(cached: Dict[str, Any], on_token: Callable[[str], Any] = None) -> Dict[str, Any]:
+    """A cache hit for an async call; a streaming caller gets the whole answer as one chunk"""
+    result = _cache_hit(cached)
+    if on_token and result.get("content"):
+        await _maybe_await(on_token(result["content"]))
+    return result
+
+
+def _usage_to_dict(usage: Any) -> Dict[str, int]:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0
+    }
+
+
+def _completion_to_dict(response: Any) -> Dict[str, Any]:
+    """Normalize an OpenAI ChatCompletion into a serializable dict"""
+    choice = response.choices[0]
+    return {
+        "content": choice.message.content or "",
+        "model": response.model,
+        "finish_reason": choice.finish_reason,
+        **_usage_to_dict(response.usage)
+    }
+
+
+# =============================================================================
+# SHARED INSTANCE
+# =============================================================================
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Get the process-wide gateway, creating it on first use"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
@@ -0,0 +1,302 @@
+"""
+Metrics and Instrumentation
+Records wall time for orchestrator nodes, crew tasks, knowledge base queries
+and LLM calls, aggregated into histograms for the Prometheus /metrics endpoint
+and a rolling in-memory window for /status
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from shared.config import Config
+from shared.tracing import tracer
+
+
+# =============================================================================
+# CONSTANTS
+# =============================================================================
+
+METRIC_PREFIX = "affiliate_ai"
+
+# Histogram buckets in seconds - LLM and crew calls range from sub-second to minutes
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    """Normalize a label dict into a hashable, sorted key"""
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    """Render labels in Prometheus text format"""
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + rendered + "}"
+
+
+def _escape(value: Any) -> str:
+    """Escape a label value for Prometheus text format"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+# =============================================================================
+# HISTOGRAM
+# =============================================================================
+
+class Histogram:
+    """Cumulative-bucket histogram of durations"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record a single observation"""
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+# =============================================================================
+# METRICS REGISTRY
+# =============================================================================
+
+class MetricsRegistry:
+    """
+    In-process metrics store.
+
+    Durations are kept as histograms labelled by kind (node, crew_task,
+    kb_query, llm, ...) and name. Counters and gauges can be registered by
+    any component. A bounded deque of recent events backs the rolling
+    window reported by /status.
+    """
+
+    def __init__(self, window_seconds: float = 300.0, max_events: int = 5000):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._histograms: Dict[LabelKey, Histogram] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+
+    # =========================================================================
+    # RECORDING
+    # =========================================================================
+
+    def observe(self, kind: str, name: str, duration: float, **attributes):
+        """Record the wall time of one operation"""
+        key = _label_key({"kind": kind, "name": name})
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(duration)
+            self._events.append({
+                "ts": time.time(),
+                "kind": kind,
+                "name": name,
+                "duration": duration,
+                **attributes
+            })
+
+    @contextmanager
+    def timer(self, kind: str, name: str, **attributes):
+        """Context manager that records the wall time of its body"""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield attributes
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.observe(kind, name, time.perf_counter() - start, status=status, **attributes)
+
+    def record_llm_call(self, model: str, duration: float, prompt_tokens: int = 0,
+                        completion_tokens: int = 0, cache_hit: bool = False, source: str = None):
+        """Record one LLM call with its token usage"""
+        self.observe(
+            "llm", source or model, duration,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cache_hit=cache_hit
+        )
+        self.inc("llm_calls_total", model=model, cache_hit=str(bool(cache_hit)).lower())
+        self.inc("llm_tokens_total", prompt_tokens or 0, model=model, type="prompt")
+        self.inc("llm_tokens_total", completion_tokens or 0, model=model, type="completion")
+
+    def inc(self, metric: str, value: float = 1, **labels):
+        """Increment a counter"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, metric: str, value: float, **labels):
+        """Set a gauge to an absolute value"""
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(metric, {})[key] = value
+
+    # =========================================================================
+    # EXPORT
+    # =========================================================================
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines = []
+        name = f"{METRIC_PREFIX}_duration_seconds"
+
+        with self._lock:
+            lines.append(f"# HELP {name} Wall time of instrumented operations")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(self._histograms.items()):
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{name}_bucket{_format_labels(key, {'le': str(bound)})} {count}")
+                lines.append(f"{name}_bucket{_format_labels(key, {'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {histogram.total:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+            for metric, series in sorted(self._counters.items()):
+                full_name = f"{METRIC_PREFIX}_{metric}"
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(key)} {value:g}")
+
+            for metric, series in sorted(self._gauges.items()):
+                full_name = f"{METRIC_PREFIX}_{metric}"
+                lines.append(f"# TYPE {full_name} gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(key)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def get_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the most recent raw events"""
+        with self._lock:
+            return list(self._events)[-limit:]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Summarize the rolling window of recent events for /status"""
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            events = [e for e in self._events if e["ts"] >= cutoff]
+
+        grouped: Dict[str, List[float]] = {}
+        tokens = {"prompt": 0, "completion": 0}
+        llm_calls = 0
+        cache_hits = 0
+        for event in events:
+            grouped.setdefault(f"{event['kind']}:{event['name']}", []).append(event["duration"])
+            if event["kind"] == "llm":
+                llm_calls += 1
+                cache_hits += 1 if event.get("cache_hit") else 0
+                tokens["prompt"] += event.get("prompt_tokens") or 0
+                tokens["completion"] += event.get("completion_tokens") or 0
+
+        operations = {
+            key: {
+                "count": len(durations),
+                "avg_ms": round(sum(durations) / len(durations) * 1000, 1),
+                "p50_ms": round(percentile(durations, 50) * 1000, 1),
+                "p95_ms": round(percentile(durations, 95) * 1000, 1),
+                "max_ms": round(max(durations) * 1000, 1)
+            }
+            for key, durations in sorted(grouped.items())
+        }
+
+        return {
+            "window_seconds": self.window_seconds,
+            "events": len(events),
+            "operations": operations,
+            "llm": {
+                "calls": llm_calls,
+                "cache_hits": cache_hits,
+                "prompt_tokens": tokens["prompt"],
+                "completion_tokens": tokens["completion"]
+            }
+        }
+
+
+# =============================================================================
+# CREW TASK TIMING
+# =============================================================================
+
+class CrewTaskTimer:
+    """
+    CrewAI task_callback that records the wall time of each task.
+
+    Sequential crews complete tasks one after another, so each task's
+    duration is the time since the previous task finished (or since kickoff).
+    Tasks are also traced as children of the span current at kickoff, since
+    the callback runs on the crew's own thread.
+    """
+
+    def __init__(self, core: str, registry: "MetricsRegistry" = None):
+        self.core = core
+        self.registry = registry or metrics
+        self._last_mark = time.perf_counter()
+        self._parent_span = None
+
+    def start(self):
+        """Reset the clock at crew kickoff"""
+        self._last_mark = time.perf_counter()
+        self._parent_span = tracer.current()
+
+    def __call__(self, task_output: Any):
+        now = time.perf_counter()
+        name = getattr(task_output, "name", None) or (getattr(task_output, "description", "") or "task")[:60]
+        agent = getattr(task_output, "agent", None)
+        self.registry.observe("crew_task", name, now - self._last_mark, core=self.core, agent=agent)
+        tracer.record(
+            f"crew_task:{name}", now - self._last_mark,
+            kind="crew_task",
+            parent=self._parent_span,
+            core=self.core,
+            agent=str(agent) if agent is not None else None
+        )
+        self._last_mark = now
+
+
+def record_crew_usage(core: str, crew_output: Any, duration: float, registry: "MetricsRegistry" = None):
+    """Record total duration and token usage reported by a CrewAI kickoff"""
+    registry = registry or metrics
+    usage = getattr(crew_output, "token_usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    registry.observe(
+        "crew", core, duration,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens
+    )
+    tracer.annotate(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    registry.inc("llm_tokens_total", prompt_tokens, model=Config.DEFAULT_LLM_MODEL, type="prompt", source="crewai")
+    registry.inc("llm_tokens_total", completion_tokens, model=Config.DEFAULT_LLM_MODEL, type="completion", source="crewai")
+
+
+# =============================================================================
+# GLOBAL REGISTRY
+# =============================================================================
+
+metrics = MetricsRegistry(window_seconds=Config.METRICS_WINDOW_SECONDS)
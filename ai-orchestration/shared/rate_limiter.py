@@ -0,0 +1,294 @@
+"""
+Cross-Process LLM Rate Limiter
+Token buckets for requests/min and tokens/min per model, stored in a local
+SQLite file so API workers, scoring jobs and backend-spawned runners all draw
+from the same quota. Prompt tokens are pre-counted with tiktoken and 429
+retry-after hints pause every process sharing the bucket. CrewAI crews call
+the API through LiteLLM and are exempt from per-call throttling; their usage
+is charged to the bucket after each kickoff (see shared/crew_runner.py)
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import tiktoken
+
+from shared.config import Config
+from shared.metrics import metrics
+
+
+# =============================================================================
+# TOKEN COUNTING
+# =============================================================================
+
+# Per-message framing overhead used by the chat format
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+@lru_cache(maxsize=32)
+def _encoding_for(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Count tokens in a string"""
+    if not text:
+        return 0
+    return len(_encoding_for(model or Config.DEFAULT_LLM_MODEL).encode(text, disallowed_special=()))
+
+
+def _content_text(content: Any) -> str:
+    """Flatten message content (string or list of content parts) into text"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return "" if content is None else str(content)
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: str = None) -> int:
+    """Count prompt tokens for a list of chat messages"""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_tokens(_content_text(message.get("content")), model)
+        if message.get("name"):
+            total += count_tokens(message["name"], model)
+        if message.get("tool_calls"):
+            total += count_tokens(json.dumps(message["tool_calls"]), model)
+    return total
+
+
+def estimate_request_usage(endpoint: str, body: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Estimate (prompt, completion) tokens for an API request before it is
+    sent: counted prompt tokens plus the requested completion budget.
+    """
+    model = body.get("model")
+    if endpoint.endswith("embeddings"):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return sum(len(i) if isinstance(i, list) else count_tokens(str(i), model) for i in inputs), 0
+
+    prompt = count_message_tokens(body.get("messages", []), model)
+    if body.get("tools"):
+        prompt += count_tokens(json.dumps(body["tools"]), model)
+    completion = (
+        body.get("max_completion_tokens")
+        or body.get("max_tokens")
+        or Config.RATE_LIMIT_DEFAULT_COMPLETION_TOKENS
+    )
+    return prompt, completion
+
+
+def estimate_request_tokens(endpoint: str, body: Dict[str, Any]) -> int:
+    """Estimate the tokens an API request will be charged against the quota"""
+    return sum(estimate_request_usage(endpoint, body))
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Read a retry delay in seconds from 429 response headers"""
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value) * scale)
+        except ValueError:
+            continue
+    return None
+
+
+# =============================================================================
+# SHARED TOKEN BUCKET
+# =============================================================================
+
+class SharedTokenBucket:
+    """
+    Requests/min and tokens/min token buckets for one model.
+
+    State lives in a SQLite row updated inside BEGIN IMMEDIATE transactions,
+    so every process pointing at the same file shares one quota. Buckets
+    refill continuously; a 429 sets `blocked_until` for all sharers.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, db_path: str = None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.db_path = str(db_path or Config.RATE_LIMIT_DB_PATH)
+        self._local = threading.local()
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection, opened once and reused for every call"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS rate_buckets (
+                name TEXT PRIMARY KEY,
+                requests REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                blocked_until REAL NOT NULL DEFAULT 0
+            )"""
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO rate_buckets (name, requests, tokens, updated) VALUES (?, ?, ?, ?)",
+            (self.name, self.rpm, self.tpm, time.time())
+        )
+
+    def _transact(self, fn) -> Any:
+        """Run `fn(state, now)` on the refilled bucket and persist the result"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT requests, tokens, updated, blocked_until FROM rate_buckets WHERE name = ?",
+                (self.name,)
+            ).fetchone()
+            now = time.time()
+            requests, tokens, updated, blocked_until = row
+            elapsed = max(0.0, now - updated)
+            state = {
+                "requests": min(self.rpm, requests + elapsed * self.rpm / 60),
+                "tokens": min(self.tpm, tokens + elapsed * self.tpm / 60),
+                "blocked_until": blocked_until
+            }
+            result = fn(state, now)
+            conn.execute(
+                "UPDATE rate_buckets SET requests = ?, tokens = ?, updated = ?, blocked_until = ? WHERE name = ?",
+                (state["requests"], state["tokens"], now, state["blocked_until"], self.name)
+            )
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            # The connection is reused, so never leave it inside a transaction
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def try_acquire(self, tokens: int) -> float:
+        """Take one request and `tokens` tokens; return 0 on success or seconds to wait"""
+        # A single request larger than the bucket could never fit; cap it
+        tokens = min(tokens, self.tpm)
+
+        def take(state: Dict[str, float], now: float) -> float:
+            if state["blocked_until"] > now:
+                return state["blocked_until"] - now
+            if state["requests"] >= 1 and state["tokens"] >= tokens:
+                state["requests"] -= 1
+                state["tokens"] -= tokens
+                return 0.0
+            request_wait = max(0.0, (1 - state["requests"]) * 60 / self.rpm)
+            token_wait = max(0.0, (tokens - state["tokens"]) * 60 / self.tpm)
+            return max(request_wait, token_wait)
+
+        return self._transact(take)
+
+    def acquire(self, tokens: int) -> float:
+        """Block until capacity is available; return the total time waited"""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                self._record_wait(waited)
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, tokens: int) -> float:
+        """Async variant of acquire(); the SQLite transaction runs off the event loop"""
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, tokens)
+            if wait <= 0:
+                self._record_wait(waited)
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def reconcile(self, estimated: int, actual: int):
+        """Return over-estimated tokens to the bucket (or charge the shortfall)"""
+        delta = estimated - actual
+        if delta == 0:
+            return
+
+        def adjust(state: Dict[str, float], now: float):
+            state["tokens"] = min(self.tpm, state["tokens"] + delta)
+
+        self._transact(adjust)
+
+    def penalize(self, retry_after: Optional[float]):
+        """Pause every process sharing this bucket after a 429"""
+        delay = retry_after if retry_after is not None else Config.RATE_LIMIT_DEFAULT_BACKOFF_SECONDS
+
+        def block(state: Dict[str, float], now: float):
+            state["blocked_until"] = max(state["blocked_until"], now + delay)
+            state["requests"] = min(state["requests"], 0.0)
+
+        self._transact(block)
+        metrics.inc("rate_limit_429_total", model=self.name)
+
+    def _record_wait(self, waited: float):
+        metrics.observe("rate_limit_wait", self.name, waited)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Current bucket levels (after refill)"""
+        snapshot = self._transact(lambda state, now: {
+            "requests_available": round(state["requests"], 2),
+            "tokens_available": int(state["tokens"]),
+            "blocked_for_seconds": round(max(0.0, state["blocked_until"] - now), 2)
+        })
+        return {"rpm": self.rpm, "tpm": self.tpm, **snapshot}
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+_buckets: Dict[str, SharedTokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def _limits_for(model: str) -> Tuple[int, int]:
+    limits = Config.RATE_LIMITS.get(model)
+    if limits:
+        return int(limits[0]), int(limits[1])
+    return Config.RATE_LIMIT_RPM, Config.RATE_LIMIT_TPM
+
+
+def get_rate_limiter(model: str) -> SharedTokenBucket:
+    """Get the shared bucket for a model"""
+    bucket = _buckets.get(model)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(model)
+            if bucket is None:
+                rpm, tpm = _limits_for(model)
+                bucket = _buckets[model] = SharedTokenBucket(model, rpm, tpm)
+    return bucket
+
+
+def get_rate_limit_status() -> Dict[str, Any]:
+    """Bucket levels for every model used by this process"""
+    return {name: bucket.get_state() for name, bucket in list(_buckets.items())}
@@ -0,0 +1,178 @@
+"""
+Record and Replay Harness
+Captures LLM, crew and knowledge base requests/responses into fixture files
+and serves them back deterministically, so orchestration overhead can be
+benchmarked offline without live model latency
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from shared.config import Config
+
+
+REPLAY_MODES = ("off", "record", "replay")
+
+
+class FixtureNotFound(LookupError):
+    """Raised in replay mode when no recorded response matches a request"""
+
+
+def fixture_key(kind: str, request: Dict[str, Any]) -> str:
+    """Deterministic key for a request payload"""
+    payload = json.dumps({"kind": kind, "request": request}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# REPLAY HARNESS
+# =============================================================================
+
+class ReplayHarness:
+    """
+    Intercepts external calls by kind ("llm", "crew", "kb_query", ...).
+
+    - off: calls pass straight through
+    - record: calls pass through and request/response pairs are appended to
+      `<fixture_dir>/<kind>.jsonl` together with the observed latency
+    - replay: responses are served from the fixtures; identical requests are
+      replayed in recorded order. Synthetic latency is `latency_ms` plus
+      `latency_scale` times the recorded latency.
+    """
+
+    def __init__(self, mode: str = "off", fixture_dir: str = None,
+                 latency_ms: float = 0.0, latency_scale: float = 0.0):
+        self._lock = threading.Lock()
+        self.configure(mode, fixture_dir, latency_ms, latency_scale)
+
+    def configure(self, mode: str = "off", fixture_dir: str = None,
+                  latency_ms: float = 0.0, latency_scale: float = 0.0):
+        """(Re)configure the harness, reloading fixtures when replaying"""
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Invalid replay mode: {mode}")
+
+        with self._lock:
+            self.mode = mode
+            self.fixture_dir = Path(fixture_dir or Config.REPLAY_FIXTURE_DIR)
+            self.latency_ms = latency_ms
+            self.latency_scale = latency_scale
+            self._fixtures: Dict[str, List[Dict[str, Any]]] = {}
+            self._cursors: Dict[str, int] = {}
+            self._stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+        if mode == "replay":
+            self._load_fixtures()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _load_fixtures(self):
+        """Load every <kind>.jsonl file in the fixture directory"""
+        if not self.fixture_dir.exists():
+            return
+        for path in sorted(self.fixture_dir.glob("*.jsonl")):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._fixtures.setdefault(entry["key"], []).append(entry)
+
+    # =========================================================================
+    # RECORD / REPLAY
+    # =========================================================================
+
+    def _record(self, kind: str, key: str, request: Dict[str, Any], response: Any, latency: float):
+        """Append a request/response pair to the kind's fixture file"""
+        entry = {
+            "key": key,
+            "kind": kind,
+            "request": request,
+            "response": response,
+            "latency_ms": round(latency * 1000, 3)
+        }
+        with self._lock:
+            self.fixture_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.fixture_dir / f"{kind}.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+            self._stats["recorded"] += 1
+
+    def _lookup(self, kind: str, key: str) -> Dict[str, Any]:
+        """Find the next recorded entry for a key"""
+        with self._lock:
+            entries = self._fixtures.get(key)
+            if not entries:
+                self._stats["misses"] += 1
+                raise FixtureNotFound(f"No {kind} fixture for key {key[:12]}")
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self._stats["replayed"] += 1
+            # Wrap around so a fixture set can drive benchmarks of any length
+            return entries[cursor % len(entries)]
+
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        """Synthetic latency in seconds for a replayed entry"""
+        return (self.latency_ms + self.latency_scale * entry.get("latency_ms", 0)) / 1000
+
+    async def intercept(self, kind: str, request: Dict[str, Any],
+                        call: Callable[[], Awaitable[Any]]) -> Any:
+        """Record or replay an async call; `call` must return JSON-serializable data"""
+        if self.mode == "off":
+            return await call()
+
+        key = fixture_key(kind, request)
+        if self.mode == "replay":
+            entry = self._lookup(kind, key)
+            delay = self._delay(entry)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return entry["response"]
+
+        start = time.perf_counter()
+        response = await call()
+        self._record(kind, key, request, response, time.perf_counter() - start)
+        return response
+
+    def intercept_sync(self, kind: str, request: Dict[str, Any], call: Callable[[], Any]) -> Any:
+        """Record or replay a blocking call"""
+        if self.mode == "off":
+            return call()
+
+        key = fixture_key(kind, request)
+        if self.mode == "replay":
+            entry = self._lookup(kind, key)
+            delay = self._delay(entry)
+            if delay > 0:
+                time.sleep(delay)
+            return entry["response"]
+
+        start = time.perf_counter()
+        response = call()
+        self._record(kind, key, request, response, time.perf_counter() - start)
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get harness mode and counters"""
+        return {
+            "mode": self.mode,
+            "fixture_dir": str(self.fixture_dir),
+            "fixtures_loaded": sum(len(v) for v in self._fixtures.values()),
+            **self._stats
+        }
+
+
+# =============================================================================
+# GLOBAL HARNESS
+# =============================================================================
+
+replay = ReplayHarness(
+    mode=Config.REPLAY_MODE,
+    fixture_dir=Config.REPLAY_FIXTURE_DIR,
+    latency_ms=Config.REPLAY_LATENCY_MS,
+    latency_scale=Config.REPLAY_LATENCY_SCALE
+)
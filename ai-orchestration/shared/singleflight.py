@@ -0,0 +1,163 @@
+"""
+Single-Flight Request Coalescing
+Identical in-flight requests share one execution instead of running the
+orchestrator or a crew pipeline once per caller
+"""
+
+import asyncio
+import copy
+import json
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from shared.deadline import Deadline, current_deadline, use_deadline
+
+
+# =============================================================================
+# KEY NORMALIZATION
+# =============================================================================
+
+def make_key(core: str, task: str, parameters: Optional[Dict[str, Any]] = None) -> str:
+    """Build a coalescing key from core, normalized task text and parameters"""
+    normalized_task = re.sub(r"\s+", " ", (task or "").strip().lower())
+    normalized_params = json.dumps(parameters or {}, sort_keys=True, default=str)
+    return f"{core}|{normalized_task}|{normalized_params}"
+
+
+def _failed(result: Any) -> bool:
+    """Core and chat results report failures in an "error" field rather than raising"""
+    return isinstance(result, dict) and bool(result.get("error"))
+
+
+# =============================================================================
+# SINGLE-FLIGHT GROUP
+# =============================================================================
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key onto one pending future.
+    
+    The first caller for a key runs the work; duplicates attach to the same
+    future, and each waiter gets its own copy of the result. Successful
+    results are also kept for `window_seconds` after completion so retries
+    arriving just after the leader finished reuse them. Results carrying an
+    `error` are never kept, and duplicates rerun the work once instead of
+    taking the leader's error.
+    Waiters that are cancelled detach without affecting the others; the
+    shared work is cancelled only when its last waiter leaves.
+    
+    The shared work runs under its own Deadline rather than the leader's, so
+    the leader timing out or disconnecting does not stop it while followers
+    still wait. That deadline is extended to the longest waiter's budget.
+    """
+    
+    def __init__(self, window_seconds: float = 0.0):
+        self.window_seconds = window_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self._deadlines: Dict[str, Deadline] = {}
+        self._recent: Dict[str, Tuple[float, Any]] = {}
+        self._stats = {
+            "calls": 0,
+            "executed": 0,
+            "coalesced": 0,
+            "window_hits": 0,
+            "retried": 0,
+            "errors": 0
+        }
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fn` once per key, sharing the result with concurrent duplicates"""
+        self._stats["calls"] += 1
+        
+        recent = self._recent.get(key)
+        if recent and time.monotonic() - recent[0] <= self.window_seconds:
+            self._stats["window_hits"] += 1
+            return copy.deepcopy(recent[1])
+        
+        result, led = await self._join(key, fn)
+        if not led and _failed(result):
+            # A duplicate does not take the leader's error as its answer; it runs
+            # once more, coalesced with the other duplicates that were waiting
+            self._stats["retried"] += 1
+            result, _ = await self._join(key, fn)
+        
+        # Every waiter gets its own copy, so callers can mutate their result
+        return copy.deepcopy(result)
+    
+    async def _join(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Wait for the shared work for `key`, starting it if needed; return (result, led)"""
+        future = self._inflight.get(key)
+        led = future is None
+        if led:
+            self._stats["executed"] += 1
+            future = self._start(key, fn)
+        else:
+            self._stats["coalesced"] += 1
+            self._deadlines[key].extend(current_deadline())
+        
+        # Shield so one caller disconnecting does not cancel the shared work;
+        # the work is only cancelled once every waiter has gone away
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(future), led
+        except asyncio.CancelledError:
+            if self._waiters.get(key) == 1 and not future.done():
+                waiter_deadline = current_deadline()
+                reason = waiter_deadline.cancel_reason if waiter_deadline else None
+                self._deadlines[key].cancel(reason or "cancelled")
+                future.cancel()
+            raise
+        finally:
+            remaining = self._waiters.get(key, 1) - 1
+            if remaining > 0:
+                self._waiters[key] = remaining
+            else:
+                self._waiters.pop(key, None)
+    
+    def _start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Run `fn` as the shared work for `key`, detached from the leader's deadline"""
+        deadline = Deadline()
+        leader_deadline = current_deadline()
+        deadline.expires_at = leader_deadline.expires_at if leader_deadline else None
+        self._deadlines[key] = deadline
+        
+        async def run():
+            # Other context (budget scope, trace span) is still inherited from the leader
+            with use_deadline(deadline):
+                return await fn()
+        
+        future = asyncio.ensure_future(run())
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._finish(key, f))
+        return future
+    
+    def _finish(self, key: str, future: asyncio.Future):
+        """Move a completed future out of the in-flight table"""
+        self._inflight.pop(key, None)
+        self._deadlines.pop(key, None)
+        
+        if future.cancelled() or future.exception() is not None or _failed(future.result()):
+            self._stats["errors"] += 1
+        elif self.window_seconds > 0:
+            self._recent[key] = (time.monotonic(), future.result())
+        
+        self._prune()
+    
+    def _prune(self):
+        """Drop results that have aged out of the coalescing window"""
+        cutoff = time.monotonic() - self.window_seconds
+        for key in [k for k, (ts, _) in self._recent.items() if ts < cutoff]:
+            del self._recent[key]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing metrics"""
+        calls = self._stats["calls"]
+        saved = self._stats["coalesced"] + self._stats["window_hits"]
+        return {
+            **self._stats,
+            "in_flight": len(self._inflight),
+            "window_seconds": self.window_seconds,
+            "coalesce_rate": round(saved / calls, 4) if calls else 0.0
+        }
@@ -0,0 +1,137 @@
+"""
+Lazy Initialization and Startup Profile
+Framework components are built on first use instead of at boot, optionally
+warmed in the background once the API is serving. Every import and init is
+timed so cold start can be broken down per component
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+from shared.metrics import metrics
+
+
+T = TypeVar("T")
+
+# Monotonic reference for "time since process start"; set when this module is first imported
+PROCESS_START = time.perf_counter()
+
+
+# =============================================================================
+# STARTUP PROFILE
+# =============================================================================
+
+class StartupProfile:
+    """Per-component import and init durations plus when each became ready"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._ready_at: Optional[float] = None
+
+    @contextmanager
+    def phase(self, component: str, phase: str):
+        """Time one phase ("import", "init", ...) of a component"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(component, phase, time.perf_counter() - start)
+
+    def record(self, component: str, phase: str, seconds: float):
+        with self._lock:
+            entry = self._components.setdefault(component, {})
+            entry[f"{phase}_ms"] = round(entry.get(f"{phase}_ms", 0.0) + seconds * 1000, 1)
+        metrics.set_gauge("startup_phase_seconds", round(seconds, 4), component=component, phase=phase)
+
+    def mark(self, component: str, **fields):
+        """Attach fields (trigger, ready time, error) to a component"""
+        with self._lock:
+            self._components.setdefault(component, {}).update(fields)
+
+    def mark_serving(self):
+        """Record the moment the API started accepting requests"""
+        with self._lock:
+            if self._ready_at is None:
+                self._ready_at = time.perf_counter()
+
+    def get_report(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: dict(entry) for name, entry in self._components.items()}
+            ready_at = self._ready_at
+        return {
+            "serving_after_ms": round((ready_at - PROCESS_START) * 1000, 1) if ready_at else None,
+            "uptime_s": round(time.perf_counter() - PROCESS_START, 1),
+            "components": components
+        }
+
+
+startup_profile = StartupProfile()
+
+
+# =============================================================================
+# LAZY COMPONENTS
+# =============================================================================
+
+class LazyComponent(Generic[T]):
+    """
+    A component built by `factory` on first `get()`.
+    The build runs as a task of its own that concurrent callers wait on, so a
+    caller that is cancelled (client disconnect, deadline) leaves it running
+    for the rest; a failed build is not cached, so the next caller retries it.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Awaitable[T]]):
+        self.name = name
+        self.factory = factory
+        self._value: Optional[T] = None
+        self._build: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not None
+
+    def peek(self) -> Optional[T]:
+        """The component if already built, without triggering a build"""
+        return self._value
+
+    async def get(self, trigger: str = "request") -> T:
+        if self._value is not None:
+            return self._value
+        if self._build is None:
+            # A fresh context keeps the first caller's deadline and trace span off the shared build
+            self._build = contextvars.Context().run(asyncio.ensure_future, self._run_build(trigger))
+            # Nobody may be left waiting when it fails
+            self._build.add_done_callback(lambda build: build.cancelled() or build.exception())
+        return await asyncio.shield(self._build)
+
+    async def _run_build(self, trigger: str) -> T:
+        start = time.perf_counter()
+        try:
+            value = await self.factory()
+        except asyncio.CancelledError:
+            self._build = None
+            raise
+        except Exception as e:
+            self._build = None
+            startup_profile.mark(self.name, error=str(e))
+            raise
+        self._value = value
+        startup_profile.mark(
+            self.name,
+            trigger=trigger,
+            total_ms=round((time.perf_counter() - start) * 1000, 1),
+            ready_after_ms=round((time.perf_counter() - PROCESS_START) * 1000, 1),
+            error=None
+        )
+        return value
+
+    def reset(self) -> Optional[T]:
+        """Forget the built component (returned so the caller can close it)"""
+        value, self._value = self._value, None
+        self._build = None
+        return value
@@ -0,0 +1,257 @@
+"""
+Shared State Backends
+State that must look the same from every API worker and replica: a
+key/value store (user profiles, knowledge base index versions) and the
+LangGraph checkpointer holding conversation state. Local deployments use
+SQLite files on the host; multi-host deployments plug in a network store
+"""
+
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from shared.config import Config
+
+
+STATE_BACKENDS = ("sqlite", "redis")
+CHECKPOINT_BACKENDS = ("memory", "sqlite", "postgres")
+
+
+# =============================================================================
+# KEY/VALUE STORE INTERFACE
+# =============================================================================
+
+class StateStore(ABC):
+    """
+    Namespaced key/value store shared by every worker.
+    Values are JSON-serializable; implementations must make `incr` atomic.
+    """
+
+    backend = "none"
+
+    @abstractmethod
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any):
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        ...
+
+    @abstractmethod
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        """Atomically add `amount` to an integer value and return the new value"""
+
+    @abstractmethod
+    def keys(self, namespace: str) -> List[str]:
+        ...
+
+
+# =============================================================================
+# LOCAL BACKEND
+# =============================================================================
+
+class SQLiteStateStore(StateStore):
+    """State in a local SQLite file, shared by every process on the host"""
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: str = None):
+        self.db_path = str(db_path or Config.STATE_DB_PATH)
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _ensure_schema(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS shared_state (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )"""
+            )
+        finally:
+            conn.close()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM shared_state WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row is not None else default
+
+    def set(self, namespace: str, key: str, value: Any):
+        conn = self._connect()
+        try:
+            conn.execute(
+                """INSERT INTO shared_state (namespace, key, value, updated) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated = excluded.updated""",
+                (namespace, key, json.dumps(value, default=str), time.time())
+            )
+        finally:
+            conn.close()
+
+    def delete(self, namespace: str, key: str):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+        finally:
+            conn.close()
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT value FROM shared_state WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            value = (json.loads(row[0]) if row is not None else 0) + amount
+            conn.execute(
+                """INSERT INTO shared_state (namespace, key, value, updated) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated = excluded.updated""",
+                (namespace, key, json.dumps(value), time.time())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return value
+
+    def keys(self, namespace: str) -> List[str]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT key FROM shared_state WHERE namespace = ?", (namespace,)).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+
+# =============================================================================
+# NETWORK BACKEND
+# =============================================================================
+
+class RedisStateStore(StateStore):
+    """State in Redis, shared across hosts; each namespace is one hash"""
+
+    backend = "redis"
+
+    def __init__(self, url: str = None, prefix: str = "affiliate:"):
+        import redis
+
+        self.url = url or Config.STATE_REDIS_URL
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(self.url)
+
+    def _hash(self, namespace: str) -> str:
+        return f"{self.prefix}{namespace}"
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        value = self.client.hget(self._hash(namespace), key)
+        return json.loads(value) if value is not None else default
+
+    def set(self, namespace: str, key: str, value: Any):
+        self.client.hset(self._hash(namespace), key, json.dumps(value, default=str))
+
+    def delete(self, namespace: str, key: str):
+        self.client.hdel(self._hash(namespace), key)
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        return int(self.client.hincrby(self._hash(namespace), key, amount))
+
+    def keys(self, namespace: str) -> List[str]:
+        return [key.decode("utf-8") for key in self.client.hkeys(self._hash(namespace))]
+
+
+# =============================================================================
+# FACTORIES
+# =============================================================================
+
+_store: Optional[StateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """Get the process-wide state store for Config.STATE_BACKEND"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = Config.STATE_BACKEND
+                if backend == "sqlite":
+                    _store = SQLiteStateStore()
+                elif backend == "redis":
+                    _store = RedisStateStore()
+                else:
+                    raise ValueError(f"Invalid state backend: {backend} (expected one of {STATE_BACKENDS})")
+    return _store
+
+
+def create_checkpointer(backend: str = None):
+    """
+    LangGraph checkpointer for Config.CHECKPOINT_BACKEND.
+
+    - memory: per-process, only valid with a single API worker
+    - sqlite: a local file shared by every worker on the host
+    - postgres: a shared database for multiple hosts (DATABASE_URL by default)
+
+    Persistent savers must be opened with `open_checkpointer` before use.
+    """
+    backend = backend or Config.CHECKPOINT_BACKEND
+    if backend == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+    if backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        Path(Config.CHECKPOINT_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+        return AsyncSqliteSaver(aiosqlite.connect(Config.CHECKPOINT_DB_PATH))
+    if backend == "postgres":
+        from psycopg_pool import AsyncConnectionPool
+        from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+        pool = AsyncConnectionPool(
+            Config.CHECKPOINT_POSTGRES_URL,
+            open=False,
+            kwargs={"autocommit": True, "prepare_threshold": 0}
+        )
+        return AsyncPostgresSaver(pool)
+    raise ValueError(f"Invalid checkpoint backend: {backend} (expected one of {CHECKPOINT_BACKENDS})")
+
+
+async def open_checkpointer(checkpointer):
+    """Open connections and create tables for a persistent checkpointer"""
+    pool = getattr(checkpointer, "conn", None)
+    if hasattr(pool, "open") and getattr(pool, "closed", False):
+        await pool.open()
+    if hasattr(checkpointer, "setup"):
+        await checkpointer.setup()
+
+
+def get_state_status() -> Dict[str, Any]:
+    """Backends in use, for /status"""
+    return {
+        "api_workers": Config.API_WORKERS,
+        "state_backend": Config.STATE_BACKEND,
+        "checkpoint_backend": Config.CHECKPOINT_BACKEND
+    }
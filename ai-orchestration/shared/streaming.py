@@ -0,0 +1,55 @@
+"""
+Context-Isolated Streams
+Async generators that set context variables (deadline, budget scope, trace
+span) around a `yield` leak them into whoever iterates the stream, and fail to
+reset them if the stream is closed from another context. `isolate_stream` runs
+such a generator in a task of its own and hands its items over a queue, so
+every set and reset happens inside that task's context.
+"""
+
+import asyncio
+from typing import AsyncIterator, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+async def isolate_stream(stream: AsyncIterator[T]) -> AsyncIterator[T]:
+    """Iterate `stream` in its own task and yield its items"""
+    # One item of slack keeps the producer just ahead of a slow consumer
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def produce():
+        try:
+            async for item in stream:
+                await queue.put(item)
+        except Exception as e:
+            await queue.put(_Failure(e))
+        else:
+            await queue.put(_END)
+        finally:
+            # A cancelled `async for` leaves the generator suspended; close it here
+            await stream.aclose()
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # Consumer finished or went away: unwind the stream inside its task
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,363 @@
+"""
+Request Tracing
+Spans linking the API handler, orchestrator nodes, core runs, crew tasks and
+the LLM/HTTP calls they trigger. The current span lives in a ContextVar, so
+it follows asyncio tasks and asyncio.to_thread; queued jobs carry it in
+their payload. Finished spans go to local exporters (an in-memory store
+served by /traces and/or JSONL files), so no outside service is needed
+"""
+
+import asyncio
+import json
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from shared.config import Config
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+# =============================================================================
+# SPANS
+# =============================================================================
+
+class Span:
+    """One timed operation within a trace"""
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any] = None, start: float = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.start = start if start is not None else time.time()
+        self.end: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Set attributes (None values are skipped)"""
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def add(self, **counters):
+        """Accumulate numeric attributes such as token counts"""
+        for key, value in counters.items():
+            if value:
+                self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def fail(self, error: BaseException):
+        # A client going away or a deadline cancelling the work is not a failure of this span
+        self.status = "cancelled" if isinstance(error, (asyncio.CancelledError, GeneratorExit)) else "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def context(self) -> Dict[str, str]:
+        """Reference to this span that can be stored and used as a parent elsewhere"""
+        return {"trace_id": self.trace_id, "span_id": self.span_id}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_ms": round(((self.end or time.time()) - self.start) * 1000, 2),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan(Span):
+    """Returned while tracing is disabled so call sites never branch"""
+
+    def __init__(self):
+        super().__init__("noop", "noop", "0" * 32, None)
+
+    def set(self, **attributes):
+        pass
+
+    def add(self, **counters):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Dict[str, str]]:
+    """Parent span from a W3C `traceparent` header (version-trace_id-span_id-flags)"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return {"trace_id": parts[1], "span_id": parts[2]}
+
+
+# =============================================================================
+# EXPORTERS
+# =============================================================================
+
+class InMemoryExporter:
+    """The most recent `max_traces` traces, for the /traces viewer"""
+
+    def __init__(self, max_traces: int = None, max_spans: int = None):
+        self.max_traces = max_traces or Config.TRACE_MAX_TRACES
+        self.max_spans = max_spans or Config.TRACE_MAX_SPANS_PER_TRACE
+        self._lock = threading.Lock()
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+    def export(self, span: Dict[str, Any]):
+        with self._lock:
+            spans = self._traces.get(span["trace_id"])
+            if spans is None:
+                spans = self._traces[span["trace_id"]] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            if len(spans) < self.max_spans:
+                spans.append(span)
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Every span of a trace in start order, with its depth in the call tree"""
+        with self._lock:
+            spans = [dict(span) for span in self._traces.get(trace_id, [])]
+        if not spans:
+            return None
+        spans.sort(key=lambda span: span["start"])
+        depth: Dict[str, int] = {}
+        for span in spans:
+            span["depth"] = depth.get(span["parent_id"], -1) + 1
+            depth[span["span_id"]] = span["depth"]
+        return {**self._summarize(trace_id, spans), "spans": spans}
+
+    def list_traces(self, limit: int = 50, min_duration_ms: float = 0) -> List[Dict[str, Any]]:
+        """Newest traces first, optionally only those slower than `min_duration_ms`"""
+        with self._lock:
+            traces = [(trace_id, list(spans)) for trace_id, spans in reversed(self._traces.items())]
+        summaries = []
+        for trace_id, spans in traces:
+            summary = self._summarize(trace_id, spans)
+            if summary["duration_ms"] >= min_duration_ms:
+                summaries.append(summary)
+                if len(summaries) >= limit:
+                    break
+        return summaries
+
+    @staticmethod
+    def _summarize(trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        ids = {span["span_id"] for span in spans}
+        roots = [span for span in spans if span["parent_id"] not in ids] or spans
+        root = min(roots, key=lambda span: span["start"])
+        start = min(span["start"] for span in spans)
+        end = max(span["start"] + span["duration_ms"] / 1000 for span in spans)
+        core = next((span["attributes"]["core"] for span in spans if span["attributes"].get("core")), None)
+        return {
+            "trace_id": trace_id,
+            "name": root["name"],
+            "start": start,
+            "duration_ms": round((end - start) * 1000, 2),
+            "span_count": len(spans),
+            "status": "error" if any(span["status"] == "error" for span in spans) else "ok",
+            "core": core
+        }
+
+
+class FileExporter:
+    """
+    Appends finished spans as JSON lines to one file per day.
+    Spans are queued for a writer thread (started on the first export) that
+    appends them in batches, so finishing a span never waits on disk.
+    """
+
+    def __init__(self, directory: str = None, batch_size: int = 500):
+        self.directory = Path(directory or Config.TRACE_DIR)
+        self.batch_size = batch_size
+        self._pending: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Dict[str, Any]):
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="trace-file-writer", daemon=True)
+                    self._writer.start()
+        self._pending.put((day, json.dumps(span, default=str)))
+
+    def _write_loop(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines_by_day: Dict[str, List[str]] = {}
+            for day, line in batch:
+                lines_by_day.setdefault(day, []).append(line)
+            try:
+                for day, lines in lines_by_day.items():
+                    with open(self.directory / f"traces-{day}.jsonl", "a", encoding="utf-8") as f:
+                        f.write("\n".join(lines) + "\n")
+            except Exception as e:
+                print(f"Error writing spans: {e}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def flush(self):
+        """Block until every exported span is on disk"""
+        self._pending.join()
+
+
+# =============================================================================
+# TRACER
+# =============================================================================
+
+class Tracer:
+    """Creates spans, tracks the current one and hands finished spans to the exporters"""
+
+    def __init__(self, enabled: bool = None, exporters: List[str] = None):
+        self.enabled = Config.TRACING_ENABLED if enabled is None else enabled
+        self.memory: Optional[InMemoryExporter] = None
+        self._exporters = []
+        for name in exporters if exporters is not None else Config.TRACE_EXPORTERS:
+            if name == "memory":
+                self.memory = InMemoryExporter()
+                self._exporters.append(self.memory)
+            elif name == "file":
+                self._exporters.append(FileExporter())
+            else:
+                raise ValueError(f"Invalid trace exporter: {name} (expected memory or file)")
+
+    def current(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def annotate(self, **attributes):
+        """Set attributes on the current span, if any"""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def _new_span(self, name: str, kind: str, parent: Optional[Dict[str, str]],
+                  attributes: Dict[str, Any], start: float = None) -> Span:
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        if parent is None:
+            return Span(name, kind, _new_id(128), None, attributes, start)
+        return Span(name, kind, parent["trace_id"], parent["span_id"], attributes, start)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", parent: Optional[Dict[str, str]] = None,
+             **attributes) -> Iterator[Span]:
+        """
+        Time the body as a child of the current span (or of `parent`, a span
+        `context` carried across a process or queue boundary)
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        span = self._new_span(name, kind, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record(self, name: str, duration: float, kind: str = "internal", parent: Optional[Span] = None,
+               error: str = None, **attributes):
+        """Record a span that just finished, for operations timed by callbacks rather than a block"""
+        if not self.enabled:
+            return
+        end = time.time()
+        span = self._new_span(name, kind, parent.context if parent is not None else None, attributes, end - duration)
+        if error:
+            span.status, span.error = "error", error
+        self._finish(span, end)
+
+    def _finish(self, span: Span, end: float = None):
+        span.end = end or time.time()
+        data = span.to_dict()
+        for exporter in self._exporters:
+            try:
+                exporter.export(data)
+            except Exception as e:
+                print(f"Error exporting span: {e}")
+
+    def flush(self):
+        """Block until exporters that write in the background have caught up"""
+        for exporter in self._exporters:
+            if hasattr(exporter, "flush"):
+                exporter.flush()
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        return self.memory.get_trace(trace_id) if self.memory else None
+
+    def list_traces(self, limit: int = 50, min_duration_ms: float = 0) -> List[Dict[str, Any]]:
+        return self.memory.list_traces(limit, min_duration_ms) if self.memory else []
+
+
+tracer = Tracer()
+
+
+# =============================================================================
+# ASGI MIDDLEWARE
+# =============================================================================
+
+class TracingMiddleware:
+    """
+    Opens the root span of every HTTP request and returns its id in
+    `X-Trace-Id`. Implemented as plain ASGI so the span stays open (and
+    current) while a streaming response body is produced.
+    """
+
+    def __init__(self, app, exclude: tuple = ("/traces", "/metrics")):
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not tracer.enabled or path.startswith(self.exclude):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        method = scope.get("method", "GET")
+        with tracer.span(f"{method} {path}", kind="http", parent=parent, method=method, path=path) as span:
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    span.set(status_code=message["status"])
+                    if message["status"] >= 500:
+                        span.status = "error"
+                    message = {
+                        **message,
+                        "headers": [*message.get("headers", []), (b"x-trace-id", span.trace_id.encode())]
+                    }
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
@@ -0,0 +1,21 @@
+"""
+Shared pytest setup.
+Config reads the environment at import time, so the state directory is
+pointed at a throwaway location before anything from shared/ is imported.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+STATE_DIR = Path(tempfile.mkdtemp(prefix="ai-orchestration-tests-"))
+
+os.environ.update({
+    "STATE_DIR": str(STATE_DIR),
+    "API_WORKERS": "1",
+    "WARMUP_ENABLED": "false",
+})
+
+sys.path.insert(0, str(PACKAGE_DIR))
@@ -0,0 +1,78 @@
+"""Tests for admission control gates"""
+
+import asyncio
+
+import pytest
+
+from shared.admission import AdmissionGate, AdmissionRejected
+
+
+def test_gate_bounds_concurrency():
+    async def run():
+        gate = AdmissionGate("test", limit=2)
+        active = []
+        peak = []
+
+        async def call():
+            async with gate.slot():
+                active.append(1)
+                peak.append(len(active))
+                await asyncio.sleep(0.01)
+                active.pop()
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        return max(peak), gate.get_stats()
+
+    peak, stats = asyncio.run(run())
+
+    assert peak == 2
+    assert (stats["admitted"], stats["in_flight"], stats["waiting"]) == (6, 0, 0)
+
+
+def test_full_queue_rejects_at_once():
+    async def run():
+        gate = AdmissionGate("test", limit=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with gate.slot():
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        queued = asyncio.ensure_future(hold())
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await gate.acquire()
+        release.set()
+        await asyncio.gather(holder, queued)
+        return exc_info.value, gate.get_stats()
+
+    rejected, stats = asyncio.run(run())
+
+    assert rejected.reason == "queue_full" and rejected.retry_after >= 1
+    assert (stats["rejected"], stats["admitted"], stats["in_flight"]) == (1, 2, 0)
+
+
+def test_queued_caller_is_rejected_after_max_wait():
+    async def run():
+        gate = AdmissionGate("test", limit=1, max_wait=0.02)
+        granted = await gate.acquire()
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await gate.acquire()
+        gate.release(granted)
+        # The timed-out waiter left the queue; the slot is free again
+        gate.release(await gate.acquire())
+        return exc_info.value, gate.get_stats()
+
+    rejected, stats = asyncio.run(run())
+
+    assert rejected.reason == "wait_timeout"
+    assert (stats["waiting"], stats["in_flight"], stats["rejected"]) == (0, 0, 1)
+
+
+def test_disabled_gate_admits_everyone():
+    async def run():
+        gate = AdmissionGate("test", limit=1, max_queue=0, enabled=False)
+        return await asyncio.gather(*(gate.acquire() for _ in range(3)))
+
+    assert len(asyncio.run(run())) == 3
@@ -0,0 +1,87 @@
+"""Tests for token budgets and the usage ledger"""
+
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from shared.budget import BudgetExceeded, BudgetLedger, budget_scope
+from shared.config import Config
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TOKEN_BUDGETS", {
+        "daily": {"soft_tokens": 1_000, "hard_tokens": 2_000},
+        "session": {"soft_tokens": 100, "hard_tokens": 200}
+    })
+    monkeypatch.setattr(Config, "CORE_TOKEN_BUDGETS", {})
+    monkeypatch.setattr(Config, "BUDGET_UNTRACKED_SESSIONS", ["default", "core_*"])
+    monkeypatch.setattr(Config, "BUDGET_DOWNGRADE_MODEL", "gpt-4o-mini")
+    return BudgetLedger(tmp_path / "budgets.sqlite3")
+
+
+def test_check_passes_under_the_soft_budget(ledger):
+    with budget_scope(session="alice"):
+        decision = ledger.check("gpt-4o", 10, 10)
+
+    assert decision == {"model": "gpt-4o", "downgraded": False, "reason": None}
+
+
+def test_check_downgrades_over_the_soft_budget(ledger):
+    with budget_scope(session="alice"):
+        ledger.record("gpt-4o", 60, 40)
+        decision = ledger.check("gpt-4o", 10, 10)
+
+    assert decision["downgraded"] is True
+    assert decision["model"] == "gpt-4o-mini"
+    assert "session budget 'alice'" in decision["reason"]
+
+
+def test_check_raises_over_the_hard_budget(ledger):
+    with budget_scope(session="alice"):
+        ledger.record("gpt-4o", 150, 40)
+        with pytest.raises(BudgetExceeded) as exc_info:
+            ledger.check("gpt-4o", 10, 10)
+        # Nothing is spent past the limit yet, so other calls may still run
+        ledger.ensure_available()
+
+    assert (exc_info.value.scope, exc_info.value.key, exc_info.value.unit) == ("session", "alice", "tokens")
+
+
+def test_session_budgets_reset_each_day(ledger):
+    with budget_scope(session="alice"):
+        ledger.record("gpt-4o", 160, 50)
+        with pytest.raises(BudgetExceeded):
+            ledger.ensure_available()
+
+    # Move yesterday's usage out of today
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    conn = sqlite3.connect(ledger.db_path)
+    with conn:
+        conn.execute("UPDATE token_usage SET day = ?", (yesterday,))
+    conn.close()
+
+    with budget_scope(session="alice"):
+        ledger.ensure_available()
+        assert ledger.check("gpt-4o", 10, 10)["downgraded"] is False
+
+
+@pytest.mark.parametrize("session", ["default", "core_affiliate_marketing"])
+def test_shared_sessions_get_no_session_budget(ledger, session):
+    with budget_scope(session=session):
+        ledger.record("gpt-4o", 500, 300)
+        ledger.ensure_available()
+        assert ledger.check("gpt-4o", 10, 10)["downgraded"] is False
+
+    assert ledger.get_usage()["sessions"] == {}
+    assert ledger.get_usage()["daily"]["total_tokens"] == 800
+
+
+def test_ensure_available_counts_expected_usage(ledger):
+    with budget_scope(session="alice"):
+        ledger.record("gpt-4o", 100, 50)
+        ledger.ensure_available()
+        ledger.ensure_available(expected_tokens=50)
+        with pytest.raises(BudgetExceeded):
+            ledger.ensure_available(expected_tokens=60)
@@ -0,0 +1,94 @@
+"""Tests for the model cascade"""
+
+import asyncio
+
+import pytest
+
+from shared import cascade
+from shared.config import Config
+
+
+def test_confidence_filter_streams_the_answer_without_its_confidence_line():
+    hold_back = cascade.ConfidenceFilter()
+    tokens = ["Route", " to off", "er\n", "Con", "tinue here\n", "**CONF", "IDENCE:", " 0.9**"]
+
+    streamed = [hold_back.feed(token) for token in tokens] + [hold_back.flush()]
+
+    assert streamed[:2] == ["Route", " to off"]
+    assert "".join(streamed) == "Route to offer\nContinue here\n"
+
+
+def test_cascade_is_off_by_default():
+    assert cascade.cascade_models(["gpt-4o-mini", "gpt-4o"]) == ["gpt-4o"]
+
+
+def test_content_sections_need_their_headings():
+    pytest.importorskip("openai")
+    from runners.content_generation_runner import CONTENT_SECTIONS
+
+    validate = cascade.require_sections(*CONTENT_SECTIONS.values())
+    loose = "Read this ad, then the email, then the LinkedIn post and the video script."
+
+    assert validate(loose) is not None
+    assert validate("\n".join(f"{heading}\n..." for heading in CONTENT_SECTIONS.values())) is None
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    pytest.importorskip("openai")
+    from shared import llm_gateway
+
+    gateway = llm_gateway.LLMGateway(api_key="test", base_url="http://llm.test/v1")
+    gateway.answers = {"gpt-4o-mini": ["unsure"], "gpt-4o": ["offer", "_intelligence"]}
+    gateway.prompts = []
+
+    async def achat(messages, model=None, source=None, on_token=None, **kwargs):
+        gateway.prompts.append(messages)
+        tokens = gateway.answers[model]
+        for token in tokens:
+            if on_token:
+                await on_token(token)
+        return {"content": "".join(tokens), "model": model, "prompt_tokens": 10, "completion_tokens": len(tokens),
+                "total_tokens": 10 + len(tokens), "latency_ms": 1.0}
+
+    monkeypatch.setattr(gateway, "achat", achat)
+    monkeypatch.setattr(Config, "CASCADE_ENABLED", True)
+    return gateway
+
+
+def test_achat_cascade_streams_the_last_tier_token_by_token(gateway):
+    tokens = []
+    validators = [cascade.require_choice(["offer_intelligence"])]
+
+    result = asyncio.run(gateway.achat_cascade(
+        [{"role": "user", "content": "route"}], validators=validators,
+        models=["gpt-4o-mini", "gpt-4o"], on_token=tokens.append
+    ))
+
+    assert tokens == ["offer", "_intelligence"]
+    assert (result["tier"], result["content"]) == (1, "offer_intelligence")
+
+
+def test_achat_cascade_passes_an_accepted_early_tier_in_one_piece(gateway):
+    tokens = []
+    gateway.answers["gpt-4o-mini"] = ["offer_", "intelligence"]
+
+    result = asyncio.run(gateway.achat_cascade(
+        [{"role": "user", "content": "route"}], validators=[cascade.require_choice(["offer_intelligence"])],
+        models=["gpt-4o-mini", "gpt-4o"], on_token=tokens.append
+    ))
+
+    assert tokens == ["offer_intelligence"]
+    assert result["tier"] == 0
+
+
+def test_single_tier_skips_the_confidence_check(gateway, monkeypatch):
+    monkeypatch.setattr(Config, "CASCADE_ENABLED", False)
+    validators = [cascade.require_choice(["offer_intelligence"]), cascade.min_confidence()]
+
+    result = asyncio.run(gateway.achat_cascade(
+        [{"role": "user", "content": "route"}], validators=validators, models=["gpt-4o-mini", "gpt-4o"]
+    ))
+
+    assert cascade.CONFIDENCE_INSTRUCTION not in str(gateway.prompts)
+    assert (result["tier"], result["content"]) == (0, "offer_intelligence")
@@ -0,0 +1,85 @@
+"""Tests for the shared CrewAI kickoff path"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from shared import crew_runner
+from shared.budget import BudgetExceeded
+from shared.config import Config
+from shared.crew_runner import kickoff_crew
+from shared.deadline import Deadline, DeadlineExceeded, use_deadline
+
+
+class FakeCrew:
+    def __init__(self, steps: int = 3):
+        self.steps = steps
+        self.task_callback = None
+        self.step_callback = None
+        self.on_step = lambda step: None
+        self.inputs = None
+        self.completed_steps = 0
+
+    async def kickoff_async(self, inputs):
+        self.inputs = inputs
+        for step in range(self.steps):
+            self.on_step(step)
+            if self.step_callback:
+                self.step_callback(step)
+            self.completed_steps += 1
+        self.task_callback(SimpleNamespace(name="research", agent="researcher"))
+        return SimpleNamespace(
+            token_usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+            model_dump=lambda: {"answer": 42}
+        )
+
+
+@pytest.fixture(autouse=True)
+def no_budgets(monkeypatch):
+    monkeypatch.setattr(Config, "BUDGET_ENABLED", False)
+
+
+def test_kickoff_crew_packages_output():
+    crew = FakeCrew()
+
+    result = asyncio.run(kickoff_crew(crew, "offer_intelligence", "find offers"))
+
+    assert result == {"core": "offer_intelligence", "status": "completed", "result": {"answer": 42}}
+    assert crew.inputs == {"input": "find offers"}
+
+
+def test_kickoff_crew_stops_at_the_next_step_once_cancelled():
+    crew = FakeCrew()
+    deadline = Deadline(60)
+    crew.on_step = lambda step: deadline.cancel("client_disconnected") if step == 1 else None
+
+    async def run():
+        with use_deadline(deadline):
+            return await kickoff_crew(crew, "offer_intelligence", "find offers")
+
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        asyncio.run(run())
+    assert excinfo.value.stage == "crew:offer_intelligence"
+    assert excinfo.value.reason == "client_disconnected"
+    assert crew.completed_steps == 1
+
+
+def test_kickoff_crew_is_refused_when_its_expected_usage_is_over_budget(monkeypatch):
+    expected = []
+
+    class Ledger:
+        def ensure_available(self, expected_tokens=0, model=None):
+            expected.append(expected_tokens)
+            raise BudgetExceeded("daily", "all", "tokens", 100, 100)
+
+    monkeypatch.setattr(Config, "BUDGET_ENABLED", True)
+    monkeypatch.setattr(Config, "CREW_EXPECTED_TOKENS", 5_000)
+    monkeypatch.setattr(crew_runner, "get_ledger", Ledger)
+    crew = FakeCrew()
+
+    with pytest.raises(BudgetExceeded):
+        asyncio.run(kickoff_crew(crew, "offer_intelligence", "find offers"))
+
+    assert expected == [5_000]
+    assert crew.inputs is None
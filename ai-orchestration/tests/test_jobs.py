@@ -0,0 +1,108 @@
+"""Tests for the persistent job queue and its worker pool"""
+
+import asyncio
+
+import pytest
+
+from shared.config import TaskStatus
+from shared.jobs import JobQueue, JobWorkerPool, report_progress
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3", stale_seconds=60)
+
+
+def test_claim_takes_highest_priority_then_oldest(queue):
+    low = queue.submit("echo", {"n": 1})
+    high = queue.submit("echo", {"n": 2}, priority=5)
+    older = queue.submit("echo", {"n": 3})
+
+    claimed = [queue.claim()["id"] for _ in range(3)]
+
+    assert claimed == [high, low, older]
+    assert queue.claim() is None
+    assert queue.get(high)["status"] == TaskStatus.RUNNING.value
+
+
+def test_cancel_only_affects_queued_jobs(queue):
+    queued = queue.submit("echo", {})
+    running = queue.submit("echo", {})
+    queue.cancel(queued)
+    queue.claim()
+
+    assert not queue.cancel(running)
+    assert queue.get(queued)["status"] == TaskStatus.CANCELLED.value
+    assert queue.claim() is None
+
+
+def test_requeue_stale_returns_abandoned_jobs(queue):
+    job_id = queue.submit("echo", {})
+    queue.claim()
+
+    assert queue.requeue_stale() == 0  # heartbeat is fresh
+    queue.stale_seconds = -1
+    assert queue.requeue_stale() == 1
+
+    job = queue.get(job_id)
+    assert (job["status"], job["stage"], job["queue_position"]) == ("pending", "requeued", 0)
+    assert queue.claim()["attempts"] == 2
+
+
+def test_superseded_attempt_cannot_touch_the_job(queue):
+    job_id = queue.submit("echo", {})
+    first = queue.claim()
+    queue.stale_seconds = -1  # the first worker stalls
+    assert queue.requeue_stale() == 1
+    second = queue.claim()
+
+    assert (first["attempts"], second["attempts"]) == (1, 2)
+    assert not queue.heartbeat(job_id, first["attempts"])
+    assert not queue.update_progress(job_id, first["attempts"], 0.5, "stale")
+    assert not queue.finish(job_id, first["attempts"], TaskStatus.FAILED.value, error="stale worker")
+    assert queue.heartbeat(job_id, second["attempts"])
+    assert queue.finish(job_id, second["attempts"], TaskStatus.COMPLETED.value, {"ok": True})
+
+    job = queue.get(job_id)
+    assert (job["status"], job["result"], job["error"], job["stage"]) == ("completed", {"ok": True}, None, "requeued")
+
+
+def test_wait_returns_the_finished_job(queue):
+    async def handler(payload):
+        await report_progress(0.5, "echoing")
+        await asyncio.sleep(0.05)
+        return {"echo": payload["value"]}
+
+    async def run():
+        pool = JobWorkerPool(queue, {"echo": handler}, workers=1, poll_interval=5)
+        await pool.start()
+        try:
+            job_id = queue.submit("echo", {"value": 42})
+            pool.notify()
+            return await asyncio.wait_for(pool.wait(job_id), timeout=2)
+        finally:
+            await pool.stop()
+
+    job = asyncio.run(run())
+
+    assert job["status"] == TaskStatus.COMPLETED.value
+    assert job["result"] == {"echo": 42}
+    assert job["stage"] == "echoing"
+
+
+def test_wait_polls_jobs_finished_elsewhere(queue):
+    job_id = queue.submit("echo", {})
+
+    async def run():
+        pool = JobWorkerPool(queue, {}, workers=1, poll_interval=0.01)
+        waiter = asyncio.create_task(pool.wait(job_id))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        # Another process claims and finishes the job
+        claimed = await asyncio.to_thread(queue.claim)
+        await asyncio.to_thread(
+            queue.finish, claimed["id"], claimed["attempts"], TaskStatus.COMPLETED.value, {"ok": True}
+        )
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    assert asyncio.run(run())["result"] == {"ok": True}
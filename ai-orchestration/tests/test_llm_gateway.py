@@ -0,0 +1,117 @@
+"""Tests for the pooled LLM gateway's accounting hooks"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("openai")
+
+from shared import llm_gateway
+
+
+def chat_response(status_code: int = 200) -> "httpx.Response":
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions", json={"model": "gpt-4o-mini"})
+    request.extensions["llm_call"] = {"endpoint": "chat/completions", "model": "gpt-4o-mini", "estimated": 50}
+    request.extensions["gateway_start"] = time.perf_counter()
+    body = {"model": "gpt-4o-mini", "usage": {"prompt_tokens": 12, "completion_tokens": 8, "total_tokens": 20}}
+    return httpx.Response(status_code, json=body, request=request)
+
+
+def test_async_response_hook_accounts_off_the_event_loop(monkeypatch):
+    threads = []
+    account = llm_gateway._account
+
+    def recording_account(response):
+        threads.append(threading.current_thread())
+        return account(response)
+
+    monkeypatch.setattr(llm_gateway, "_account", recording_account)
+
+    asyncio.run(llm_gateway._on_response_async(chat_response()))
+
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_account_returns_actual_usage():
+    assert llm_gateway._account(chat_response()) == {"prompt_tokens": 12, "completion_tokens": 8}
+
+
+class FakeStream:
+    """An OpenAI chat completion stream: one content chunk, then a usage chunk"""
+
+    def __init__(self, call):
+        request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+        request.extensions["llm_call"] = call
+        self.response = httpx.Response(200, request=request)
+
+    async def __aiter__(self):
+        delta = SimpleNamespace(content="hi")
+        yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta, finish_reason="stop")])
+        yield SimpleNamespace(usage=SimpleNamespace(prompt_tokens=12, completion_tokens=1, total_tokens=13), choices=[])
+
+
+def test_streamed_call_settles_its_estimate_when_done(monkeypatch):
+    gateway = llm_gateway.LLMGateway(api_key="test", base_url="http://llm.test/v1")
+    call = {"endpoint": "chat/completions", "model": "gpt-4o-mini", "estimated": 50}
+    charged = []
+
+    async def create(**kwargs):
+        return FakeStream(call)
+
+    monkeypatch.setattr(gateway.async_client.chat.completions, "create", create)
+    monkeypatch.setattr(llm_gateway, "_charge", lambda *args: charged.append(args))
+    tokens = []
+
+    result = asyncio.run(gateway._astream({"model": "gpt-4o-mini", "messages": []}, tokens.append))
+
+    assert (tokens, result["content"]) == (["hi"], "hi")
+    assert charged == [(call, "gpt-4o-mini", 12, 1)]
+
+
+@pytest.fixture
+def gateway(tmp_path, monkeypatch):
+    from shared.llm_cache import LLMResponseCache
+
+    gateway = llm_gateway.LLMGateway(api_key="test", base_url="http://llm.test/v1")
+    gateway.cache = LLMResponseCache(path=str(tmp_path / "llm_cache.sqlite3"))
+    gateway.calls = []
+
+    def downgrade(request):
+        request["model"] = "gpt-4o-mini"
+
+    def chat(request, source):
+        gateway.calls.append(request["model"])
+        return {"content": "answer", "model": request["model"], "prompt_tokens": 10, "completion_tokens": 5}
+
+    async def achat(request, source, on_token=None):
+        return chat(request, source)
+
+    monkeypatch.setattr(gateway, "_apply_budget", downgrade)
+    monkeypatch.setattr(gateway, "_chat", chat)
+    monkeypatch.setattr(gateway, "_ahedged", achat)
+    return gateway
+
+
+def test_downgraded_answer_is_served_from_cache(gateway):
+    messages = [{"role": "user", "content": "score this offer"}]
+
+    first = gateway.chat(messages, model="gpt-4o", temperature=0)
+    second = gateway.chat(messages, model="gpt-4o", temperature=0)
+
+    assert gateway.calls == ["gpt-4o-mini"]
+    assert first.get("response_cache") != "hit" and second["response_cache"] == "hit"
+
+
+def test_downgraded_answer_is_served_from_cache_async(gateway):
+    messages = [{"role": "user", "content": "score this offer asynchronously"}]
+
+    async def run():
+        await gateway.achat(messages, model="gpt-4o", temperature=0)
+        return await gateway.achat(messages, model="gpt-4o", temperature=0)
+
+    assert asyncio.run(run())["response_cache"] == "hit"
+    assert gateway.calls == ["gpt-4o-mini"]
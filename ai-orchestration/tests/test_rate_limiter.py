@@ -0,0 +1,117 @@
+"""Tests for the cross-process LLM rate limiter"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from shared import rate_limiter
+from shared.rate_limiter import SharedTokenBucket
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def bucket(tmp_path, clock):
+    return SharedTokenBucket("test-model", rpm=60, tpm=6000, db_path=tmp_path / "rate_limits.sqlite3")
+
+
+def test_tokens_refill_over_time(bucket, clock):
+    assert bucket.try_acquire(6000) == 0.0
+    assert bucket.try_acquire(600) == pytest.approx(6.0)
+    clock.sleep(6)
+    assert bucket.try_acquire(600) == 0.0
+    clock.sleep(3600)
+    assert bucket.get_state()["tokens_available"] == 6000  # refill stops at capacity
+
+
+def test_requests_per_minute_are_limited(tmp_path, clock):
+    bucket = SharedTokenBucket("test-model", rpm=2, tpm=6000, db_path=tmp_path / "rate_limits.sqlite3")
+
+    assert bucket.try_acquire(1) == bucket.try_acquire(1) == 0.0
+    assert bucket.try_acquire(1) == pytest.approx(30.0)
+
+
+def test_reconcile_returns_overestimates_and_charges_shortfalls(bucket, clock):
+    bucket.try_acquire(1000)
+    bucket.reconcile(estimated=1000, actual=200)
+    assert bucket.get_state()["tokens_available"] == 5800
+
+    bucket.try_acquire(100)
+    bucket.reconcile(estimated=100, actual=400)
+    assert bucket.get_state()["tokens_available"] == 5400
+
+
+def test_buckets_are_shared_through_the_database(tmp_path, clock):
+    db_path = tmp_path / "rate_limits.sqlite3"
+    first = SharedTokenBucket("test-model", rpm=60, tpm=6000, db_path=db_path)
+    second = SharedTokenBucket("test-model", rpm=60, tpm=6000, db_path=db_path)
+
+    first.try_acquire(5000)
+    second.penalize(retry_after=5)
+
+    assert second.get_state()["tokens_available"] == 1000
+    assert first.try_acquire(10) == pytest.approx(5.0)
+
+
+def test_calls_reuse_the_thread_connection(bucket, monkeypatch):
+    opened = []
+    connect = rate_limiter.sqlite3.connect
+
+    def counting_connect(*args, **kwargs):
+        opened.append(args)
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(rate_limiter.sqlite3, "connect", counting_connect)
+    for _ in range(3):
+        bucket.try_acquire(10)
+    bucket.reconcile(estimated=30, actual=20)
+
+    assert opened == []  # the connection opened for the schema serves this thread
+
+
+def test_aacquire_runs_the_transaction_off_the_event_loop(bucket, monkeypatch):
+    threads = []
+    try_acquire = bucket.try_acquire
+
+    def recording_try_acquire(tokens):
+        threads.append(threading.current_thread())
+        return try_acquire(tokens)
+
+    monkeypatch.setattr(bucket, "try_acquire", recording_try_acquire)
+
+    assert asyncio.run(bucket.aacquire(100)) == 0.0
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_state_paths_default_to_the_package_directory(tmp_path):
+    env = {k: v for k, v in os.environ.items() if not k.endswith(("_DB_PATH", "_PATH", "_DIR"))}
+    env["PYTHONPATH"] = str(PACKAGE_DIR)
+    output = subprocess.run(
+        [sys.executable, "-c", "from shared.config import Config; print(Config.RATE_LIMIT_DB_PATH)"],
+        cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+    assert Path(output) == PACKAGE_DIR / ".state" / "rate_limits.sqlite3"
@@ -0,0 +1,201 @@
+"""Tests for single-flight request coalescing"""
+
+import asyncio
+
+import pytest
+
+from shared.deadline import Deadline, current_deadline, use_deadline
+from shared.singleflight import SingleFlight
+
+
+def test_concurrent_duplicates_share_one_execution():
+    async def run():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        return results, calls, flight.get_stats()
+
+    results, calls, stats = asyncio.run(run())
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert (stats["executed"], stats["coalesced"], stats["in_flight"]) == (1, 4, 0)
+
+
+def test_cancelled_waiter_detaches_without_stopping_the_others():
+    async def run():
+        flight = SingleFlight()
+        deadlines = []
+
+        async def work():
+            deadlines.append(current_deadline())
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leaving = asyncio.ensure_future(flight.do("key", work))
+        staying = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying, deadlines[0]
+
+    result, shared_deadline = asyncio.run(run())
+
+    assert result == "result"
+    assert shared_deadline.cancel_reason is None
+
+
+def test_window_reuses_a_recent_result():
+    async def run():
+        flight = SingleFlight(window_seconds=10)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        return await flight.do("key", work), await flight.do("key", work), flight.get_stats()
+
+    first, second, stats = asyncio.run(run())
+
+    assert first == second == 1
+    assert stats["window_hits"] == 1
+
+
+def test_shared_work_is_cancelled_when_last_waiter_leaves():
+    async def run():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(10)
+
+        waiter = asyncio.ensure_future(flight.do("key", work))
+        await started.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.01)
+        return flight.get_stats()
+
+    stats = asyncio.run(run())
+
+    assert (stats["in_flight"], stats["errors"]) == (0, 1)
+
+
+async def call_with_deadline(flight: SingleFlight, key: str, fn, timeout_seconds: float):
+    deadline = Deadline(timeout_seconds)
+    with use_deadline(deadline):
+        return await deadline.run(flight.do(key, fn), stage="test")
+
+
+def test_leader_timing_out_does_not_stop_shared_work():
+    async def run():
+        flight = SingleFlight()
+        seen = []
+
+        async def work():
+            await asyncio.sleep(0.1)
+            # Cooperative checks see the shared deadline, not the leader's
+            current_deadline().check("work")
+            seen.append(current_deadline())
+            return "result"
+
+        leader = asyncio.ensure_future(call_with_deadline(flight, "key", work, 0.02))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(call_with_deadline(flight, "key", work, 5))
+        leader_result, follower_result = await asyncio.gather(leader, follower, return_exceptions=True)
+        return leader_result, follower_result, seen
+
+    leader_result, follower_result, seen = asyncio.run(run())
+
+    assert isinstance(leader_result, Exception)
+    assert follower_result == "result"
+    assert len(seen) == 1 and seen[0].remaining() > 4
+
+
+def test_shared_deadline_is_cancelled_when_last_waiter_leaves():
+    async def run():
+        flight = SingleFlight()
+        deadlines = []
+
+        async def work():
+            deadlines.append(current_deadline())
+            await asyncio.sleep(10)
+
+        waiter = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return deadlines[0]
+
+    shared_deadline = asyncio.run(run())
+
+    assert shared_deadline.cancel_reason == "cancelled"
+
+
+def test_unbounded_follower_removes_the_shared_limit():
+    async def run():
+        flight = SingleFlight()
+        deadlines = []
+
+        async def work():
+            deadlines.append(current_deadline())
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.ensure_future(call_with_deadline(flight, "key", work, 1))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.gather(leader, follower)
+        return deadlines[0]
+
+    assert asyncio.run(run()).remaining() is None
+
+
+def test_each_waiter_gets_its_own_copy():
+    async def run():
+        flight = SingleFlight(window_seconds=10)
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return {"result": {"items": []}}
+
+        first, second = await asyncio.gather(flight.do("key", work), flight.do("key", work))
+        first["result"]["items"].append("mutated")
+        return second, await flight.do("key", work)
+
+    second, reused = asyncio.run(run())
+
+    assert second == reused == {"result": {"items": []}}
+
+
+def test_error_results_are_not_shared_or_kept():
+    async def run():
+        flight = SingleFlight(window_seconds=10)
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"error": "upstream failed"} if len(calls) == 1 else {"result": "ok"}
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+        return results, await flight.do("key", work), calls, flight.get_stats()
+
+    results, after, calls, stats = asyncio.run(run())
+
+    # The leader keeps its error; the duplicates rerun together once
+    assert results == [{"error": "upstream failed"}, {"result": "ok"}, {"result": "ok"}]
+    assert after == {"result": "ok"}
+    assert len(calls) == 2
+    assert (stats["errors"], stats["retried"], stats["window_hits"]) == (1, 2, 1)
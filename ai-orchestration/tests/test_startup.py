@@ -0,0 +1,48 @@
+"""Tests for lazily built components"""
+
+import asyncio
+
+import pytest
+
+from shared.startup import LazyComponent
+
+
+def test_cancelled_first_caller_does_not_cancel_the_build():
+    builds = []
+
+    async def factory():
+        builds.append("started")
+        await asyncio.sleep(0.05)
+        return "component"
+
+    async def run():
+        component = LazyComponent("test", factory)
+        first = asyncio.ensure_future(component.get())
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(component.get())
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, component.ready
+
+    assert asyncio.run(run()) == ("component", True)
+    assert builds == ["started"]
+
+
+def test_failed_build_is_retried_by_the_next_caller():
+    attempts = []
+
+    async def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("not yet")
+        return "component"
+
+    async def run():
+        component = LazyComponent("test", factory)
+        with pytest.raises(RuntimeError):
+            await component.get()
+        return await component.get()
+
+    assert asyncio.run(run()) == "component"
+    assert len(attempts) == 2
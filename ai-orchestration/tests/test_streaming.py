@@ -0,0 +1,52 @@
+"""Tests for context-isolated streams"""
+
+import asyncio
+from contextvars import ContextVar
+
+import pytest
+
+from shared.streaming import isolate_stream
+
+scope: ContextVar[str] = ContextVar("scope", default="caller")
+
+
+async def scoped_stream(events: list, fail: bool = False):
+    token = scope.set("stream")
+    try:
+        for i in range(3):
+            yield scope.get()
+        if fail:
+            raise ValueError("boom")
+    finally:
+        scope.reset(token)
+        events.append("closed")
+
+
+def test_context_set_by_the_stream_does_not_reach_the_consumer():
+    async def run():
+        seen = []
+        async for value in isolate_stream(scoped_stream([])):
+            seen.append((value, scope.get()))
+        return seen
+
+    assert asyncio.run(run()) == [("stream", "caller")] * 3
+
+
+def test_consumer_leaving_early_unwinds_the_stream_in_its_task():
+    async def run():
+        events = []
+        stream = isolate_stream(scoped_stream(events))
+        assert await stream.__anext__() == "stream"
+        await stream.aclose()
+        return events
+
+    assert asyncio.run(run()) == ["closed"]
+
+
+def test_stream_errors_reach_the_consumer():
+    async def run():
+        async for _ in isolate_stream(scoped_stream([], fail=True)):
+            pass
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(run())
@@ -0,0 +1,19 @@
+"""Tests for span exporters"""
+
+import json
+
+from shared.config import Config
+from shared.tracing import Tracer
+
+
+def test_file_exporter_writes_spans_in_the_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "TRACE_DIR", str(tmp_path))
+    tracer = Tracer(enabled=True, exporters=["file"])
+
+    for name in ("first", "second"):
+        with tracer.span(name):
+            pass
+    tracer.flush()
+
+    [trace_file] = tmp_path.glob("traces-*.jsonl")
+    assert [json.loads(line)["name"] for line in trace_file.read_text().splitlines()] == ["first", "second"]
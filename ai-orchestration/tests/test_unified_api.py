@@ -0,0 +1,169 @@
+"""Smoke tests for direct core execution in the unified API"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+import unified_api
+from shared.config import Config, CoreType
+from shared.tracing import tracer
+
+
+class FakeKnowledgeBase:
+    async def aget_context_for_core(self, core: str) -> str:
+        return f"context for {core}"
+
+
+@pytest.fixture
+def system(monkeypatch):
+    system = unified_api.UnifiedAISystem()
+    calls = []
+
+    async def get_knowledge_base():
+        return FakeKnowledgeBase()
+
+    async def execute_crewai_core(core, task, context, *args):
+        calls.append((core, task, context))
+        return {"core": core.value, "status": "completed"}
+
+    monkeypatch.setattr(system, "get_knowledge_base", get_knowledge_base)
+    monkeypatch.setattr(system, "_execute_crewai_core", execute_crewai_core)
+    system.crew_calls = calls
+    return system
+
+
+def test_execute_core_runs_core_with_context(system):
+    result = asyncio.run(system._execute_core("offer_intelligence", "find offers"))
+
+    assert result == {"core": "offer_intelligence", "status": "completed"}
+    assert system.crew_calls == [(CoreType.OFFER_INTELLIGENCE, "find offers", "context for offer_intelligence")]
+    assert system.admission.core("offer_intelligence").get_stats()["in_flight"] == 0
+
+
+def test_execute_core_records_core_span(system):
+    with tracer.span("test") as root:
+        asyncio.run(system._execute_core("offer_intelligence", "find offers"))
+
+    spans = {span["name"]: span for span in tracer.get_trace(root.trace_id)["spans"]}
+    assert spans["core:offer_intelligence"]["parent_id"] == root.span_id
+    assert spans["core:offer_intelligence"]["attributes"]["framework"] == "crewai"
+
+
+def test_execute_core_releases_slot_on_failure(system, monkeypatch):
+    async def failing_core(*args):
+        raise RuntimeError("crew failed")
+
+    monkeypatch.setattr(system, "_execute_crewai_core", failing_core)
+    with pytest.raises(RuntimeError):
+        asyncio.run(system._execute_core("offer_intelligence", "find offers"))
+
+    assert system.admission.core("offer_intelligence").get_stats()["in_flight"] == 0
+
+
+def test_execute_core_rejects_unknown_core(system):
+    assert asyncio.run(system._execute_core("nope", "task")) == {"error": "Invalid core: nope"}
+
+
+def test_execute_batch_shares_context_and_crews(system, monkeypatch):
+    contexts = []
+    built = []
+
+    class FakeCrew:
+        def __init__(self):
+            self.running = False
+            built.append(self)
+
+        async def execute(self, request):
+            assert not self.running, "a crew instance must serve one item at a time"
+            self.running = True
+            await asyncio.sleep(0.01)
+            self.running = False
+            return {"status": "completed", "request": request}
+
+    async def core_context(core):
+        contexts.append(core)
+        return "context"
+
+    async def execute_crewai_core(core, task, context, batch=None):
+        async with batch.crew(core.value, FakeCrew) as crew:
+            return await crew.execute(task)
+
+    monkeypatch.setattr(system, "_core_context", core_context)
+    monkeypatch.setattr(system, "_execute_crewai_core", execute_crewai_core)
+    system._initialized = True
+    items = [{"core": "offer_intelligence", "task": f"task {i}"} for i in range(6)]
+    items.append({"core": "nope", "task": "task"})
+
+    async def run():
+        return [event async for event in system.execute_batch(items, concurrency=4)]
+
+    events = {event["index"]: event for event in asyncio.run(run())}
+
+    assert sorted(events) == list(range(7))
+    assert all(events[i]["status"] == "completed" for i in range(6))
+    assert events[6] == {"event": "item", "index": 6, "core": "nope", "status": "failed", "error": "Invalid core: nope"}
+    assert contexts == ["offer_intelligence"]
+    assert len(built) == Config.ADMISSION_CORE_CONCURRENCY
+
+
+@pytest.fixture
+def client(system, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    system.job = {"status": "completed", "finished": 1.0, "result": {"core": "offer_intelligence"},
+                  "error": None, "stage": None}
+    system.waited = []
+
+    async def submit_core_job(core, task, parameters=None, priority=0, timeout_seconds=None):
+        return "job_1"
+
+    async def wait_for_job(job_id, timeout_seconds):
+        system.waited.append(job_id)
+        return system.job
+
+    monkeypatch.setattr(system, "submit_core_job", submit_core_job)
+    monkeypatch.setattr(system, "wait_for_job", wait_for_job)
+    monkeypatch.setattr(unified_api, "ai_system", system)
+    return TestClient(unified_api.app)
+
+
+def test_execute_returns_the_queued_job_by_default(client, system):
+    response = client.post("/execute", json={"core": "offer_intelligence", "task": "find offers"})
+
+    assert response.status_code == 202
+    assert response.json()["task_id"] == "job_1" and response.json()["status"] == "pending"
+    assert system.waited == []
+
+
+def test_execute_waits_for_the_result_when_asked(client, system):
+    body = {"core": "offer_intelligence", "task": "find offers", "wait": True}
+
+    response = client.post("/execute", json=body)
+    with_header = client.post("/execute", json=body, headers={"Prefer": "respond-async"})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.json()["result"] == {"core": "offer_intelligence"}
+    assert with_header.status_code == 202
+    assert system.waited == ["job_1"]
+
+
+def test_execute_returns_202_when_the_wait_times_out(client, system):
+    system.job = {"status": "running", "finished": None, "result": None, "error": None, "stage": "crewai"}
+
+    response = client.post("/execute", json={"core": "offer_intelligence", "task": "find offers", "wait": True})
+
+    assert response.status_code == 202
+    assert (response.json()["status"], response.json()["stage"]) == ("running", "crewai")
+
+
+def test_history_entries_keep_the_core_executed_key(system):
+    result = {"messages": [{"content": "done"}], "completed_tasks": [{"core": "offer_intelligence"}]}
+
+    system.open_stores()
+    system._record_chat("find offers", "alice", result)
+    entry = system.task_history.recent(1)[0]
+
+    assert entry["core_executed"] == entry["core"] == "offer_intelligence"
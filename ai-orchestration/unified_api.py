@@ -4,9 +4,14 @@ This is the central integration point for LangGraph, CrewAI, AutoGen, and LlamaI
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import importlib
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, AsyncIterator, Awaitable, Callable, TYPE_CHECKING
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
 import uvicorn
 import os
@@ -15,10 +20,31 @@ import sys
 # Add paths for imports
 sys.path.append(os.path.dirname(__file__))
 
+from shared.startup import LazyComponent, startup_profile
+_import_start = time.perf_counter()
+
 from shared.config import Config, CoreType, TaskStatus, CORE_FRAMEWORK_MAPPING
-from langgraph.orchestrator import MasterOrchestrator, create_orchestrator
-from llamaindex.knowledge_base import AffiliateKnowledgeBase, create_knowledge_base
-from autogen.chat_interface import AffiliateCommandCenter, create_command_center
+from shared.singleflight import SingleFlight, make_key
+from shared.metrics import metrics
+from shared.deadline import Deadline, DeadlineExceeded, use_deadline, with_deadline
+from shared.replay import replay
+from shared.llm_gateway import get_gateway
+from shared.rate_limiter import get_rate_limit_status
+from shared.budget import BudgetExceeded, budget_scope, get_ledger
+from shared.jobs import JobQueue, JobWorkerPool, report_progress
+from shared.history import TaskHistory, encode_cursor
+from shared.state import get_state_status
+from shared.admission import AdmissionController, AdmissionRejected
+from shared.tracing import TracingMiddleware, tracer
+from shared.streaming import isolate_stream
+
+# Framework modules are imported on first use (see UnifiedAISystem)
+if TYPE_CHECKING:
+    from langgraph.orchestrator import MasterOrchestrator
+    from llamaindex.knowledge_base import AffiliateKnowledgeBase, PersonalizationEngine
+    from autogen.chat_interface import AffiliateCommandCenter
+
+startup_profile.record("api", "import", time.perf_counter() - _import_start)
 
 
 # =============================================================================
@@ -29,6 +55,7 @@ class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = "default"
     user_id: Optional[str] = "default"
+    timeout_seconds: Optional[float] = None
 
 
 class ChatResponse(BaseModel):
@@ -36,12 +63,28 @@ class ChatResponse(BaseModel):
     core_executed: Optional[str] = None
     task_id: Optional[str] = None
     status: str = "completed"
+    stage: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ChatBatchItem(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+
+class ChatBatchRequest(BaseModel):
+    items: List[ChatBatchItem]
+    concurrency: Optional[int] = None
+    timeout_seconds: Optional[float] = None  # per item
 
 
 class CoreExecutionRequest(BaseModel):
     core: str
     task: str
     parameters: Optional[Dict[str, Any]] = {}
+    timeout_seconds: Optional[float] = None
+    priority: Optional[int] = 0
+    wait: Optional[bool] = False  # True holds the request until the job finishes or times out
 
 
 class CoreExecutionResponse(BaseModel):
@@ -50,6 +93,35 @@ class CoreExecutionResponse(BaseModel):
     status: str
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    stage: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    priority: int
+    progress: float
+    stage: Optional[str] = None
+    queue_position: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    created: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+
+class ExecuteBatchItem(BaseModel):
+    core: str
+    task: str
+    parameters: Optional[Dict[str, Any]] = {}
+
+
+class ExecuteBatchRequest(BaseModel):
+    items: List[ExecuteBatchItem]
+    concurrency: Optional[int] = None
+    timeout_seconds: Optional[float] = None  # per item
 
 
 class KnowledgeQueryRequest(BaseModel):
@@ -64,6 +136,49 @@ class KnowledgeAddRequest(BaseModel):
     doc_type: Optional[str] = "custom"
 
 
+# =============================================================================
+# BATCH RESOURCES
+# =============================================================================
+
+class CoreBatch:
+    """
+    Resources shared by the items of one core batch.
+    Each core's KB context is fetched once, and constructed crews are reused
+    from item to item. A crew instance carries per-run task state, so it
+    serves one item at a time: each core keeps a pool of idle crews that only
+    grows while that core's items run in parallel.
+    """
+    
+    def __init__(self):
+        self._contexts: Dict[str, asyncio.Future] = {}
+        self._idle_crews: Dict[str, List[Any]] = {}
+    
+    def context(self, core: str, load: Callable[[], Awaitable[str]]) -> Awaitable[str]:
+        """The core's KB context, loaded by the first item that asks for it"""
+        if core not in self._contexts:
+            self._contexts[core] = asyncio.ensure_future(load())
+        # One item timing out must not cancel the lookup the others are waiting on
+        return asyncio.shield(self._contexts[core])
+    
+    @asynccontextmanager
+    async def crew(self, core: str, factory: Callable[[], Any]):
+        """Check out an idle crew for the core, constructing one if none is free"""
+        idle = self._idle_crews.setdefault(core, [])
+        if idle:
+            crew = idle.pop()
+            metrics.inc("batch_crews_total", core=core, outcome="reused")
+        else:
+            crew = factory()
+            metrics.inc("batch_crews_total", core=core, outcome="built")
+        yield crew
+        # Only a crew whose run finished cleanly goes back into the pool
+        idle.append(crew)
+    
+    def close(self):
+        for future in self._contexts.values():
+            future.cancel()
+
+
 # =============================================================================
 # UNIFIED AI SYSTEM
 # =============================================================================
@@ -79,57 +194,241 @@ class UnifiedAISystem:
     """
     
     def __init__(self):
-        self.orchestrator: Optional[MasterOrchestrator] = None
-        self.knowledge_base: Optional[AffiliateKnowledgeBase] = None
-        self.command_center: Optional[AffiliateCommandCenter] = None
-        self.task_history: List[Dict[str, Any]] = []
+        self._orchestrator = LazyComponent("langgraph", self._build_orchestrator)
+        self._knowledge_base = LazyComponent("llamaindex", self._build_knowledge_base)
+        self._command_center = LazyComponent("autogen", self._build_command_center)
+        self._personalization = LazyComponent("personalization", self._build_personalization)
+        self.singleflight = SingleFlight(window_seconds=Config.SINGLEFLIGHT_WINDOW_SECONDS)
+        self.admission = AdmissionController()
+        # Opened by initialize(), so importing the API creates no files or threads
+        self.task_history: Optional[TaskHistory] = None
+        self.jobs: Optional[JobQueue] = None
+        self.job_workers: Optional[JobWorkerPool] = None
+        self._warmup_task: Optional[asyncio.Task] = None
         self._initialized = False
     
     async def initialize(self):
-        """Initialize all AI frameworks"""
+        """
+        Start the API-level services. Frameworks are built lazily on first
+        use; with WARMUP_ENABLED they are also warmed in the background once
+        the server is accepting requests.
+        """
         if self._initialized:
             return
         
         print("🚀 Initializing Unified AI System...")
         
-        # Initialize LangGraph Orchestrator
-        print("  ├─ Initializing LangGraph Master Orchestrator...")
-        self.orchestrator = create_orchestrator()
+        # Task history log and job queue (SQLite files, history writer thread)
+        with startup_profile.phase("stores", "init"):
+            await asyncio.to_thread(self.open_stores)
         
-        # Initialize LlamaIndex Knowledge Base
-        print("  ├─ Initializing LlamaIndex Knowledge Base...")
-        self.knowledge_base = create_knowledge_base()
+        # Start background job workers
+        print(f"  ├─ Starting {self.job_workers.workers} background job worker(s)...")
+        with startup_profile.phase("job_workers", "init"):
+            await self.job_workers.start()
         
-        # Initialize AutoGen Command Center
-        print("  ├─ Initializing AutoGen Command Center...")
-        self.command_center = create_command_center()
+        if Config.WARMUP_ENABLED:
+            print(f"  ├─ Warming in background: {', '.join(Config.WARMUP_COMPONENTS)}")
+            self._warmup_task = asyncio.create_task(self.warm_up())
         
         self._initialized = True
-        print("  └─ ✅ All systems initialized!")
+        startup_profile.mark_serving()
+        print("  └─ ✅ Ready (frameworks load on first use)")
+    
+    def open_stores(self):
+        """Open the on-disk task history and job queue (blocking)"""
+        if self.task_history is None:
+            self.task_history = TaskHistory()
+        if self.jobs is None:
+            self.jobs = JobQueue()
+            self.job_workers = JobWorkerPool(self.jobs, {"execute_core": self._run_core_job})
+    
+    async def warm_up(self, components: List[str] = None):
+        """Build framework components ahead of the first request that needs them"""
+        # Let the server finish binding before competing with it for the loop
+        await asyncio.sleep(0)
+        for component in components or Config.WARMUP_COMPONENTS:
+            try:
+                if component == "gateway":
+                    with startup_profile.phase("gateway", "init"):
+                        warmed = await get_gateway().awarm()
+                    startup_profile.mark("gateway", trigger="warmup", connections=warmed)
+                elif component == "langgraph":
+                    await self._orchestrator.get(trigger="warmup")
+                elif component == "llamaindex":
+                    await self._knowledge_base.get(trigger="warmup")
+                elif component == "kb_context":
+                    await self.warm_core_contexts()
+                elif component == "autogen":
+                    await self._command_center.get(trigger="warmup")
+            except Exception as e:
+                print(f"Warm-up of {component} failed: {e}")
+    
+    async def warm_core_contexts(self):
+        """Precompute the knowledge base context of every core so /execute starts with a cache hit"""
+        knowledge_base = await self._knowledge_base.get(trigger="warmup")
+        with startup_profile.phase("kb_context", "init"):
+            with budget_scope(core="knowledge_base"):
+                warmed = await knowledge_base.warm_core_contexts([core.value for core in CoreType])
+        startup_profile.mark("kb_context", trigger="warmup", cores_warmed=sum(warmed.values()))
     
     async def shutdown(self):
         """Shutdown all AI frameworks"""
-        if self.command_center:
-            await self.command_center.close()
+        if self._warmup_task:
+            self._warmup_task.cancel()
+        if self.job_workers:
+            await self.job_workers.stop()
+        command_center = self._command_center.reset()
+        if command_center:
+            await command_center.close()
+        await get_gateway().aclose()
+        if self.task_history:
+            await asyncio.to_thread(self.task_history.flush)
+        await asyncio.to_thread(tracer.flush)
         self._initialized = False
     
+    # =========================================================================
+    # LAZY FRAMEWORK COMPONENTS
+    # =========================================================================
+    
+    @staticmethod
+    async def _import(component: str, module: str):
+        """Import a framework module off the event loop, recording its import time"""
+        with startup_profile.phase(component, "import"):
+            return await asyncio.to_thread(importlib.import_module, module)
+    
+    async def _build_orchestrator(self) -> "MasterOrchestrator":
+        module = await self._import("langgraph", "langgraph.orchestrator")
+        with startup_profile.phase("langgraph", "init"):
+            # Built on the loop: persistent checkpointers bind to the running loop
+            orchestrator = module.create_orchestrator()
+            await orchestrator.setup()
+        return orchestrator
+    
+    async def _build_knowledge_base(self) -> "AffiliateKnowledgeBase":
+        module = await self._import("llamaindex", "llamaindex.knowledge_base")
+        with startup_profile.phase("llamaindex", "init"):
+            # Loading the index (or embedding the default SOPs on first boot) blocks
+            return await asyncio.to_thread(module.create_knowledge_base)
+    
+    async def _build_command_center(self) -> "AffiliateCommandCenter":
+        module = await self._import("autogen", "autogen.chat_interface")
+        with startup_profile.phase("autogen", "init"):
+            return await asyncio.to_thread(module.create_command_center)
+    
+    async def _build_personalization(self) -> "PersonalizationEngine":
+        # Shares the lazily loaded knowledge base instead of loading a second index
+        knowledge_base = await self._knowledge_base.get()
+        module = await self._import("personalization", "llamaindex.knowledge_base")
+        with startup_profile.phase("personalization", "init"):
+            return await asyncio.to_thread(module.create_personalization_engine, knowledge_base)
+    
+    async def get_orchestrator(self) -> "MasterOrchestrator":
+        return await self._orchestrator.get()
+    
+    async def get_knowledge_base(self) -> "AffiliateKnowledgeBase":
+        return await self._knowledge_base.get()
+    
+    async def get_command_center(self) -> "AffiliateCommandCenter":
+        return await self._command_center.get()
+    
     # =========================================================================
     # CHAT INTERFACE
     # =========================================================================
     
     async def chat(self, message: str, session_id: str = "default") -> Dict[str, Any]:
         """
-        Main chat interface - routes through LangGraph orchestrator
+        Main chat interface - routes through LangGraph orchestrator.
+        Identical concurrent messages for a session share one orchestrator run.
         """
         if not self._initialized:
             await self.initialize()
         
-        # Get context from knowledge base
-        context = self.knowledge_base.query(message)
+        if not Config.SINGLEFLIGHT_ENABLED:
+            return await self._chat(message, session_id)
+        
+        key = make_key("chat", message, {"session_id": session_id})
+        return await self.singleflight.do(key, lambda: self._chat(message, session_id))
+    
+    async def _chat(self, message: str, session_id: str) -> Dict[str, Any]:
+        """Run a chat message through the knowledge base and orchestrator"""
+        # Retrieval overlaps with the orchestrator's routing step
+        orchestrator = await self.get_orchestrator()
+        kb_lookup = self._start_kb_lookup(message, session_id)
+        try:
+            result = await orchestrator.run(message, session_id, kb_context=kb_lookup)
+        finally:
+            kb_lookup.cancel()
+        response, core_executed = self._record_chat(message, session_id, result)
+        
+        return {
+            "response": response,
+            "core_executed": core_executed,
+            "context_sources": result.get("global_context", {}).get("kb_sources", [])
+        }
+    
+    def _start_kb_lookup(self, message: str, session_id: str) -> asyncio.Future:
+        """Start a retrieval-only knowledge base lookup for a chat message"""
+        with budget_scope(core="knowledge_base", session=session_id):
+            return asyncio.ensure_future(with_deadline(self._kb_retrieve(message), stage="kb_retrieve"))
+    
+    async def _kb_retrieve(self, message: str) -> Dict[str, Any]:
+        knowledge_base = await self.get_knowledge_base()
+        return await knowledge_base.aretrieve(message)
+    
+    async def chat_stream(self, message: str, session_id: str = "default") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming chat interface - yields orchestrator events as they are produced.
+        The final "done" event carries the response, executed core and context sources.
+        """
+        if not self._initialized:
+            await self.initialize()
         
-        # Route through LangGraph orchestrator
-        result = await self.orchestrator.run(message, session_id)
+        orchestrator = await self.get_orchestrator()
+        kb_lookup = self._start_kb_lookup(message, session_id)
+        try:
+            async for event in orchestrator.run_stream(message, session_id, kb_context=kb_lookup):
+                if event["event"] == "done":
+                    response, core_executed = self._record_chat(message, session_id, event["result"])
+                    context = event["result"].get("global_context", {})
+                    yield {
+                        "event": "done",
+                        "response": response,
+                        "core_executed": core_executed,
+                        "context_sources": context.get("kb_sources", [])
+                    }
+                else:
+                    yield event
+        finally:
+            kb_lookup.cancel()
+    
+    async def chat_batch(self, items: List[Dict[str, Any]], concurrency: int = None,
+                         timeout_seconds: float = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Batch chat interface - runs many messages through the orchestrator with
+        bounded concurrency, yielding each result as soon as it completes
+        """
+        if not self._initialized:
+            await self.initialize()
         
+        orchestrator = await self.get_orchestrator()
+        async for item in orchestrator.run_many(items, concurrency, timeout_seconds):
+            if "error" in item:
+                yield {"event": "item", **item}
+                continue
+            
+            message = items[item["index"]].get("message", "")
+            response, core_executed = self._record_chat(message, item["session_id"], item["result"])
+            yield {
+                "event": "item",
+                "index": item["index"],
+                "session_id": item["session_id"],
+                "response": response,
+                "core_executed": core_executed
+            }
+    
+    def _record_chat(self, message: str, session_id: str, result: Dict[str, Any]) -> tuple:
+        """Extract the response and executed core from an orchestrator result and log it"""
         # Extract response
         messages = result.get("messages", [])
         response = messages[-1].get("content", "No response") if messages else "No response"
@@ -138,55 +437,150 @@ class UnifiedAISystem:
         completed_tasks = result.get("completed_tasks", [])
         core_executed = completed_tasks[0].get("core") if completed_tasks else None
         
-        # Log to history
-        self.task_history.append({
-            "session_id": session_id,
-            "message": message,
-            "response": response,
-            "core_executed": core_executed
-        })
+        # Log to history (`core_executed` is the key /history clients have always read)
+        self.task_history.append(
+            session_id, core_executed, message=message, response=response, core_executed=core_executed
+        )
         
-        return {
-            "response": response,
-            "core_executed": core_executed,
-            "context_sources": context.get("sources", [])
-        }
+        return response, core_executed
+    
+    async def command_stream(self, message: str, session_id: str = "default") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming command center interface - yields AutoGen tokens, delegations to
+        specialist agents and messages while the tool loop runs
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        command_center = await self.get_command_center()
+        # The budget scope and span stay inside the stream's own task
+        async for event in isolate_stream(self._command_events(command_center, message, session_id)):
+            yield event
+    
+    async def _command_events(self, command_center: "AffiliateCommandCenter", message: str,
+                              session_id: str) -> AsyncIterator[Dict[str, Any]]:
+        with budget_scope(core="command_center", session=session_id):
+            with tracer.span("command_center", kind="agent", session=session_id) as span:
+                async for event in command_center.stream_events(message):
+                    metrics.inc("command_stream_events_total", event=event["event"])
+                    if event["event"] == "delegation":
+                        span.add(delegations=1)
+                    if event["event"] == "done":
+                        self.task_history.append(
+                            session_id, "command_center", message=message, response=event["response"],
+                            core_executed="command_center"
+                        )
+                    yield event
     
     # =========================================================================
     # CORE EXECUTION
     # =========================================================================
     
-    async def execute_core(self, core: str, task: str, parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def execute_core(self, core: str, task: str, parameters: Dict[str, Any] = None,
+                           batch: CoreBatch = None) -> Dict[str, Any]:
+        """
+        Execute a specific core directly.
+        Identical concurrent core/task/parameter requests share one execution.
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        if not Config.SINGLEFLIGHT_ENABLED:
+            return await self._execute_core(core, task, parameters, batch)
+        
+        key = make_key(core, task, parameters)
+        return await self.singleflight.do(key, lambda: self._execute_core(core, task, parameters, batch))
+    
+    async def execute_batch(self, items: List[Dict[str, Any]], concurrency: int = None,
+                            timeout_seconds: float = None) -> AsyncIterator[Dict[str, Any]]:
         """
-        Execute a specific core directly
+        Batch core execution - runs many core tasks with bounded concurrency,
+        each under its own deadline, yielding each result as soon as it completes.
+        KB context and constructed crews are shared across the batch (see CoreBatch).
         """
         if not self._initialized:
             await self.initialize()
         
+        semaphore = asyncio.Semaphore(concurrency or Config.BATCH_MAX_CONCURRENCY)
+        batch = CoreBatch()
+        
+        async def run_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+            core = item.get("core", "")
+            async with semaphore:
+                deadline = Deadline(timeout_seconds or Config.JOB_TIMEOUT_SECONDS)
+                try:
+                    with use_deadline(deadline):
+                        result = await deadline.run(
+                            self.execute_core(core, item.get("task", ""), item.get("parameters"), batch),
+                            stage="execute"
+                        )
+                except DeadlineExceeded as e:
+                    return {"index": index, "core": core, "status": "failed", "error": str(e), "stage": e.stage}
+                except Exception as e:
+                    return {"index": index, "core": core, "status": "failed", "error": str(e)}
+            
+            if isinstance(result, dict) and "error" in result:
+                return {"index": index, "core": core, "status": "failed", "error": result["error"]}
+            return {"index": index, "core": core, "status": "completed", "result": result}
+        
+        tasks = [asyncio.ensure_future(run_item(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield {"event": "item", **await next_done}
+        finally:
+            for task in tasks:
+                task.cancel()
+            batch.close()
+    
+    async def _execute_core(self, core: str, task: str, parameters: Dict[str, Any] = None,
+                            batch: CoreBatch = None) -> Dict[str, Any]:
+        """Execute a core through its primary framework"""
         try:
             core_type = CoreType(core)
         except ValueError:
             return {"error": f"Invalid core: {core}"}
         
-        # Get context from knowledge base
-        context = self.knowledge_base.get_context_for_core(core)
-        
-        # Execute based on primary framework
-        config = CORE_FRAMEWORK_MAPPING.get(core_type, {})
-        primary_framework = config.get("primary", "langgraph")
-        
-        if primary_framework == "crewai":
-            result = await self._execute_crewai_core(core_type, task, context)
-        elif primary_framework == "langgraph":
-            result = await self._execute_langgraph_core(core_type, task, context)
-        elif primary_framework == "llamaindex":
-            result = await self._execute_llamaindex_core(core_type, task, context)
-        else:
-            result = {"error": f"Unknown framework: {primary_framework}"}
-        
-        return result
+        # Charge every LLM call made for this core (KB context, crews, nodes) to its budget
+        with budget_scope(core=core):
+            if Config.BUDGET_ENABLED:
+                await asyncio.to_thread(get_ledger().ensure_available)
+            
+            # Bound concurrent runs per core so a burst cannot start unlimited crews
+            gate = self.admission.core(core)
+            async with gate.slot():
+                with tracer.span(f"core:{core}", kind="core", core=core) as span:
+                    # Get context from knowledge base
+                    await report_progress(0.1, "kb_context")
+                    if batch is not None:
+                        lookup = batch.context(core, lambda: self._core_context(core))
+                    else:
+                        lookup = self._core_context(core)
+                    context = await with_deadline(lookup, stage="kb_context")
+                    
+                    # Execute based on primary framework
+                    config = CORE_FRAMEWORK_MAPPING.get(core_type, {})
+                    primary_framework = config.get("primary", "langgraph")
+                    span.set(framework=primary_framework, batched=batch is not None)
+                    await report_progress(0.3, primary_framework)
+                    
+                    if primary_framework == "crewai":
+                        result = await self._execute_crewai_core(core_type, task, context, batch)
+                    elif primary_framework == "langgraph":
+                        result = await self._execute_langgraph_core(core_type, task, context)
+                    elif primary_framework == "llamaindex":
+                        result = await self._execute_llamaindex_core(core_type, task, context)
+                    else:
+                        result = {"error": f"Unknown framework: {primary_framework}"}
+                    
+                    return result
+    
+    async def _core_context(self, core: str) -> str:
+        """KB context for a core (cached by the knowledge base)"""
+        knowledge_base = await with_deadline(self.get_knowledge_base(), stage="kb_init")
+        return await knowledge_base.aget_context_for_core(core)
     
-    async def _execute_crewai_core(self, core: CoreType, task: str, context: str) -> Dict[str, Any]:
+    async def _execute_crewai_core(self, core: CoreType, task: str, context: str,
+                                   batch: CoreBatch = None) -> Dict[str, Any]:
         """Execute a CrewAI-based core"""
         from crewai.crews.offer_intelligence import OfferIntelligenceCrew
         from crewai.crews.content_generation import ContentGenerationCrew
@@ -202,14 +596,18 @@ class UnifiedAISystem:
         if not crew_class:
             return {"error": f"No CrewAI crew for core: {core}"}
         
-        crew = crew_class()
-        result = await crew.execute(f"{task}\n\nContext: {context}")
-        return result
+        if batch is None:
+            crew = crew_class()
+            return await crew.execute(f"{task}\n\nContext: {context}")
+        
+        async with batch.crew(core.value, crew_class) as crew:
+            return await crew.execute(f"{task}\n\nContext: {context}")
     
     async def _execute_langgraph_core(self, core: CoreType, task: str, context: str) -> Dict[str, Any]:
         """Execute a LangGraph-based core"""
         # Route through the orchestrator with specific core targeting
-        result = await self.orchestrator.run(
+        orchestrator = await self.get_orchestrator()
+        result = await orchestrator.run(
             f"[CORE: {core.value}] {task}\n\nContext: {context}",
             session_id=f"core_{core.value}"
         )
@@ -221,10 +619,8 @@ class UnifiedAISystem:
     
     async def _execute_llamaindex_core(self, core: CoreType, task: str, context: str) -> Dict[str, Any]:
         """Execute a LlamaIndex-based core"""
-        from llamaindex.knowledge_base import PersonalizationEngine
-        
         if core == CoreType.PERSONALIZATION_ENGINE:
-            engine = PersonalizationEngine()
+            engine = await self._personalization.get()
             result = await engine.personalize(task)
             return {
                 "core": core.value,
@@ -234,30 +630,82 @@ class UnifiedAISystem:
         
         return {"error": f"No LlamaIndex handler for core: {core}"}
     
+    # =========================================================================
+    # BACKGROUND JOBS
+    # =========================================================================
+    
+    async def submit_core_job(self, core: str, task: str, parameters: Dict[str, Any] = None,
+                              priority: int = 0, timeout_seconds: float = None) -> str:
+        """Queue a core execution and return its job id"""
+        if not self._initialized:
+            await self.initialize()
+        
+        CoreType(core)  # Reject unknown cores before queueing
+        
+        with budget_scope(core=core):
+            if Config.BUDGET_ENABLED:
+                await asyncio.to_thread(get_ledger().ensure_available)
+        
+        # Bound the backlog: past the limit, callers are told when to come back
+        if self.admission.enabled:
+            pending = await asyncio.to_thread(self.jobs.pending_count)
+            metrics.set_gauge("admission_queue_depth", pending, gate="execute")
+            if pending >= Config.ADMISSION_EXECUTE_MAX_PENDING:
+                metrics.inc("admission_rejected_total", gate="execute", reason="queue_full")
+                retry_after = min(self.job_workers.estimate_wait(pending), Config.ADMISSION_RETRY_AFTER_MAX_SECONDS)
+                raise AdmissionRejected("execute", max(1.0, round(retry_after)))
+        
+        payload = {"core": core, "task": task, "parameters": parameters or {}, "timeout_seconds": timeout_seconds}
+        span = tracer.current()
+        if span is not None:
+            payload["trace_context"] = span.context
+        job_id = await asyncio.to_thread(self.jobs.submit, "execute_core", payload, priority)
+        self.job_workers.notify()
+        return job_id
+    
+    async def _run_core_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Job handler for queued core executions"""
+        return await self.execute_core(payload["core"], payload["task"], payload.get("parameters"))
+    
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status, progress and result of a background job"""
+        if not self._initialized:
+            await self.initialize()
+        
+        return await asyncio.to_thread(self.jobs.get, job_id)
+    
+    async def wait_for_job(self, job_id: str, timeout_seconds: float) -> Optional[Dict[str, Any]]:
+        """The finished job, or its current state if it is still queued or running after `timeout_seconds`"""
+        try:
+            return await asyncio.wait_for(self.job_workers.wait(job_id), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            return await self.get_job(job_id)
+    
+    async def cancel_job(self, job_id: str) -> bool:
+        """Cancel a job that is still queued"""
+        if not self._initialized:
+            await self.initialize()
+        
+        return await asyncio.to_thread(self.jobs.cancel, job_id)
+    
     # =========================================================================
     # KNOWLEDGE BASE
     # =========================================================================
     
-    def query_knowledge(self, question: str, category: str = None) -> Dict[str, Any]:
+    async def query_knowledge(self, question: str, category: str = None) -> Dict[str, Any]:
         """Query the knowledge base"""
-        if not self.knowledge_base:
-            return {"error": "Knowledge base not initialized"}
-        
-        return self.knowledge_base.query(question, category)
+        knowledge_base = await self.get_knowledge_base()
+        return await knowledge_base.aquery(question, category)
     
-    def add_knowledge(self, title: str, content: str, category: str, doc_type: str = "custom") -> bool:
+    async def add_knowledge(self, title: str, content: str, category: str, doc_type: str = "custom") -> bool:
         """Add a document to the knowledge base"""
-        if not self.knowledge_base:
-            return False
-        
-        return self.knowledge_base.add_document(title, content, category, doc_type)
+        knowledge_base = await self.get_knowledge_base()
+        return await knowledge_base.aadd_document(title, content, category, doc_type)
     
-    def list_knowledge(self) -> List[Dict[str, str]]:
+    async def list_knowledge(self) -> List[Dict[str, str]]:
         """List all documents in the knowledge base"""
-        if not self.knowledge_base:
-            return []
-        
-        return self.knowledge_base.list_documents()
+        knowledge_base = await self.get_knowledge_base()
+        return knowledge_base.list_documents()
     
     # =========================================================================
     # STATUS & MONITORING
@@ -268,18 +716,53 @@ class UnifiedAISystem:
         return {
             "initialized": self._initialized,
             "frameworks": {
-                "langgraph": self.orchestrator is not None,
-                "llamaindex": self.knowledge_base is not None,
-                "autogen": self.command_center is not None,
+                "langgraph": self._orchestrator.ready,
+                "llamaindex": self._knowledge_base.ready,
+                "autogen": self._command_center.ready,
                 "crewai": True  # CrewAI crews are created on-demand
             },
             "cores": [core.value for core in CoreType],
-            "task_history_count": len(self.task_history)
+            "task_history": self.task_history.get_stats() if self.task_history else None,
+            "shared_state": get_state_status(),
+            "startup": startup_profile.get_report(),
+            "singleflight": self.singleflight.get_stats(),
+            "jobs": self.job_workers.get_stats() if self.job_workers else None,
+            "admission": self.admission.get_stats(),
+            "metrics": metrics.get_summary(),
+            "replay": replay.get_stats(),
+            "rate_limits": get_rate_limit_status(),
+            "llm_cache": get_gateway().cache.get_stats() if get_gateway().cache else None,
+            "hedging": get_gateway().hedger.get_stats() if get_gateway().hedger else None,
+            "budgets": get_ledger().get_usage() if Config.BUDGET_ENABLED else None
         }
     
-    def get_task_history(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent task history"""
-        return self.task_history[-limit:]
+    async def get_task_history(self, limit: int = 10, session_id: str = None, core: str = None,
+                               since: float = None, until: float = None, cursor: str = None) -> Dict[str, Any]:
+        """
+        Get task history, newest first.
+        With a single worker the latest unfiltered page is served from memory;
+        filtered and later pages come from the on-disk log.
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        limit = max(1, min(limit, Config.HISTORY_PAGE_MAX))
+        # The ring buffer only holds this worker's entries
+        unfiltered = not any((session_id, core, since, until, cursor))
+        if Config.API_WORKERS == 1 and unfiltered and limit <= self.task_history.buffer_size:
+            entries = self.task_history.recent(limit)
+            if len(entries) == limit:
+                return {"entries": entries, "next_cursor": encode_cursor(entries[-1])}
+        
+        return await asyncio.to_thread(
+            self.task_history.query,
+            session_id=session_id,
+            core=core,
+            since=since,
+            until=until,
+            limit=limit,
+            cursor=cursor
+        )
 
 
 # =============================================================================
@@ -301,6 +784,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request tracing (outermost, so the root span covers every other middleware)
+app.add_middleware(TracingMiddleware)
+
 # Global AI system instance
 ai_system = UnifiedAISystem()
 
@@ -334,41 +820,319 @@ async def root():
 @app.get("/status")
 async def get_status():
     """Get system status"""
-    return ai_system.get_status()
+    # Reads queue and budget state from SQLite
+    return await asyncio.to_thread(ai_system.get_status)
+
+
+@app.get("/status/startup")
+async def get_startup_profile():
+    """Cold-start breakdown: import and init time per component"""
+    return startup_profile.get_report()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics endpoint"""
+    return PlainTextResponse(
+        metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/traces")
+async def list_traces(limit: int = 50, min_duration_ms: float = 0):
+    """Recent traces, newest first; use min_duration_ms to find slow requests"""
+    if tracer.memory is None:
+        raise HTTPException(status_code=404, detail="In-memory trace exporter is not enabled")
+    return {"traces": tracer.list_traces(min(limit, Config.TRACE_MAX_TRACES), min_duration_ms)}
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Every span of one trace in start order, with its depth in the call tree"""
+    trace = tracer.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Unknown trace: {trace_id}")
+    return trace
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """Main chat endpoint"""
     try:
-        result = await ai_system.chat(request.message, request.session_id)
+        async with ai_system.admission.endpoint("chat").slot():
+            result = await _run_with_deadline(
+                http_request,
+                request.timeout_seconds,
+                lambda: ai_system.chat(request.message, request.session_id)
+            )
         return ChatResponse(
             response=result.get("response", ""),
             core_executed=result.get("core_executed"),
             status="completed"
         )
+    except DeadlineExceeded as e:
+        return JSONResponse(
+            status_code=_deadline_status_code(e),
+            content=ChatResponse(response="", status=e.reason, stage=e.stage, error=str(e)).model_dump()
+        )
+    except AdmissionRejected as e:
+        raise _overloaded(e)
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=402, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Streaming chat endpoint (Server-Sent Events)"""
+    gate = ai_system.admission.endpoint("chat")
+    try:
+        granted = await gate.acquire()
+    except AdmissionRejected as e:
+        raise _overloaded(e)
+    
+    async def event_source():
+        try:
+            async for event in ai_system.chat_stream(request.message, request.session_id):
+                yield _format_sse(event)
+        except Exception as e:
+            yield _format_sse({"event": "error", "detail": str(e)})
+        finally:
+            gate.release(granted)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/command/stream")
+async def command_stream(request: ChatRequest):
+    """Streaming command center endpoint (Server-Sent Events)"""
+    gate = ai_system.admission.endpoint("command")
+    try:
+        granted = await gate.acquire()
+    except AdmissionRejected as e:
+        raise _overloaded(e)
+    
+    async def event_source():
+        try:
+            async for event in ai_system.command_stream(request.message, request.session_id):
+                yield _format_sse(event)
+        except Exception as e:
+            yield _format_sse({"event": "error", "detail": str(e)})
+        finally:
+            gate.release(granted)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: ChatBatchRequest):
+    """Batch chat endpoint - streams per-item results (Server-Sent Events) as they complete"""
+    if len(request.items) > Config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (max {Config.BATCH_MAX_ITEMS})"
+        )
+    
+    items = [item.model_dump() for item in request.items]
+    concurrency = min(request.concurrency or Config.BATCH_MAX_CONCURRENCY, Config.BATCH_MAX_CONCURRENCY)
+    gate = ai_system.admission.endpoint("batch")
+    try:
+        granted = await gate.acquire()
+    except AdmissionRejected as e:
+        raise _overloaded(e)
+    
+    async def event_source():
+        completed = 0
+        failed = 0
+        try:
+            async for event in ai_system.chat_batch(items, concurrency, request.timeout_seconds):
+                completed += 1
+                failed += 1 if "error" in event else 0
+                yield _format_sse(event)
+        except Exception as e:
+            yield _format_sse({"event": "error", "detail": str(e)})
+        finally:
+            gate.release(granted)
+        yield _format_sse({"event": "done", "total": len(items), "completed": completed, "failed": failed})
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/execute/batch")
+async def execute_batch(request: ExecuteBatchRequest):
+    """
+    Batch core execution endpoint - runs many core tasks in one call, sharing
+    KB context and crews across them, and streams per-item results
+    (Server-Sent Events) as they complete
+    """
+    if len(request.items) > Config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (max {Config.BATCH_MAX_ITEMS})"
+        )
+    
+    items = [item.model_dump() for item in request.items]
+    concurrency = min(request.concurrency or Config.BATCH_MAX_CONCURRENCY, Config.BATCH_MAX_CONCURRENCY)
+    gate = ai_system.admission.endpoint("batch")
+    try:
+        granted = await gate.acquire()
+    except AdmissionRejected as e:
+        raise _overloaded(e)
+    
+    async def event_source():
+        completed = 0
+        failed = 0
+        try:
+            async for event in ai_system.execute_batch(items, concurrency, request.timeout_seconds):
+                completed += 1
+                failed += 1 if event["status"] == "failed" else 0
+                yield _format_sse(event)
+        except Exception as e:
+            yield _format_sse({"event": "error", "detail": str(e)})
+        finally:
+            gate.release(granted)
+        yield _format_sse({"event": "done", "total": len(items), "completed": completed, "failed": failed})
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _overloaded(error: AdmissionRejected) -> HTTPException:
+    """429 telling the client when to retry"""
+    return HTTPException(
+        status_code=429,
+        detail=str(error),
+        headers={"Retry-After": str(int(error.retry_after))}
+    )
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    """Format an event dict as a Server-Sent Events frame"""
+    return f"event: {event.get('event', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def _run_with_deadline(http_request: Request, timeout_seconds: Optional[float], work) -> Any:
+    """
+    Run `work()` under a request deadline.
+    The work is cancelled when the deadline passes or the client disconnects,
+    and DeadlineExceeded reports the stage that was cut short.
+    """
+    deadline = Deadline(timeout_seconds or Config.REQUEST_TIMEOUT_SECONDS)
+    
+    async def run():
+        with use_deadline(deadline):
+            return await work()
+    
+    task = asyncio.ensure_future(run())
+    watcher = asyncio.ensure_future(_watch_disconnect(http_request, task, deadline))
+    try:
+        return await asyncio.wait_for(task, timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        deadline.cancel("deadline_exceeded")
+        raise DeadlineExceeded(deadline.stage)
+    except asyncio.CancelledError:
+        if deadline.cancel_reason:
+            raise DeadlineExceeded(deadline.stage, deadline.cancel_reason)
+        raise
+    finally:
+        watcher.cancel()
+
+
+async def _watch_disconnect(http_request: Request, task: asyncio.Future, deadline: Deadline):
+    """Cancel `task` as soon as the HTTP client disconnects"""
+    while not task.done():
+        if await http_request.is_disconnected():
+            deadline.cancel("client_disconnected")
+            task.cancel()
+            return
+        await asyncio.sleep(Config.DISCONNECT_POLL_SECONDS)
+
+
+def _deadline_status_code(error: DeadlineExceeded) -> int:
+    """HTTP status for a request that was cut short"""
+    return 499 if error.reason == "client_disconnected" else 504
+
+
 @app.post("/execute", response_model=CoreExecutionResponse)
-async def execute_core(request: CoreExecutionRequest):
-    """Execute a specific core"""
+async def execute_core(request: CoreExecutionRequest, http_request: Request, response: Response):
+    """
+    Run a core as a background job.
+    Returns 202 with the queued job at once; GET /jobs/{task_id} reports its
+    progress and result. With `wait: true` the call holds on for the result
+    (200) until the request timeout, then falls back to 202.
+    """
+    wait = request.wait and "respond-async" not in http_request.headers.get("prefer", "").lower()
     try:
-        result = await ai_system.execute_core(
+        job_id = await ai_system.submit_core_job(
             request.core,
             request.task,
-            request.parameters
+            request.parameters,
+            priority=request.priority or 0,
+            timeout_seconds=request.timeout_seconds
         )
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid core: {request.core}")
+    except AdmissionRejected as e:
+        raise _overloaded(e)
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=402, detail=str(e))
+    
+    job = None
+    if wait:
+        job = await ai_system.wait_for_job(job_id, request.timeout_seconds or Config.REQUEST_TIMEOUT_SECONDS)
+    if job is None or job["finished"] is None:
+        response.status_code = 202
         return CoreExecutionResponse(
             core=request.core,
-            task_id=f"task_{request.core}_{len(ai_system.task_history)}",
-            status="completed" if "error" not in result else "failed",
-            result=result if "error" not in result else None,
-            error=result.get("error")
+            task_id=job_id,
+            status=job["status"] if job else TaskStatus.PENDING.value,
+            stage=job["stage"] if job else None
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return CoreExecutionResponse(
+        core=request.core,
+        task_id=job_id,
+        status=job["status"],
+        result=job["result"],
+        error=job["error"],
+        stage=job["stage"]
+    )
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Status, progress and result of a background job"""
+    job = await ai_system.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return JobResponse(**job)
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job that has not started yet"""
+    if not await ai_system.cancel_job(job_id):
+        job = await ai_system.get_job(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']} and can no longer be cancelled")
+    return {"id": job_id, "status": TaskStatus.CANCELLED.value}
 
 
 @app.get("/cores")
@@ -391,13 +1155,17 @@ async def list_cores():
 @app.post("/knowledge/query")
 async def query_knowledge(request: KnowledgeQueryRequest):
     """Query the knowledge base"""
-    return ai_system.query_knowledge(request.question, request.category)
+    try:
+        async with ai_system.admission.endpoint("knowledge").slot():
+            return await ai_system.query_knowledge(request.question, request.category)
+    except AdmissionRejected as e:
+        raise _overloaded(e)
 
 
 @app.post("/knowledge/add")
 async def add_knowledge(request: KnowledgeAddRequest):
     """Add a document to the knowledge base"""
-    success = ai_system.add_knowledge(
+    success = await ai_system.add_knowledge(
         request.title,
         request.content,
         request.category,
@@ -409,22 +1177,37 @@ async def add_knowledge(request: KnowledgeAddRequest):
 @app.get("/knowledge/list")
 async def list_knowledge():
     """List all documents in the knowledge base"""
-    return {"documents": ai_system.list_knowledge()}
+    return {"documents": await ai_system.list_knowledge()}
 
 
 @app.get("/history")
-async def get_history(limit: int = 10):
-    """Get task history"""
-    return {"history": ai_system.get_task_history(limit)}
+async def get_history(limit: int = 10, session_id: Optional[str] = None, core: Optional[str] = None,
+                      since: Optional[float] = None, until: Optional[float] = None,
+                      cursor: Optional[str] = None):
+    """
+    Get task history, newest first.
+    Filter by session, core and a [since, until) Unix-time range; pass
+    `next_cursor` back as `cursor` for the next page.
+    """
+    try:
+        page = await ai_system.get_task_history(limit, session_id, core, since, until, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    return {"history": page["entries"], "next_cursor": page["next_cursor"]}
 
 
 # =============================================================================
 # MAIN ENTRY POINT
 # =============================================================================
 
-def start_server(host: str = "0.0.0.0", port: int = 8000):
+def start_server(host: str = "0.0.0.0", port: int = 8000, workers: int = None):
     """Start the API server"""
-    uvicorn.run(app, host=host, port=port)
+    workers = workers or Config.API_WORKERS
+    if workers > 1:
+        # Worker processes import the app themselves; state is shared through shared/state.py
+        uvicorn.run("unified_api:app", host=host, port=port, workers=workers, app_dir=os.path.dirname(__file__))
+    else:
+        uvicorn.run(app, host=host, port=port)
 
 
 if __name__ == "__main__":
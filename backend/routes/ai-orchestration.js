@@ -33,7 +33,7 @@ async function aiRequest(endpoint, method = 'GET', data = null) {
         }
         
         const response = await axios(config);
-        return { success: true, data: response.data };
+        return { success: true, status: response.status, data: response.data };
     } catch (error) {
         console.error(`AI System Error: ${error.message}`);
         return { 
@@ -43,6 +43,15 @@ async function aiRequest(endpoint, method = 'GET', data = null) {
     }
 }
 
+/**
+ * Queue a core through /execute.
+ * The AI system answers 202 with the job (task_id) at once; the caller
+ * follows it through GET /api/ai/jobs/:id instead of holding this request open.
+ */
+async function executeCore(data) {
+    return aiRequest('/execute', 'POST', data);
+}
+
 // =============================================================================
 // CHAT ENDPOINTS
 // =============================================================================
@@ -111,14 +120,14 @@ router.post('/execute', async (req, res) => {
             return res.status(400).json({ error: 'Core and task are required' });
         }
         
-        const result = await aiRequest('/execute', 'POST', {
+        const result = await executeCore({
             core,
             task,
             parameters: parameters || {}
         });
         
         if (result.success) {
-            res.json(result.data);
+            res.status(result.status).json(result.data);
         } else {
             res.status(500).json({ error: result.error });
         }
@@ -141,14 +150,14 @@ router.post('/offer-intelligence', async (req, res) => {
             ${minCommission ? `Minimum commission: ${minCommission}%` : ''}
             ${platforms ? `Platforms: ${platforms.join(', ')}` : ''}`;
         
-        const result = await aiRequest('/execute', 'POST', {
+        const result = await executeCore({
             core: 'offer_intelligence',
             task,
             parameters: { niche, minCommission, platforms }
         });
         
         if (result.success) {
-            res.json(result.data);
+            res.status(result.status).json(result.data);
         } else {
             res.status(500).json({ error: result.error });
         }
@@ -175,14 +184,14 @@ router.post('/content-generation', async (req, res) => {
             Niche: ${niche || 'General'}
             Content types: ${contentTypes?.join(', ') || 'All types'}`;
         
-        const result = await aiRequest('/execute', 'POST', {
+        const result = await executeCore({
             core: 'content_generation',
             task,
             parameters: { productName, productPrice, niche, contentTypes }
         });
         
         if (result.success) {
-            res.json(result.data);
+            res.status(result.status).json(result.data);
         } else {
             res.status(500).json({ error: result.error });
         }
@@ -205,14 +214,14 @@ router.post('/financial-analysis', async (req, res) => {
             Platforms: ${platforms?.join(', ') || 'All platforms'}
             ${includeForecasts ? 'Include 3-month forecasts' : ''}`;
         
-        const result = await aiRequest('/execute', 'POST', {
+        const result = await executeCore({
             core: 'financial_intelligence',
             task,
             parameters: { period, platforms, includeForecasts }
         });
         
         if (result.success) {
-            res.json(result.data);
+            res.status(result.status).json(result.data);
         } else {
             res.status(500).json({ error: result.error });
         }
@@ -222,6 +231,44 @@ router.post('/financial-analysis', async (req, res) => {
     }
 });
 
+/**
+ * GET /api/ai/jobs/:id
+ * Status, progress and result of a queued core
+ */
+router.get('/jobs/:id', async (req, res) => {
+    try {
+        const result = await aiRequest(`/jobs/${encodeURIComponent(req.params.id)}`);
+        
+        if (result.success) {
+            res.json(result.data);
+        } else {
+            res.status(500).json({ error: result.error });
+        }
+    } catch (error) {
+        console.error('Job status error:', error);
+        res.status(500).json({ error: 'Failed to fetch job' });
+    }
+});
+
+/**
+ * DELETE /api/ai/jobs/:id
+ * Cancel a core that has not started yet
+ */
+router.delete('/jobs/:id', async (req, res) => {
+    try {
+        const result = await aiRequest(`/jobs/${encodeURIComponent(req.params.id)}`, 'DELETE');
+        
+        if (result.success) {
+            res.json(result.data);
+        } else {
+            res.status(500).json({ error: result.error });
+        }
+    } catch (error) {
+        console.error('Job cancel error:', error);
+        res.status(500).json({ error: 'Failed to cancel job' });
+    }
+});
+
 // =============================================================================
 // KNOWLEDGE BASE ENDPOINTS
 // =============================================================================